@@ -1,5 +1,6 @@
-from pyproj import Proj,transform
+from pyproj import Proj
 from abc import ABC, abstractmethod
+from .projection import project_point
 
 SK_CITY_BOUNDARY = [52.058367, -106.7649138128, 52.214608, -106.52225318]
 SK_CITY_BOUNDARY_UTM = [379000, 5768999.9, 396000, 5785999.9]
@@ -42,8 +43,7 @@ def transform_to_utm(latitude, longitude,PROJ_UTM):
         list of utm coordinate [utm_easting, utm_northing]
     """
 
-    utm_easting, utm_northing = transform(PROJ_LATLONG, PROJ_UTM, [longitude], [latitude])
-    return [utm_easting[0], utm_northing[0]]
+    return project_point(PROJ_LATLONG, PROJ_UTM, longitude, latitude)
 
 
 def generate_utm_boundary(latlong_boundary, dataset_id):
@@ -78,6 +78,7 @@ class DatasetFSDConfiguration(AbstractDatasetConfiguration):
         self.dataset_name = 'foodstudy'
         self.gps_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps.csv"
         self.data_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps/"
+        self.participant_store_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/participants/"
         self.entropy_rate_results_path = "/Volumes/Seagate_Rui/dimensionality/data/" + self.dataset_name + "/entropy_rate/"
         self.has_battery_data = True
         self.battery_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/battery.csv"
@@ -97,6 +98,7 @@ class DatasetSHED9Configuration(AbstractDatasetConfiguration):
         self.dataset_name = 'SHED9'
         self.gps_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps.csv"
         self.data_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps/"
+        self.participant_store_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/participants/"
         self.entropy_rate_results_path = "/Volumes/Seagate_Rui/dimensionality/data/" + self.dataset_name + "/entropy_rate/"
         self.has_battery_data = True
         self.battery_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/battery.csv"
@@ -116,6 +118,7 @@ class DatasetSHED10Configuration(AbstractDatasetConfiguration):
         self.dataset_name = 'SHED10'
         self.gps_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps.csv"
         self.data_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps/"
+        self.participant_store_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/participants/"
         self.entropy_rate_results_path = "/Volumes/Seagate_Rui/dimensionality/data/" + self.dataset_name + "/entropy_rate/"
         self.has_battery_data = True
         self.battery_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/battery.csv"
@@ -135,6 +138,7 @@ class DatasetVictoriaConfiguration(AbstractDatasetConfiguration):
         self.dataset_name = 'Victoria'
         self.gps_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps.csv"
         self.data_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps/"
+        self.participant_store_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/participants/"
         self.entropy_rate_results_path = "/Volumes/Seagate_Rui/dimensionality/data/" + self.dataset_name + "/entropy_rate/"
         self.has_battery_data = True
         self.battery_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/battery.csv"
@@ -154,6 +158,7 @@ class DatasetVancouverConfiguration(AbstractDatasetConfiguration):
         self.dataset_name = 'Vancouver'
         self.gps_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps.csv"
         self.data_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps/"
+        self.participant_store_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/participants/"
         self.entropy_rate_results_path = "/Volumes/Seagate_Rui/dimensionality/data/" + self.dataset_name + "/entropy_rate/"
         self.has_battery_data = True
         self.battery_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/battery.csv"
@@ -173,6 +178,7 @@ class DatasetTaxiConfiguration(AbstractDatasetConfiguration):
         self.dataset_name = 'Taxi'
         self.gps_data_path = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps.csv"
         self.data_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/gps/"
+        self.participant_store_directory = "/Volumes/Seagate_Rui/dimensionality/data/"+self.dataset_name+"/participants/"
         self.entropy_rate_results_path = "/Volumes/Seagate_Rui/dimensionality/data/" + self.dataset_name + "/entropy_rate/"
         self.has_battery_data = False
         self.city_boundary = ROME_CITY_BOUNDARY
@@ -1,5 +1,6 @@
 import pandas as pd
 import os
+from features.temporal_pyramid import TemporalPyramid
 
 
 dataset_ids = ['foodstudy','SHED9','SHED10','Victoria','Vancouver','Taxi']
@@ -10,24 +11,6 @@ def get_user_id_from_file_name(filename):
     user_id = filename.split('.')[0]
     return user_id
 
-def sample_by_duty_cycle(df, duty_cycle_ratio):
-    """Downsample the original GPS location list with different duty cycle
-    :param df: dataframe of GPS location list, must include a column "DutyCycle"
-    :param sample_rate: ratio between the base duty cycle and current processing duty cycle
-    :return: dataframe under new duty cycle
-    """
-    if duty_cycle_ratio == 1:
-        return df
-    else:
-        # print(df.loc[2, 'DutyCycle'])
-        df.loc[:, ['DutyCycle']] = df.loc[:, ['DutyCycle']] // duty_cycle_ratio
-        # print(duty_cycle_ratio)
-        # print(df.loc[2,'DutyCycle'])
-        # print()
-        sampled_df = pd.DataFrame(df.groupby('DutyCycle').first().reset_index())
-        # compressed_df.to_csv("/Users/ruizhang/Dropbox/dimensionality_activity_space_0326/src/new_metrics/temp.csv")
-        return sampled_df
-
 
 
 if __name__ == '__main__':
@@ -48,12 +31,11 @@ if __name__ == '__main__':
         for file_name in os.listdir(dataset_dir):
             if file_name.endswith(suffix):
                 user_id = int(get_user_id_from_file_name(file_name))
-                df = pd.read_csv(dataset_dir + file_name)
+                df = pd.read_csv(dataset_dir + file_name, usecols=['DutyCycle'])
                 max_dc = max(df['DutyCycle'])
                 min_dc = min(df['DutyCycle'])
                 total_days = (max_dc - min_dc) * duty_cycle / 1440
-                downsampled_df = sample_by_duty_cycle(df, downsample_rate)
-                total_gps_count = downsampled_df.shape[0]
+                total_gps_count = TemporalPyramid(df['DutyCycle'], [downsample_rate]).get_level_size(downsample_rate)
                 daily_gps_count = total_gps_count / total_days
                 gps_count_summary.append([dataset, user_id,  total_gps_count, total_days, daily_gps_count])
     gps_count_summary_df = pd.DataFrame(gps_count_summary, columns=['dataset','user_id','total_gps_count', 'total_days', 'daily_gps_count'])
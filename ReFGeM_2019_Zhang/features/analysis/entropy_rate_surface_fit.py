@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 from mpl_toolkits import mplot3d
 import matplotlib.pyplot as plt
+from features.entropy_parameter_fit import read_entropy_rate_files
 
 
 dataset_ids = ['foodstudy','SHED9','SHED10','Victoria','Vancouver','Taxi']
@@ -9,70 +10,67 @@ dataset_ids = ['foodstudy','SHED9','SHED10','Victoria','Vancouver','Taxi']
 data_base_dir = "/Volumes/Seagate_Rui/dimensionality/data/"
 fitted_param_file = "/entropy_rate/fitted_parameters.csv"
 dataset = "foodstudy"
-const_terms = []
+const_terms_columns = ['C1', 'C2', 'C3', 'C4', 'C5']
 
 
 def calc_spatial_temporal_entropy_rate(data):
     """
-    Calculate the spatial temporal entropy rate given data [D, T, L] and constant terms [C1, C2, C3, C4, C5]
-    :param data: [T,D,L]
-    :param const_terms: [C1, C2, C3, C4, C5]
+    Calculate the spatial temporal entropy rate of all rows at once given data [T, D, L] and constant terms
+    [C1, C2, C3, C4, C5] of the participant of each row
+    :param data: dataframe with columns T, D, L, C1, C2, C3, C4, C5
     :return: spatial temporal entropy rate: H
     """
-    T = data['T']
-    D = data['D']
-    L = data['L']
-    C1, C2, C3, C4, C5 = const_terms
+    T = data['T'].to_numpy(np.float64)
+    D = data['D'].to_numpy(np.float64)
+    L = data['L'].to_numpy(np.float64)
+    C1, C2, C3, C4, C5 = (data[column].to_numpy(np.float64) for column in const_terms_columns)
     H = np.log(L) / (C1 * np.power(D,2) / (4 * L * np.power(T, 2)) + C2 / (4 * L * np.power(T,2)) + C3 * D / (2 * L * np.power(T,2)) + C4 * D / (T * L) + C5 / (T * L))
     return H
 
 
-def process_entropy_rate(data_df):
+def process_entropy_rate(data_df, fitted_params):
     """
-    Calculate the fitted H for all [D, T, L] pairs of a participant given constant terms [C1, C2, C3, C4, C5]
-    :param data: all pairs of [D, T, L, H] of a participant. H is the LzEntropy
-    :param const_terms: [C1, C2, C3, C4, C5]
-    :return: [D, T, L, H, H_fitted]
+    Calculate the fitted H for all [D, T, L] pairs of the participants given their constant terms [C1, C2, C3, C4, C5]
+    :param data_df: all pairs of [user_id, D, T, L, H] of the participants. H is the LzEntropy
+    :param fitted_params: dataframe [user_id, C1, C2, C3, C4, C5] of the participants
+    :return: [user_id, T, D, L, H, H_fitted] of the participants that have constant terms
     """
-    data_df['H_fitted'] = data_df.apply(calc_spatial_temporal_entropy_rate, axis=1)
-    return data_df
+    fitted_params = fitted_params[['user_id'] + const_terms_columns].astype({'user_id': np.int64})
+    data_df = pd.merge(data_df.astype({'user_id': np.int64}), fitted_params, on=['user_id'])
+    data_df['H_fitted'] = calc_spatial_temporal_entropy_rate(data_df)
+    return data_df.drop(columns=const_terms_columns)
+
+
+def get_dataset_fitted_entropy_rate(dataset):
+    """Return [user_id, T, D, L, H, H_fitted] of all participants of a dataset"""
+    fitted_params = pd.read_csv(data_base_dir + dataset + fitted_param_file)
+    entropy_rate_df = read_entropy_rate_files(data_base_dir + dataset + "/entropy_rate/")
+    return process_entropy_rate(entropy_rate_df, fitted_params)
 
 
 def generate_all_datasets_fitted_entropy_rate(dataset_list):
+    """Save the fitted H of each participant to <user_id>_with_fitted_H.csv"""
     for dataset in dataset_list:
         print("Processing dataset",dataset)
-        fitted_params = pd.read_csv(data_base_dir + dataset + fitted_param_file)
         entropy_file_dir = data_base_dir + dataset + "/entropy_rate/"
-        for index, row in fitted_params.iterrows():
-            user_id = row['user_id']
-            # print(user_id)
-            global const_terms
-            const_terms = [row['C1'], row['C2'], row['C3'], row['C4'], row['C5']]
-            user_entropy_rate_file = entropy_file_dir + str(int(user_id)) + ".csv"
-            user_df = pd.read_csv(user_entropy_rate_file)
-            user_df_with_fitted_H = process_entropy_rate(user_df)
-            user_df_with_fitted_H.to_csv(entropy_file_dir + str(int(user_id)) + "_with_fitted_H.csv", index=False)
+        df_all = get_dataset_fitted_entropy_rate(dataset)
+        for user_id, user_df_with_fitted_H in df_all.groupby('user_id'):
+            user_df_with_fitted_H.drop(columns='user_id').to_csv(entropy_file_dir + str(int(user_id)) +
+                                                                 "_with_fitted_H.csv", index=False)
+
+
+def calc_average_H_and_fitted_H(df_all):
+    """Return the mean H and H_fitted of each [T, D] across participants"""
+    return df_all.groupby(['T','D']).agg({'H':'mean','H_fitted':'mean'}).reset_index()
 
 
 def generate_all_datasets_average_H_and_fitted_H(dataset_list, valid_participant_df):
     for dataset in dataset_list:
         part_valid_participant_list = valid_participant_df[valid_participant_df['dataset']==dataset]['user_id'].tolist()
-        df_list = []
         print("Processing dataset",dataset)
-        fitted_params = pd.read_csv(data_base_dir + dataset + fitted_param_file)
-        entropy_file_dir = data_base_dir + dataset + "/entropy_rate/"
-        for index, row in fitted_params.iterrows():
-            user_id = row['user_id']
-            print(user_id)
-            if int(user_id) in part_valid_participant_list:
-                user_entropy_rate_file = entropy_file_dir + str(int(user_id)) + "_with_fitted_H.csv"
-                user_df = pd.read_csv(user_entropy_rate_file)
-                df_list.append(user_df)
-            else:
-                continue
-        df_all = pd.concat(df_list)
-        df_all.to_csv("temp.csv")
-        df_average_H = df_all.groupby(['T','D']).agg({'H':'mean','H_fitted':'mean'}).reset_index()
+        df_all = get_dataset_fitted_entropy_rate(dataset)
+        df_all = df_all[df_all['user_id'].isin(part_valid_participant_list)]
+        df_average_H = calc_average_H_and_fitted_H(df_all)
         df_average_H.to_csv(data_base_dir + dataset + "_entropy_rate_average_H_fitted_H.csv")
 
 
@@ -87,7 +85,6 @@ def get_valid_participant_df():
 
 if __name__ == "__main__":
     valid_participant_df = get_valid_participant_df()
-    # # generate_all_datasets_fitted_entropy_rate(dataset_ids)
-    generate_all_datasets_fitted_entropy_rate(dataset_ids)
+    # generate_all_datasets_fitted_entropy_rate(dataset_ids)
     generate_all_datasets_average_H_and_fitted_H(dataset_ids, valid_participant_df)
 
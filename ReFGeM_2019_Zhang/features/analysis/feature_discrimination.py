@@ -5,7 +5,6 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 from sklearn import svm
-from sklearn.datasets import samples_generator
 from sklearn.feature_selection import SelectKBest
 from sklearn.feature_selection import f_regression
 from sklearn.feature_selection import f_classif
@@ -16,12 +15,12 @@ from sklearn.model_selection import cross_val_score
 from sklearn.model_selection import cross_val_predict
 import csv
 from sklearn import datasets
-from sklearn.externals.six.moves import xrange
 from sklearn.mixture import GaussianMixture as GMM
 from sklearn.metrics import confusion_matrix
 from sklearn.model_selection import train_test_split
 import itertools
 from sklearn.metrics import accuracy_score
+from features.analysis.model_evaluation import evaluate_model_grid, get_gmm_classifiers, summarize_model_grid
 
 
 dataset_ids = ['foodstudy','SHED9','SHED10','Victoria','Vancouver','Taxi']
@@ -93,7 +92,7 @@ def gmm_classifier():
             # initialize the GMM parameters in a supervised manner.
             print(classifier)
             classifier.means_ = np.array([X_train[y_train == i].mean(axis=0)
-                                          for i in xrange(n_classes)])
+                                          for i in range(n_classes)])
 
             # Train the other parameters using the EM algorithm.
             classifier.fit(X_train)
@@ -132,18 +131,23 @@ if __name__ == '__main__':
     bestN = (1, 2, 3, 4, 5, 6, 7, 8, 9)
     predict_results = []
     all_conf_mats = []
+    # cross validation of every k of the svm and of the gmm classifiers on all CPUs, the same scores as
+    # cross_val_score(anova_svm, X_train, y_train, scoring='accuracy', cv=5)
+    classifiers = dict(svc=clf, **get_gmm_classifiers())
+    cross_validation_summary = summarize_model_grid(evaluate_model_grid(X_train, y_train, classifiers, bestN, 5))
+    print(cross_validation_summary[['classifier', 'k', 'mean', 'std']])
+    cross_validation_summary.to_pickle(results_dir + "cross_validation_summary.pkl")
+    svc_summary = cross_validation_summary[cross_validation_summary['classifier'] == 'svc'].set_index('k')
     for n in bestN:
         anova_svm.set_params(anova__k=n)
-        # Compute cross-validation score using 1 CPU
-        this_scores = cross_val_score(anova_svm, X_train, y_train, scoring='accuracy', cv=5)
         anova_svm.fit(X_train,y_train)
         y_pred = anova_svm.predict(X_test)
         print(accuracy_score(y_test, y_pred))
         conf_mat = confusion_matrix(y_test, y_pred)
         all_conf_mats.append(conf_mat)
-        score_means.append(this_scores.mean())
-        score_stds.append(this_scores.std())
-        predict_results.append([n, this_scores.mean(), this_scores.std()])
+        score_means.append(svc_summary.loc[n, 'mean'])
+        score_stds.append(svc_summary.loc[n, 'std'])
+        predict_results.append([n, svc_summary.loc[n, 'mean'], svc_summary.loc[n, 'std']])
         print(anova_svm.named_steps['anova'].get_support())
     print(predict_results)
 
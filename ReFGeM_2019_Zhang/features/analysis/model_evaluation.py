@@ -0,0 +1,126 @@
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.feature_selection import f_classif
+from sklearn.metrics import accuracy_score, confusion_matrix
+from sklearn.mixture import GaussianMixture
+from sklearn.model_selection import StratifiedKFold
+
+"""
+Evaluate the grid of (classifier, number of selected features k, cross validation fold) of the SelectKBest(f_classif)
+pipelines of feature_discrimination on a pool of processes.
+The f_classif scores of a fold don't depend on k or on the classifier, so they are computed once per fold, and the k
+best features of each task are taken from the cached scores the same way SelectKBest does. The feature matrix is sent
+once to each worker by the pool initializer, and tasks only carry their indices.
+The folds are StratifiedKFold(n_splits) without shuffling, the folds of cross_val_score(cv=n_splits), so the mean
+accuracy of a (classifier, k) equals cross_val_score of Pipeline([('anova', SelectKBest(f_classif, k=k)), ('svc', ...)]).
+"""
+
+DEFAULT_K_LIST = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+DEFAULT_N_SPLITS = 5
+_worker_data = None
+
+
+class SupervisedGaussianMixture(ClassifierMixin, BaseEstimator):
+    """Gaussian mixture with one component per class, initialized at the class means as in gmm_classifier"""
+    def __init__(self, covariance_type='full', max_iter=20):
+        self.covariance_type = covariance_type
+        self.max_iter = max_iter
+
+    def fit(self, X, y):
+        self.classes_ = np.unique(y)
+        means = np.array([X[y == label].mean(axis=0) for label in self.classes_])
+        self.mixture_ = GaussianMixture(n_components=self.classes_.size, covariance_type=self.covariance_type,
+                                        max_iter=self.max_iter, means_init=means).fit(X)
+        return self
+
+    def predict(self, X):
+        return self.classes_[self.mixture_.predict(X)]
+
+
+def get_gmm_classifiers():
+    """The four covariance types of gmm_classifier"""
+    return dict(('gmm_' + covariance_type, SupervisedGaussianMixture(covariance_type))
+                for covariance_type in ['spherical', 'diag', 'tied', 'full'])
+
+
+def clean_scores(scores):
+    """NaN scores are never selected, as in SelectKBest"""
+    scores = np.array(scores, dtype=np.float64)
+    scores[np.isnan(scores)] = np.finfo(scores.dtype).min
+    return scores
+
+
+def get_k_best_mask(scores, k):
+    mask = np.zeros(scores.shape, dtype=bool)
+    mask[np.argsort(scores, kind="mergesort")[-k:]] = True
+    return mask
+
+
+def calc_fold_scores(X, y, folds):
+    """Return the f_classif scores of the training set of each fold, array [fold, feature]"""
+    return np.array([clean_scores(f_classif(X[train_index], y[train_index])[0]) for train_index, _ in folds])
+
+
+def init_model_evaluation_worker(X, y, labels, folds, fold_scores, classifiers):
+    global _worker_data
+    _worker_data = (X, y, labels, folds, fold_scores, classifiers)
+
+
+def evaluate_task(task):
+    """
+    Fit a classifier on the k best features of the training set of a fold and evaluate it on the test set
+    :param task: (classifier name, k, fold index)
+    :return: [classifier, k, fold, accuracy, confusion matrix, mask of the selected features]
+    """
+    classifier_name, k, fold = task
+    X, y, labels, folds, fold_scores, classifiers = _worker_data
+    train_index, test_index = folds[fold]
+    selected = get_k_best_mask(fold_scores[fold], k)
+    classifier = clone(classifiers[classifier_name]).fit(X[train_index][:, selected], y[train_index])
+    y_pred = classifier.predict(X[test_index][:, selected])
+    return [classifier_name, k, fold, accuracy_score(y[test_index], y_pred),
+            confusion_matrix(y[test_index], y_pred, labels=labels), selected]
+
+
+def evaluate_model_grid(X, y, classifiers, k_list=None, n_splits=DEFAULT_N_SPLITS, processes=None):
+    """
+    Evaluate every (classifier, k, fold) of the grid
+    :param X: feature matrix [participant, feature]
+    :param y: class label of each participant
+    :param classifiers: dict of name -> unfitted sklearn classifier
+    :param k_list: numbers of selected features, DEFAULT_K_LIST limited to the number of features if None
+    :param processes: number of worker processes, os.cpu_count() if None, 1 to evaluate in this process
+    :return: dataframe [classifier, k, fold, accuracy, confusion_matrix, selected], one row per task
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    if k_list is None:
+        k_list = [k for k in DEFAULT_K_LIST if k <= X.shape[1]]
+    labels = np.unique(y)
+    folds = list(StratifiedKFold(n_splits=n_splits).split(X, y))
+    fold_scores = calc_fold_scores(X, y, folds)
+    tasks = [(classifier_name, k, fold) for classifier_name in classifiers for k in k_list for fold in range(n_splits)]
+    initargs = (X, y, labels, folds, fold_scores, classifiers)
+    if processes == 1:
+        init_model_evaluation_worker(*initargs)
+        results = list(map(evaluate_task, tasks))
+    else:
+        with Pool(processes=processes, initializer=init_model_evaluation_worker, initargs=initargs) as pool:
+            results = pool.map(evaluate_task, tasks)
+    return pd.DataFrame(results, columns=['classifier', 'k', 'fold', 'accuracy', 'confusion_matrix', 'selected'])
+
+
+def summarize_model_grid(results):
+    """
+    Summarize the folds of each (classifier, k)
+    :param results: dataframe of evaluate_model_grid
+    :return: dataframe [classifier, k, mean, std, confusion_matrix], the confusion matrix is the sum over the folds
+    """
+    summary_list = []
+    for (classifier_name, k), df in results.groupby(['classifier', 'k'], sort=False):
+        summary_list.append([classifier_name, k, df['accuracy'].mean(), df['accuracy'].std(ddof=0),
+                             np.sum(np.stack(df['confusion_matrix'].tolist()), axis=0)])
+    return pd.DataFrame(summary_list, columns=['classifier', 'k', 'mean', 'std', 'confusion_matrix'])
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from features.results_store import ResultsStore
 
 """
 This script will merge all features of all datasets, and normalize these features for further analysis. There are 12 
@@ -54,6 +55,20 @@ def merge_features_of_participants_in_same_dataset(d_id):
     merged_features_df.to_csv(merged_features_file, index=False)
 
 
+def load_features_to_store(results_store, d_id):
+    """Upsert the feature files of a dataset, the R-squared column of older entropy files is stored as R_squared"""
+    convex_buffer_df, dim_df, entropy_df = get_all_features_dataframe(d_id)
+    results_store.upsert('features', d_id, convex_buffer_df)
+    results_store.upsert('dimensionality', d_id, dim_df)
+    results_store.upsert('entropy_parameters', d_id, entropy_df.rename(columns={'R-squared': 'R_squared'}))
+
+
+def load_valid_participants_to_store(results_store):
+    valid_participants_df = read_dataframe_from_csv_file(valid_participants_file)
+    for d_id, df in valid_participants_df.groupby('dataset'):
+        results_store.upsert('valid_participants', d_id, df.drop(columns='dataset'))
+
+
 def merge_features_of_different_datasets(dataset_list):
     dataframe_list = []
     for d_id in dataset_list:
@@ -124,9 +139,19 @@ if __name__ == "__main__":
     #                                 "all_datasets/no_normalized_features_all_datasets_valid_participants_only.csv",
     #                                 index=False)
     #
-    valid_merged_datasets_df = pd.read_csv(other_features_base_directory +
-                                    "all_datasets/no_normalized_features_all_datasets_valid_participants_only.csv")
-    normalized_valid_merged_df = normalize_features(valid_merged_datasets_df)
+    # valid_merged_datasets_df = pd.read_csv(other_features_base_directory +
+    #                                 "all_datasets/no_normalized_features_all_datasets_valid_participants_only.csv")
+    # normalized_valid_merged_df = normalize_features(valid_merged_datasets_df)
+    store = ResultsStore()
+    for dataset in dataset_ids:
+        load_features_to_store(store, dataset)
+    load_valid_participants_to_store(store)
+    store.read_merged_features(dataset_ids).to_csv(other_features_base_directory +
+                                                   "all_datasets/no_normalized_features_all_datasets.csv", index=False)
+    store.read_merged_features(dataset_ids, valid_only=True).to_csv(
+        other_features_base_directory + "all_datasets/no_normalized_features_all_datasets_valid_participants_only.csv",
+        index=False)
+    normalized_valid_merged_df = store.read_normalized_features(dataset_ids)
     normalized_valid_merged_df.to_csv(other_features_base_directory + "all_datasets/normalized_features_all_datasets.csv",
                                 index=False)
 
@@ -1,6 +1,6 @@
 import pandas as pd
-import math
 from .DatasetConfiguration import *
+from .record_standardizer import calc_duty_cycle_index, standardize_record_time, standardize_user_id
 
 """
 Count battery duty cycle:
@@ -31,13 +31,11 @@ class BatteryProcessor:
 
     def battery_duty_cycles_of_each_participant(self):
         battery_df = self.battery_dataframe
-        battery_df['record_time'] = pd.to_datetime(battery_df['record_time'])
-        battery_df['user_id'] = battery_df['user_id'].apply(lambda x: int(str(x).replace(',', '')))
-        study_start_time = min(battery_df['record_time'])
+        battery_df['record_time'] = standardize_record_time(battery_df['record_time'])
+        battery_df['user_id'] = standardize_user_id(battery_df['user_id'])
+        study_start_time = battery_df['record_time'].min()
         print(study_start_time)
-        duty_cycle = battery_df['record_time'].apply(
-            lambda x: math.floor((x - study_start_time).total_seconds() / (self.duty_cycles * 60)))
-        battery_df['duty_cycle'] = duty_cycle
+        battery_df['duty_cycle'] = calc_duty_cycle_index(battery_df['record_time'], study_start_time, self.duty_cycles)
 
         aggregated_battery_df = pd.DataFrame(
             {'count': battery_df.groupby(['user_id', 'duty_cycle']).size()}).reset_index()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+"""
+Box-counting curve S(epsilon) of the GPS points of a participant, computed from the base grid (grid_x, grid_y) instead
+of the .mbparam files of the external tool.
+The boxes of level k are the squares of 2^k base cells, and epsilon is their side over the side of the dataset area,
+so that epsilon is in the units of the normalized coordinates. The base cells are sorted once by their Morton code
+(bits of grid_x and grid_y interleaved), in which the box of level k of a cell is code >> 2k. The codes stay sorted at
+every level, so the number of occupied boxes N(epsilon) of all levels comes from the changes between neighbouring codes
+in one vectorized pass.
+S is the local box-counting dimension between a level and the next one, where epsilon doubles:
+    S(epsilon) = log2(N(epsilon) / N(2 * epsilon))
+"""
+
+# Bits of grid_x and grid_y in a Morton code
+MORTON_BITS = 32
+# Masks spreading the low 32 bits of an integer to the even bits of a 64 bit integer
+MORTON_MASKS = [(16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                (2, 0x3333333333333333), (1, 0x5555555555555555)]
+
+
+def spread_bits(values):
+    values = values.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in MORTON_MASKS:
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def calc_morton_codes(grid_x, grid_y):
+    """Return the Morton code of each cell, grid_x and grid_y start from 0 as in GPSProcessor.get_grid_xy"""
+    grid_x = np.asarray(grid_x, dtype=np.int64)
+    grid_y = np.asarray(grid_y, dtype=np.int64)
+    if grid_x.size and (min(grid_x.min(), grid_y.min()) < 0 or max(grid_x.max(), grid_y.max()) >= 2 ** MORTON_BITS):
+        raise ValueError("Grid coordinates must be in [0, 2^" + str(MORTON_BITS) + ")")
+    return spread_bits(grid_x) | (spread_bits(grid_y) << np.uint64(1))
+
+
+def count_occupied_boxes(grid_x, grid_y, levels):
+    """
+    Count the boxes of 2^k x 2^k base cells that contain at least one point, for each level k
+    :param grid_x: base grid x of the points
+    :param grid_y: base grid y of the points
+    :param levels: list of levels k
+    :return: array of the number of occupied boxes of each level
+    """
+    codes = np.unique(calc_morton_codes(grid_x, grid_y))
+    if codes.size == 0:
+        return np.zeros(len(levels), dtype=np.int64)
+    shifts = 2 * np.asarray(levels, dtype=np.uint64)[:, np.newaxis]
+    box_codes = codes[np.newaxis, :] >> shifts
+    return 1 + np.count_nonzero(box_codes[:, 1:] != box_codes[:, :-1], axis=1)
+
+
+def calc_box_counting_curve(grid_x, grid_y, cell_size, extent, max_level=None):
+    """
+    Calculate the box-counting curve of the points of a participant
+    :param grid_x: base grid x of the points
+    :param grid_y: base grid y of the points
+    :param cell_size: side of the base cells in meters, MIN_CELL_SIZE
+    :param extent: side of the dataset area in meters, used to normalize epsilon
+    :param max_level: last level of boxes, the level at which one box covers all points if None
+    :return: dataframe [epsilon, boxes, S] with one row per level, with the columns epsilon and S of .mbparam files
+    """
+    grid_x = np.asarray(grid_x, dtype=np.int64)
+    grid_y = np.asarray(grid_y, dtype=np.int64)
+    if max_level is None:
+        max_level = max(int(max(grid_x.max(), grid_y.max())).bit_length(), 1) if grid_x.size else 1
+    levels = np.arange(max_level + 1)
+    boxes = count_occupied_boxes(grid_x, grid_y, levels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dimension = np.log2(boxes[:-1] / boxes[1:])
+    return pd.DataFrame({'epsilon': cell_size * 2.0 ** levels[:-1] / extent,
+                         'boxes': boxes[:-1],
+                         'S': dimension})
+
+
+def get_dataset_extent(city_boundary_utm):
+    """Return the side in meters of the square covering the city boundary [min_easting, min_northing, max_easting,
+    max_northing]"""
+    return max(city_boundary_utm[2] - city_boundary_utm[0], city_boundary_utm[3] - city_boundary_utm[1])
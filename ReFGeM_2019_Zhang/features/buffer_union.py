@@ -0,0 +1,97 @@
+import math
+from multiprocessing import Pool
+
+import numpy as np
+from shapely.geometry import LineString, box
+from shapely.ops import unary_union
+
+"""
+Exact buffer area of a GPS path computed on spatial tiles in parallel.
+The plane is cut into square tiles of BUFFER_UNION_TILE_SIZE meters aligned with the city boundary of the dataset
+(city_boundary_utm = [min_easting, min_northing, max_easting, max_northing]); tiles continue past the boundary for the
+buffers that cross it. Each segment buffer is sent to every tile its bounding box touches, and each tile unions its
+buffers and clips the union to the tile. The tiles only share edges, so the sum of the clipped areas is the area of the
+whole union without double counting, and it equals the serial union up to floating point rounding.
+"""
+
+BUFFER_UNION_TILE_SIZE = 2000.0
+
+
+def calc_segment_tiles(utm_path, buffer_size, boundary_utm, tile_size=BUFFER_UNION_TILE_SIZE):
+    """
+    Find the tiles touched by the buffer of each segment of a path
+    :param utm_path: array [[easting, northing]] of the vertices of the path
+    :param buffer_size: radius of the buffer in meters
+    :param boundary_utm: [min_easting, min_northing, max_easting, max_northing], the origin of the tiles
+    :return: (segment index, tile x index, tile y index) arrays, one entry per touched tile of each segment
+    """
+    utm_path = np.asarray(utm_path, dtype=np.float64).reshape(-1, 2)
+    starts, ends = utm_path[:-1], utm_path[1:]
+    # square caps reach at most buffer_size * sqrt(2) from the segment
+    reach = buffer_size * math.sqrt(2)
+    origin = np.array(boundary_utm[:2], dtype=np.float64)
+    low = np.floor((np.minimum(starts, ends) - reach - origin) / tile_size).astype(np.int64)
+    high = np.floor((np.maximum(starts, ends) + reach - origin) / tile_size).astype(np.int64)
+    tile_counts = high - low + 1
+    segment_index = np.repeat(np.arange(starts.shape[0]), tile_counts[:, 0] * tile_counts[:, 1])
+    # position of each entry among the tiles of its segment
+    first_entry = np.cumsum(tile_counts[:, 0] * tile_counts[:, 1]) - tile_counts[:, 0] * tile_counts[:, 1]
+    offset = np.arange(segment_index.size) - first_entry[segment_index]
+    tile_x = low[segment_index, 0] + offset % tile_counts[segment_index, 0]
+    tile_y = low[segment_index, 1] + offset // tile_counts[segment_index, 0]
+    return segment_index, tile_x, tile_y
+
+
+def calc_tile_buffer_area(task):
+    """
+    Calculate the area of the union of segment buffers inside a tile
+    :param task: (segments array [[x1, y1, x2, y2]], buffer_size, cap_style, tile bounds (minx, miny, maxx, maxy))
+    :return: area of the clipped union
+    """
+    segments, buffer_size, cap_style, tile_bounds = task
+    buffer_segments = [LineString(((x1, y1), (x2, y2))).buffer(buffer_size, cap_style=cap_style)
+                       for x1, y1, x2, y2 in segments]
+    return unary_union(buffer_segments).intersection(box(*tile_bounds)).area
+
+
+def make_tile_tasks(utm_path, buffer_size, boundary_utm, tile_size=BUFFER_UNION_TILE_SIZE, cap_style=3):
+    """Return the task of each touched tile, see calc_tile_buffer_area"""
+    utm_path = np.asarray(utm_path, dtype=np.float64).reshape(-1, 2)
+    segments = np.hstack((utm_path[:-1], utm_path[1:]))
+    segment_index, tile_x, tile_y = calc_segment_tiles(utm_path, buffer_size, boundary_utm, tile_size)
+    order = np.lexsort((tile_x, tile_y))
+    segment_index, tile_x, tile_y = segment_index[order], tile_x[order], tile_y[order]
+    is_tile_start = np.ones(segment_index.size, dtype=bool)
+    is_tile_start[1:] = (tile_x[1:] != tile_x[:-1]) | (tile_y[1:] != tile_y[:-1])
+    tile_start = np.flatnonzero(is_tile_start)
+    tile_end = np.append(tile_start[1:], segment_index.size)
+    tasks = []
+    for start, end in zip(tile_start, tile_end):
+        min_easting = boundary_utm[0] + tile_x[start] * tile_size
+        min_northing = boundary_utm[1] + tile_y[start] * tile_size
+        tile_bounds = (min_easting, min_northing, min_easting + tile_size, min_northing + tile_size)
+        tasks.append((segments[segment_index[start:end]], buffer_size, cap_style, tile_bounds))
+    return tasks
+
+
+def calc_buffer_area_tiled(utm_path, buffer_size, boundary_utm, tile_size=BUFFER_UNION_TILE_SIZE, processes=None,
+                           cap_style=3, pool=None):
+    """
+    Calculate the exact area of the union of the buffers of the path segments, tile by tile on a pool of processes
+    :param utm_path: array [[easting, northing]] of the vertices of the path
+    :param buffer_size: radius of the buffer in meters
+    :param boundary_utm: city_boundary_utm of the dataset, the origin of the tiles
+    :param tile_size: size of the tiles in meters
+    :param processes: number of worker processes, os.cpu_count() if None, 1 to union the tiles in this process
+    :param pool: multiprocessing pool to reuse across participants, a new pool is created if None
+    :return: area of the buffer in square meters, the same as calc_buffer_area_vector
+    """
+    if len(utm_path) < 2:
+        return 0.0
+    tasks = make_tile_tasks(utm_path, buffer_size, boundary_utm, tile_size, cap_style)
+    if pool is not None:
+        return float(sum(pool.map(calc_tile_buffer_area, tasks)))
+    if processes == 1 or len(tasks) == 1:
+        return float(sum(map(calc_tile_buffer_area, tasks)))
+    with Pool(processes=processes) as pool:
+        return float(sum(pool.map(calc_tile_buffer_area, tasks)))
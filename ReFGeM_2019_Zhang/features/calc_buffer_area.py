@@ -1,7 +1,15 @@
+from time import time
+
+import numpy as np
+import pandas as pd
 from shapely.geometry import LineString
-from shapely.ops import cascaded_union
+from shapely.ops import unary_union
 
-from ReFGeM.features.calc_spatial_temporal_entropy_rate import sample_by_duty_cycle
+from .DatasetConfiguration import get_dataset_parameters
+from .buffer_raster import BUFFER_AREA_CURVE_RADII, PathDistanceField, calc_buffer_area_curve, calc_buffer_area_raster
+from .buffer_union import calc_buffer_area_tiled
+from .path_simplifier import simplify_path
+from .temporal_pyramid import TemporalPyramid
 
 """
 This script calculate the buffer area around the GPS path [grid_x, grid_y]
@@ -10,48 +18,37 @@ and return the area of the buffer
 #
 # line = LineString([(0, 0), (1, 1), (0, 2), (2, 2), (3, 1), (1, 0)])
 # dilated = line.buffer(0.5, cap_style=3)
+# Taxi records are downsampled from 1 minute to 5 minutes before buffering
+TAXI_BUFFER_DUTY_CYCLE_RATIO = 5
+# "vector": union of the shapely buffers of the path segments, the exact area
+# "raster": the area of "vector" counted on a grid of pixels, see buffer_raster for the error bound
+# "tiled": the exact area of "vector", unioned on spatial tiles over city_boundary_utm by a pool of processes
+BUFFER_AREA_ENGINE = "vector"
+# Tolerance in meters of the Douglas-Peucker simplification of the path before buffering the segments, e.g.
+# path_simplifier.DEFAULT_SIMPLIFICATION_TOLERANCE, None to buffer all segments
+BUFFER_SIMPLIFICATION_TOLERANCE = None
 
 
 
-def sample_by_cell_size(df, cell_size_ratio=16):
-    """Represent the locations with different cell size
-    :param df:  dataframe of GPS location list, must include columns "grid_x" and "grid_y"
-    :param cell_size_ratio: ratio between the minimum cell size and current cell size
-    :return: dataframe with new "grid_x" and "grid_y" with new cell size
-    """
-    df.loc[:, ['grid_x']] = df.loc[:, ['grid_x']] // cell_size_ratio
-    df.loc[:, ['grid_y']] = df.loc[:, ['grid_y']] // cell_size_ratio
-    return df
-
-
-def combine_grid_x_and_grid_y(row):
-    return str(row['grid_x']) + str(row['grid_y'])
+def get_consecutive_duplicate_mask(gps_df, columns):
+    """Return the mask of records whose location differs from the previous record, the first record is kept"""
+    values = gps_df[columns].values
+    mask = np.ones(values.shape[0], dtype=bool)
+    mask[1:] = (values[1:] != values[:-1]).any(axis=1)
+    return mask
 
 
 def remove_consecutive_duplicate_locations_from_gps_dataframe(gps_df):
     if 'grid_x' in gps_df.columns and 'grid_y' in gps_df.columns:
-        gps_df['grid_xy'] = gps_df.apply(combine_grid_x_and_grid_y, axis=1)
-        mask = gps_df['grid_xy'].shift() != gps_df['grid_xy']
-        gps_df_new = gps_df.loc[mask]
-        return gps_df_new
+        return gps_df.loc[get_consecutive_duplicate_mask(gps_df, ['grid_x', 'grid_y'])]
     else:
         print("Columns grid_x or grid_y are not in the dataframe!")
         exit(0)
 
 
-def combine_grid_x_and_grid_y_utm(row):
-    return str(row['easting']) + str(row['northing'])
-
-
 def remove_consecutive_duplicate_locations_from_gps_dataframe_utm(gps_df):
     if 'easting' in gps_df.columns and 'northing' in gps_df.columns:
-        gps_df['utm'] = gps_df.apply(combine_grid_x_and_grid_y_utm, axis=1)
-        # gps_df.to_csv("gps_with_utm.csv")
-        mask = gps_df['utm'].shift() != gps_df['utm']
-        gps_df_new = gps_df.loc[mask]
-        del gps_df_new['utm']
-        # gps_df_new.to_csv("gps_duplicate_removed.csv")
-        return gps_df_new
+        return gps_df.loc[get_consecutive_duplicate_mask(gps_df, ['easting', 'northing'])]
     else:
         print("Columns grid_x or grid_y are not in the dataframe!")
         exit(0)
@@ -84,22 +81,108 @@ def calc_buffer_area(df, dataset_id, buffer_size=1):
     return buffer_path.area
 
 
-def calc_buffer_area_cascaded_union(df, dataset_id, buffer_size=200):
+def get_utm_path(df, dataset_id, temporal_pyramid=None):
+    """
+    Return the path [[easting, northing]] used for the buffer area, Taxi records are downsampled and consecutive
+    duplicate locations are removed
+    :param temporal_pyramid: TemporalPyramid of df, only used for downsampling Taxi records, built if None
+    """
     if dataset_id == "Taxi":
-        df = sample_by_duty_cycle(df, 5)
+        if temporal_pyramid is None:
+            temporal_pyramid = TemporalPyramid(df['DutyCycle'], [TAXI_BUFFER_DUTY_CYCLE_RATIO])
+        df = temporal_pyramid.sample(df, TAXI_BUFFER_DUTY_CYCLE_RATIO)
     df = df.round({'easting': 2, 'northing': 2})
     print(df.shape)
     df_remove_duplicates = remove_consecutive_duplicate_locations_from_gps_dataframe_utm(df)
-    utm_path = df_remove_duplicates.loc[:, ['easting', 'northing']].values.tolist()
-    path_segments = []
-    for idx in range(len(utm_path)-1):
-        p1, p2 = utm_path[idx], utm_path[idx+1]
-        path_segments.append(LineString((p1, p2)))
+    return df_remove_duplicates.loc[:, ['easting', 'northing']].values
+
+
+def calc_buffer_area_vector(utm_path, buffer_size, cap_style=3):
+    """Return the area of the union of the buffers of the path segments"""
     buffer_segments = []
-    for seg in path_segments:
-        buffer_segments.append(seg.buffer(buffer_size, cap_style=3))
-    union_buffer = gpd.GeoSeries(cascaded_union(buffer_segments))
-    return union_buffer.area.values[0]
+    for idx in range(len(utm_path)-1):
+        seg = LineString((utm_path[idx], utm_path[idx+1]))
+        buffer_segments.append(seg.buffer(buffer_size, cap_style=cap_style))
+    return unary_union(buffer_segments).area
+
+
+def calc_simplification_area_deviation(utm_path, simplified_path, buffer_size):
+    """
+    Return the change of the buffer area caused by the simplification of a path, measured with the raster engine on
+    one grid for both paths. The distance of the removed vertices doesn't bound this change for the square capped
+    segment buffers of the vector and tiled engines, since removing a vertex also removes the corners of its caps.
+    The raster error mostly cancels in the difference where both buffers are the same, the change of the vector area is
+    within calc_error_bound of both fields of the measured change.
+    """
+    if len(utm_path) < 2:
+        return 0.0
+    field = PathDistanceField(utm_path, buffer_size)
+    simplified_field = PathDistanceField(simplified_path, buffer_size, grid_path=utm_path)
+    return abs(field.calc_buffer_area(buffer_size) - simplified_field.calc_buffer_area(buffer_size))
+
+
+def simplify_utm_path(utm_path, simplification_tolerance, buffer_size):
+    """
+    Simplify the path before buffering its segments
+    :return: (simplified path, number of removed vertices, change of the buffer area of buffer_size in square meters,
+        see calc_simplification_area_deviation)
+    """
+    simplified_path = simplify_path(utm_path, simplification_tolerance)
+    if simplified_path.removed_vertices == 0:
+        return simplified_path.path, 0, 0.0
+    area_deviation = calc_simplification_area_deviation(utm_path, simplified_path.path, buffer_size)
+    print("Simplification removed", simplified_path.removed_vertices, "of", len(utm_path),
+          "vertices, the largest distance of a removed vertex to the simplified path is", simplified_path.max_distance,
+          "and the buffer area changed by", area_deviation)
+    return simplified_path.path, simplified_path.removed_vertices, area_deviation
+
+
+def calc_buffer_area_cascaded_union(df, dataset_id, buffer_size=200, temporal_pyramid=None, engine=None, pool=None,
+                                    simplification_tolerance=BUFFER_SIMPLIFICATION_TOLERANCE,
+                                    return_simplification=False):
+    """
+    :param temporal_pyramid: TemporalPyramid of df, only used for downsampling Taxi records, built if None
+    :param engine: "vector", "raster" or "tiled", BUFFER_AREA_ENGINE if None. All engines measure the union of the
+        square capped buffers of the segments
+    :param pool: multiprocessing pool of the tiled engine, a new pool is created for each call if None
+    :param simplification_tolerance: tolerance in meters of the Douglas-Peucker simplification of the path before
+        buffering its segments with the vector and tiled engines, None to buffer all segments
+    :param return_simplification: also return the number of vertices removed by the simplification and the change of
+        the buffer area it caused, see simplify_utm_path
+    :return: buffer area, or (buffer area, removed vertices, area deviation) if return_simplification
+    """
+    if engine is None:
+        engine = BUFFER_AREA_ENGINE
+    utm_path = get_utm_path(df, dataset_id, temporal_pyramid)
+    removed_vertices, area_deviation = 0, 0.0
+    if engine in ("vector", "tiled") and simplification_tolerance is not None:
+        utm_path, removed_vertices, area_deviation = simplify_utm_path(utm_path, simplification_tolerance, buffer_size)
+    if engine == "vector":
+        buffer_area = calc_buffer_area_vector(utm_path, buffer_size)
+    elif engine == "raster":
+        buffer_area = calc_buffer_area_raster(utm_path, buffer_size)
+    elif engine == "tiled":
+        boundary_utm = get_dataset_parameters(dataset_id).city_boundary_utm
+        buffer_area = calc_buffer_area_tiled(utm_path, buffer_size, boundary_utm, pool=pool)
+    else:
+        raise ValueError("Unknown buffer area engine " + str(engine))
+    if return_simplification:
+        return buffer_area, removed_vertices, area_deviation
+    return buffer_area
+
+
+def calc_buffer_area_curve_of_participant(df, dataset_id, radii=None, temporal_pyramid=None):
+    """
+    Calculate the area vs radius curve of the buffer around the path of a participant with the raster engine. The
+    buffer is the one of the buffer_area feature, the union of the square capped buffers of the segments of the same
+    path, so the area at radius 200 is the buffer_area of calc_buffer_area_cascaded_union (without simplification)
+    within the error bound of buffer_raster.PathDistanceField.calc_error_bound
+    :param radii: list of buffer radii in meters, BUFFER_AREA_CURVE_RADII if None
+    :return: list of areas in square meters in the order of radii
+    """
+    if radii is None:
+        radii = BUFFER_AREA_CURVE_RADII
+    return calc_buffer_area_curve(get_utm_path(df, dataset_id, temporal_pyramid), radii)
 
 
 if __name__ == '__main__':
@@ -1,19 +1,77 @@
 import numpy as np
 from scipy.spatial import ConvexHull
 
-from ReFGeM.features import sample_by_cell_size
+from .grid_index import GridIndex, pack_cell_ids
 
+"""
+Convex hull volumes of grid cells.
+Locations on a grid are mostly duplicate cells, and a cell strictly between the lowest and the highest cell of its grid
+column is never a vertex of the hull. So the hull of the records is the hull of at most two cells per grid column, which
+gives the same volume with far fewer input points for qhull.
+Top N hulls are nested: the hull of the top 10 places is the hull of the vertices of the top 5 hull and places 6 to 10,
+so the hulls of a ranked list of places are computed incrementally.
+"""
 
-def calc_convex_hull_volume(df):
+
+def reduce_to_column_extremes(grid_x, grid_y):
+    """
+    Keep the lowest and the highest cell of each grid column, the only cells that can be vertices of the hull
+    :param grid_x: array of integer grid x indices
+    :param grid_y: array of integer grid y indices
+    :return: array [[grid_x, grid_y]] of the unique extreme cells
+    """
+    grid_x = np.asarray(grid_x, dtype=np.int64)
+    grid_y = np.asarray(grid_y, dtype=np.int64)
+    if grid_x.size == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    order = np.argsort(pack_cell_ids(grid_x, grid_y), kind='stable')
+    sorted_x = grid_x[order]
+    sorted_y = grid_y[order]
+    column_start = np.ones(sorted_x.size, dtype=bool)
+    column_start[1:] = sorted_x[1:] != sorted_x[:-1]
+    column_end = np.ones(sorted_x.size, dtype=bool)
+    column_end[:-1] = column_start[1:]
+    extremes = column_start | column_end
+    return np.column_stack((sorted_x[extremes], sorted_y[extremes]))
+
+
+def calc_convex_hull_volume_of_cells(grid_x, grid_y):
+    """Return the volume of the convex hull of grid cells, duplicate and interior cells are removed first"""
+    hull = ConvexHull(reduce_to_column_extremes(grid_x, grid_y))
+    return hull.volume
+
+
+def calc_nested_convex_hull_volumes(coordinates_array, n_list):
+    """
+    Calculate the convex hull volume of the top n points of a ranked list for each n, reusing the vertices of the
+    previous hull
+    :param coordinates_array: array [[x, y]] of points sorted by rank
+    :param n_list: list of N, e.g. TOP_N_LIST
+    :return: list of volumes in the order of n_list, the same as ConvexHull(coordinates_array[:n]).volume
+    """
+    coordinates_array = np.asarray(coordinates_array, dtype=np.float64)
+    volumes = {}
+    vertices = np.zeros((0, 2), dtype=np.float64)
+    previous_n = 0
+    for n in sorted(set(n_list)):
+        # head(n) keeps all points if there are fewer than n
+        n = min(n, coordinates_array.shape[0])
+        candidates = np.concatenate((vertices, coordinates_array[previous_n:n]))
+        hull = ConvexHull(candidates)
+        volumes[n] = hull.volume
+        vertices = candidates[hull.vertices]
+        previous_n = n
+    return [volumes[min(n, coordinates_array.shape[0])] for n in n_list]
+
+
+def calc_convex_hull_volume(df, grid_index=None):
     """Calculate the convex hull of all locations of each participant and return volume of the convex hull.
     Keyword arguments:
         utm_coordinates_array -- array of grid_x and grid_y of the same participant
+        grid_index -- GridIndex of df, built if None
     Return:
         the volume of the constructed convex hull
     """
-    df = sample_by_cell_size(df, 16)
-    grid_coordinates = df[['grid_x', 'grid_y']]
-    grid_coordinates_arr = np.array(grid_coordinates)
-    hull = ConvexHull(grid_coordinates_arr)
-    return hull.volume
-
+    if grid_index is None:
+        grid_index = GridIndex(df['grid_x'], df['grid_y'])
+    return calc_convex_hull_volume_of_cells(*grid_index.get_level(16))
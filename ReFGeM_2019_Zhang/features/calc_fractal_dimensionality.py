@@ -6,6 +6,10 @@ from scipy.optimize import curve_fit
 from sklearn.metrics import mean_squared_error
 import csv
 import os
+from .DatasetConfiguration import get_dataset_parameters
+from .box_counting import calc_box_counting_curve, get_dataset_extent
+from .participant_store import ParticipantStore
+from .results_store import ResultsStore
 
 # CONFIGURE
 MODE = "gps_bin_100_no_dutycycle"
@@ -13,6 +17,8 @@ DATASET = "SHED9"
 RESULT_BASE_DIRECTORY = "../results/"
 DATA_BASE_DIRECTORY = "/Volumes/Seagate_Rui/dimensionality/data/"
 DATA_FILE_SUFFIX = ".mbparam"
+# "mbparam" reads the S(epsilon) files of the external tool, "box_counting" computes S(epsilon) from the participant store
+DIMENSIONALITY_ENGINE = "mbparam"
 
 # END CONFIGURE
 
@@ -42,31 +48,66 @@ def set_output_file_name(dataset_id):
     return dataset_directory, participant_file, dataset_file
 
 
-def calculate_dimensionality_by_participant(dataset_id):
-    data_directory, dims_by_participant_file, dim_across_dataset_file = set_output_file_name(dataset_id)
-    sample_epsilon = np.linspace(0.00001, 0.1, num=10000)
-    func_para_by_participant = []
-    func_across_dataset = []
+def read_mbparam_curves(data_directory):
+    """Yield (user_id, epsilon, S) of each .mbparam file, the user_id of the whole dataset is all_participants"""
     for file_name in os.listdir(data_directory):
         if file_name.endswith(DATA_FILE_SUFFIX):
             print(file_name)
             file_path = os.path.join(data_directory, file_name)
             user_id = extract_userid_from_filename(file_name)
             epsilon_S = pd.read_csv(file_path)
-            epsilon = np.array(epsilon_S['epsilon'])
-            S = np.array(epsilon_S['S'])
-
-            fitParams, fitCovariances = curve_fit(fit_func, epsilon, S)
-            S_fit = fit_func(epsilon, fitParams[0], fitParams[1], fitParams[2])
-            dim = max(fit_func(sample_epsilon, fitParams[0], fitParams[1], fitParams[2]))
-            mse = mean_squared_error(S, S_fit)
-            if user_id != "all_participants":
-                func_para_by_participant.append([user_id, fitParams[0], fitParams[1], fitParams[2], mse, dim])
-            else:
-                func_across_dataset.append([user_id, fitParams[0], fitParams[1], fitParams[2], mse, dim])
+            yield user_id, np.array(epsilon_S['epsilon']), np.array(epsilon_S['S'])
+
+
+def calc_box_counting_curves(dataset_id):
+    """Yield (user_id, epsilon, S) of each participant of the participant store and of all participants together"""
+    dataset_configuration = get_dataset_parameters(dataset_id)
+    extent = get_dataset_extent(dataset_configuration.city_boundary_utm)
+    participant_store = ParticipantStore(dataset_configuration.participant_store_directory)
+    cells_list = []
+    for user_id in participant_store.list_participants():
+        print("Box counting of user", user_id)
+        cells = participant_store.read_participant(user_id, ['grid_x', 'grid_y']).drop_duplicates()
+        cells_list.append(cells)
+        curve = calc_box_counting_curve(cells['grid_x'], cells['grid_y'], dataset_configuration.min_cell_size, extent)
+        yield user_id, np.array(curve['epsilon']), np.array(curve['S'])
+    if cells_list:
+        cells = pd.concat(cells_list)
+        curve = calc_box_counting_curve(cells['grid_x'], cells['grid_y'], dataset_configuration.min_cell_size, extent)
+        yield "all_participants", np.array(curve['epsilon']), np.array(curve['S'])
+
+
+def fit_dimensionality(epsilon, S, sample_epsilon):
+    """Fit S(epsilon) with fit_func, return [fit_params_0, fit_params_1, fit_params_2, mse, dim]"""
+    fitParams, fitCovariances = curve_fit(fit_func, epsilon, S)
+    S_fit = fit_func(epsilon, fitParams[0], fitParams[1], fitParams[2])
+    dim = max(fit_func(sample_epsilon, fitParams[0], fitParams[1], fitParams[2]))
+    mse = mean_squared_error(S, S_fit)
+    return [fitParams[0], fitParams[1], fitParams[2], mse, dim]
+
+
+def calculate_dimensionality_by_participant(dataset_id, engine=DIMENSIONALITY_ENGINE):
+    data_directory, dims_by_participant_file, dim_across_dataset_file = set_output_file_name(dataset_id)
+    sample_epsilon = np.linspace(0.00001, 0.1, num=10000)
+    func_para_by_participant = []
+    func_across_dataset = []
+    if engine == "mbparam":
+        curves = read_mbparam_curves(data_directory)
+    elif engine == "box_counting":
+        curves = calc_box_counting_curves(dataset_id)
+    else:
+        raise ValueError("Unknown dimensionality engine " + str(engine))
+    for user_id, epsilon, S in curves:
+        if user_id != "all_participants":
+            func_para_by_participant.append([user_id] + fit_dimensionality(epsilon, S, sample_epsilon))
+        else:
+            func_across_dataset.append([user_id] + fit_dimensionality(epsilon, S, sample_epsilon))
     columns = ['user_id', 'fit_params_0', 'fit_params_1', 'fit_params_2', 'mse', 'dim']
     write_list_to_csv(func_para_by_participant, columns, dims_by_participant_file)
     write_list_to_csv(func_across_dataset, columns, dim_across_dataset_file)
+    results_store = ResultsStore()
+    results_store.upsert('dimensionality', dataset_id, pd.DataFrame(func_para_by_participant, columns=columns))
+    results_store.close()
 
 
 
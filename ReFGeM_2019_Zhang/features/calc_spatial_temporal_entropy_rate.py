@@ -2,6 +2,10 @@ import pandas as pd
 import subprocess
 from time import time
 
+from .grid_index import GridIndex
+from .lz_entropy import LAMBDA_SUM_FUNCTIONS, calc_lz_entropy_rate, calc_lz_entropy_rate_of_grid
+from .temporal_pyramid import TemporalPyramid
+
 """Configuration"""
 MIN_CELL_SIZE = 15.625
 BASE_SAMPLING_RATE_0 = 5
@@ -20,6 +24,12 @@ TEMPORARY_OUTPUT_FILE_PATH = "temp.csv"
 # File path of executable program for calculating lzEntropy
 EXECUTABLE_ENTROPY_RATE_FILE = "/Users/ruizhang/Dropbox/dimensionality_activity_space_0326/src/" \
                                "lz_entropy_rate-master/Debug/lzEntropy"
+# "suffix_automaton": calculate lzEntropy in process in linear time,
+# "python": calculate lzEntropy in process with the same search as the executable,
+# "executable": call EXECUTABLE_ENTROPY_RATE_FILE on a scratch file, TEMPORARY_OUTPUT_FILE_PATH by default
+ENTROPY_RATE_BACKEND = "suffix_automaton"
+# Columns read from the participant store for calculating entropy rate
+ENTROPY_RATE_USEFUL_COLUMNS = ['DutyCycle', 'grid_x', 'grid_y']
 
 
 """End of Configuration"""
@@ -31,17 +41,8 @@ def sample_by_duty_cycle(df, duty_cycle_ratio):
     :param sample_rate: ratio between the base duty cycle and current processing duty cycle
     :return: dataframe under new duty cycle
     """
-    if duty_cycle_ratio == 1:
-        return df
-    else:
-        # print(df.loc[2, 'DutyCycle'])
-        df.loc[:, ['DutyCycle']] = df.loc[:, ['DutyCycle']] // duty_cycle_ratio
-        # print(duty_cycle_ratio)
-        # print(df.loc[2,'DutyCycle'])
-        # print()
-        sampled_df = pd.DataFrame(df.groupby('DutyCycle').first().reset_index())
-        # compressed_df.to_csv("/Users/ruizhang/Dropbox/dimensionality_activity_space_0326/src/new_metrics/temp.csv")
-        return sampled_df
+    # To sample the same records with several ratios, build a TemporalPyramid once and use TemporalPyramid.sample
+    return TemporalPyramid(df['DutyCycle'], [duty_cycle_ratio]).sample(df, duty_cycle_ratio)
 
 
 def sample_by_cell_size(df, cell_size_ratio):
@@ -50,10 +51,55 @@ def sample_by_cell_size(df, cell_size_ratio):
     :param cell_size_ratio: ratio between the minimum cell size and current cell size
     :return: dataframe with new "grid_x" and "grid_y" with new cell size
     """
-    df.loc[:, ['grid_x']] = df.loc[:, ['grid_x']] // cell_size_ratio
-    df.loc[:, ['grid_y']] = df.loc[:, ['grid_y']] // cell_size_ratio
-    df.to_csv(TEMPORARY_OUTPUT_FILE_PATH, index=False)
-    return df
+    # To sample the same records with several ratios, build a GridIndex once and use GridIndex.sample
+    return GridIndex(df['grid_x'], df['grid_y']).sample(df, cell_size_ratio)
+
+
+def calc_entropy_rate_with_executable(df, scratch_file=None):
+    """
+    Save the grid coordinates to the scratch file and calculate entropy rate with the lzEntropy program
+    :param scratch_file: input file of the program, TEMPORARY_OUTPUT_FILE_PATH if None
+    """
+    if scratch_file is None:
+        scratch_file = TEMPORARY_OUTPUT_FILE_PATH
+    df.to_csv(scratch_file, index=False)
+    entropy_rate = subprocess.check_output([EXECUTABLE_ENTROPY_RATE_FILE, scratch_file])
+    return float(entropy_rate.decode("utf-8"))
+
+
+def calc_entropy_rate(df, backend=None, scratch_file=None):
+    """
+    Calculate the LZ entropy rate of the sequence of grid cells
+    :param df: dataframe with columns "grid_x" and "grid_y"
+    :param backend: "suffix_automaton", "python" or "executable", ENTROPY_RATE_BACKEND if None
+    :param scratch_file: input file of the "executable" backend, TEMPORARY_OUTPUT_FILE_PATH if None
+    :return: entropy rate H
+    """
+    if backend is None:
+        backend = ENTROPY_RATE_BACKEND
+    if backend in LAMBDA_SUM_FUNCTIONS:
+        return calc_lz_entropy_rate_of_grid(df, backend)
+    elif backend == "executable":
+        return calc_entropy_rate_with_executable(df, scratch_file)
+    else:
+        raise ValueError("Unknown entropy rate backend " + str(backend))
+
+
+def calc_entropy_rate_of_grid_level(grid_index, cell_size_ratio, backend=None, scratch_file=None):
+    """
+    Calculate the LZ entropy rate of the sequence of cells of a level of a GridIndex, the in-process backends encode
+    the packed cell ids directly without building a dataframe
+    :param grid_index: GridIndex of the sequence of records
+    :param cell_size_ratio: ratio between the minimum cell size and current cell size
+    :param backend: "suffix_automaton", "python" or "executable", ENTROPY_RATE_BACKEND if None
+    :param scratch_file: input file of the "executable" backend, TEMPORARY_OUTPUT_FILE_PATH if None
+    :return: entropy rate H
+    """
+    if backend is None:
+        backend = ENTROPY_RATE_BACKEND
+    if backend in LAMBDA_SUM_FUNCTIONS:
+        return calc_lz_entropy_rate(grid_index.get_symbols(cell_size_ratio), LAMBDA_SUM_FUNCTIONS[backend])
+    return calc_entropy_rate(grid_index.get_level_dataframe(cell_size_ratio), backend, scratch_file)
 
 
 def save_list_to_file(list_to_save, output_file, column_names):
@@ -61,41 +107,48 @@ def save_list_to_file(list_to_save, output_file, column_names):
     df.to_csv(output_file, index=False)
 
 
-def calc_spatial_temporal_entropy_parameters(df, base_duty_cycle,temporal_sampling_rate_list, spatial_sampling_rate_list, output_file):
+def calc_spatial_temporal_entropy_parameters(df, base_duty_cycle,temporal_sampling_rate_list, spatial_sampling_rate_list, output_file,
+                                             backend=None, scratch_file=None):
     """
     This function calculate the list of [T, D, L, H] for aggregated grid coordinates dataframe
     :param df: aggregated grid coordinates dataframe with columns ['DutyCycle', 'grid_x', 'grid_y']
     :param temporal_sampling_rate_list: Sampling rate based on basic_duty_cycle
+    :param backend: backend of lzEntropy, see calc_entropy_rate
+    :param scratch_file: input file of the "executable" backend, see calc_entropy_rate
     :return: Save parameter list to csv file and return 0
     """
     entropy_rate_list = []
-    df['grid_x'] = df['grid_x'].apply(lambda x: int(x))
-    df['grid_y'] = df['grid_y'].apply(lambda x: int(x))
+    temporal_pyramid = TemporalPyramid(df['DutyCycle'], temporal_sampling_rate_list)
+    grid_index = GridIndex(df['grid_x'], df['grid_y'])
     for duty_cycle_ratio in temporal_sampling_rate_list:
         print("duty cycle ratio is", duty_cycle_ratio)
-        temporal_sampled_df = sample_by_duty_cycle(df.copy(deep=True), duty_cycle_ratio)
-        L = temporal_sampled_df.shape[0]
+        temporal_sampled_grid_index = grid_index.take(temporal_pyramid.get_row_index(duty_cycle_ratio))
+        L = len(temporal_sampled_grid_index)
         T = base_duty_cycle * duty_cycle_ratio
         for cell_size_ratio in spatial_sampling_rate_list:
             print("cell size ratio is",cell_size_ratio)
             D = MIN_CELL_SIZE * cell_size_ratio
-            # t0 = time()
-            # print("step1")
-            tsd = temporal_sampled_df[['grid_x', 'grid_y']].copy(deep=True)
-            # t1 = time()
-            # print("Deep copy takes", t1-t0)
-            # spatial_sampled_df is saved to file in the function, so no need to return a dataframe
-            sample_by_cell_size(tsd, cell_size_ratio)
             # t2 = time()
-            # print("Sample by cell size takes", t2-t1)
-            entropy_rate = subprocess.check_output([EXECUTABLE_ENTROPY_RATE_FILE, TEMPORARY_OUTPUT_FILE_PATH])
+            H = calc_entropy_rate_of_grid_level(temporal_sampled_grid_index, cell_size_ratio, backend, scratch_file)
             # t3 = time()
             # print("Call entropy rate function takes", t3-t2)
-            H = float(entropy_rate.decode("utf-8"))
             entropy_rate_list.append([T, D, L, H])
             # break
     save_list_to_file(entropy_rate_list, output_file, ['T', 'D', 'L', 'H'])
 
+def calc_spatial_temporal_entropy_parameters_of_participant(participant_store, user_id, base_duty_cycle,
+                                                            temporal_sampling_rate_list, spatial_sampling_rate_list,
+                                                            output_file, backend=None, scratch_file=None):
+    """
+    Calculate the list of [T, D, L, H] of a participant, only the partition of the participant and the columns
+    ['DutyCycle', 'grid_x', 'grid_y'] are read from the participant store
+    :param participant_store: ParticipantStore of records aggregated by duty cycles
+    """
+    df = participant_store.read_participant(user_id, ENTROPY_RATE_USEFUL_COLUMNS)
+    calc_spatial_temporal_entropy_parameters(df, base_duty_cycle, temporal_sampling_rate_list,
+                                             spatial_sampling_rate_list, output_file, backend, scratch_file)
+
+
 # if __name__ == '__main__':
 #     df = pd.read_csv("/Volumes/Seagate_Rui/dimensionality/data/Vancouver/gps/5231.csv-300.csv",usecols=[0,1,7,8])
 #     entropy_rate_list = []
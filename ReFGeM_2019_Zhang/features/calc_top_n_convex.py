@@ -3,6 +3,9 @@ import numpy as np
 from scipy.spatial import ConvexHull
 from time import time
 
+from .calc_convex_hull import calc_nested_convex_hull_volumes
+from .grid_index import GridIndex
+from .stay_detector import summarize_visited_places
 
 
 """
@@ -12,29 +15,30 @@ and calculate the convex hull area derived from the top N places
 
 TOP_N_LIST = [5, 10, 15, 20]
 
-def sort_visited_places_by_dwelling(df):
+def sort_visited_places_by_dwelling(df, visited_places=None):
     """
     This function sorts all places by total dwelling time
     :param df: dataframe of gps records aggregated by duty cycles
-    :param n: the count of places considering in calculating convex hull
-    :return: top n places [grid_x, grid_y, count_of_dc]
+    :param visited_places: summary of df from stay_detector.summarize_visited_places, computed if None
+    :return: places where the participant stayed [grid_x, grid_y, dwelling_duty_cycle]
     """
-    # print("a")
-    df_shift = df.shift(periods=1, axis=0)
-    df_diff = df - df_shift
-    df_diff.columns = ['dwelling_duty_cycle', 'grid_x_diff', 'grid_y_diff']
-    df_dwelling = pd.concat([df_shift, df_diff], axis=1)
-    df_dwelling = df_dwelling.drop([0])
-    # df_dwelling.to_csv("tempppp.csv")
-    df_dwelling = df_dwelling[(df_dwelling['grid_x_diff']==0) & (df_dwelling['grid_y_diff']==0)]
-    df_dwelling_summary = df_dwelling.groupby(['grid_x','grid_y']).agg({'dwelling_duty_cycle':'sum'}).reset_index()
+    if visited_places is None:
+        visited_places = summarize_visited_places(df)
+    # only places with at least two consecutive records have a dwelling time
+    df_dwelling_summary = visited_places.loc[visited_places['stays'] > 0, ['grid_x', 'grid_y', 'dwelling_duty_cycle']]
+    df_dwelling_summary = df_dwelling_summary.reset_index(drop=True)
     df_dwelling_sorted = df_dwelling_summary.sort_values(by=['dwelling_duty_cycle'],ascending=False)
     return df_dwelling_sorted
 
 
-def sort_visited_places_by_occurences(df):
-    df_grouped = df.groupby(['grid_x', 'grid_y']).size().reset_index()
-    df_grouped.columns = ['grid_x','grid_y','occurences']
+def sort_visited_places_by_occurences(df, visited_places=None):
+    """
+    :param visited_places: summary of df from stay_detector.summarize_visited_places, computed if None
+    :return: all places [grid_x, grid_y, occurences]
+    """
+    if visited_places is None:
+        visited_places = summarize_visited_places(df)
+    df_grouped = visited_places.loc[:, ['grid_x', 'grid_y', 'occurences']]
     df_grouped_sorted = df_grouped.sort_values(['occurences'], ascending=False)
     return df_grouped_sorted
     
@@ -59,21 +63,6 @@ def calc_top_n_convex(file, use_cols, N):
     convex_volume = calc_convex_hull_volume_with_top_n_places(df_top_n.loc[:,['grid_x','grid_y']])
     # print(convex_volume)
 
-def sample_by_cell_size(df, cell_size_ratio=16):
-    """Represent the locations with different cell size
-    :param df:  dataframe of GPS location list, must include columns "grid_x" and "grid_y"
-    :param cell_size_ratio: ratio between the minimum cell size and current cell size
-    :return: dataframe with new "grid_x" and "grid_y" with new cell size
-    """
-    df.loc[:, ['grid_x']] = df.loc[:, ['grid_x']] // cell_size_ratio
-    df.loc[:, ['grid_y']] = df.loc[:, ['grid_y']] // cell_size_ratio
-    df['grid_x'] = df['grid_x'].apply(lambda x: int(x))
-    df['grid_y'] = df['grid_y'].apply(lambda x: int(x))
-    # df.loc[:,['grid_x']] = df['grid_x'].apply(lambda x: int(x))
-    # df.loc[:, ['grid_y']] = df['grid_y'].apply(lambda x: int(x))
-    return df
-
-
 # def calc_top_n_convex(df, n):
 #     df_cell_size_changed = sample_by_cell_size(df, 16)
 #     df_dwelling_sorted = sort_visited_places_by_occurences(df_cell_size_changed)
@@ -83,24 +72,27 @@ def sample_by_cell_size(df, cell_size_ratio=16):
 #     return convex_volume
 
 
-def calc_multiple_top_n_convex(df):
-    df = sample_by_cell_size(df, 16)
+def calc_multiple_top_n_convex(df, grid_index=None):
+    """
+    :param df: dataframe of gps records aggregated by duty cycles
+    :param grid_index: GridIndex of df, built if None
+    :return: convex hull volumes of the top N places by dwelling time, then by occurences, for N in TOP_N_LIST
+    """
+    if grid_index is None:
+        grid_index = GridIndex(df['grid_x'], df['grid_y'])
+    df = grid_index.sample(df, 16)
     df = df.loc[:,['DutyCycle', 'grid_x', 'grid_y']]
-    df_dwelling_sorted = sort_visited_places_by_dwelling(df)
+    visited_places = summarize_visited_places(df)
+    df_dwelling_sorted = sort_visited_places_by_dwelling(df, visited_places)
     # print(df_dwelling_sorted.head(20))
-    df_occurencecs_sorted = sort_visited_places_by_occurences(df)
+    df_occurencecs_sorted = sort_visited_places_by_occurences(df, visited_places)
     # print(df_occurencecs_sorted.head(20))
-    convex_list = []
-    for n in TOP_N_LIST:
-        # The following two sentences can be merged to one.
-        df_top_n = df_dwelling_sorted.head(n)
-        convex_volume = calc_convex_hull_volume_with_top_n_places(df_top_n.loc[:, ['grid_x', 'grid_y']])
-        convex_list.append(convex_volume)
-    for n in TOP_N_LIST:
-        # The following two sentences can be merged to one.
-        df_top_n = df_occurencecs_sorted.head(n)
-        convex_volume = calc_convex_hull_volume_with_top_n_places(df_top_n.loc[:, ['grid_x', 'grid_y']])
-        convex_list.append(convex_volume)
+    # the top N hulls of each ranking are nested, so they are computed incrementally from the largest N places
+    max_n = max(TOP_N_LIST)
+    convex_list = calc_nested_convex_hull_volumes(df_dwelling_sorted.loc[:, ['grid_x', 'grid_y']].head(max_n).values,
+                                                  TOP_N_LIST)
+    convex_list.extend(calc_nested_convex_hull_volumes(
+        df_occurencecs_sorted.loc[:, ['grid_x', 'grid_y']].head(max_n).values, TOP_N_LIST))
     # print(convex_list)
     return convex_list
 
@@ -0,0 +1,158 @@
+import csv
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+"""
+Manifest of the csv files of a dataset directory, e.g. the per participant files <user_id>.csv and
+<user_id>.csv-300.csv of <dataset>/gps/.
+Layout:
+    <directory>/_manifest.parquet    one row per csv file: file_name, user_id, size, mtime_ns, record_count,
+                                     start_time, end_time
+Record counts come from counting the newline bytes of the file in large buffers, and the time range from the
+TIME_COLUMNS column of the first and last records of the file if it has one, the files of participants being sorted
+by time. The manifest is cached in the directory, and a refresh only scans the
+files whose size or modification time changed, on a pool of processes.
+"""
+
+MANIFEST_FILE_NAME = "_manifest.parquet"
+MANIFEST_COLUMNS = ['file_name', 'user_id', 'size', 'mtime_ns', 'record_count', 'start_time', 'end_time']
+# Column of the time range, the first one found in the header is used. DutyCycle is kept as a number and record_time is
+# converted to seconds since the epoch
+TIME_COLUMNS = ['DutyCycle', 'record_time']
+READ_BUFFER_SIZE = 1 << 20
+
+
+def count_lines(file_path, buffer_size=READ_BUFFER_SIZE):
+    """Count the lines of a file, a last line without a newline is counted too"""
+    line_count = 0
+    last_byte = ord("\n")
+    with open(file_path, 'rb', buffering=0) as f:
+        buffer = bytearray(buffer_size)
+        while True:
+            read_size = f.readinto(buffer)
+            if not read_size:
+                break
+            line_count += buffer.count(b"\n", 0, read_size)
+            last_byte = buffer[read_size - 1]
+    return line_count if last_byte == ord("\n") else line_count + 1
+
+
+def read_last_line(file_path, buffer_size=READ_BUFFER_SIZE):
+    """Return the last non empty line of a file, read backwards from the end in buffers"""
+    with open(file_path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        tail = b""
+        while end > 0:
+            start = max(end - buffer_size, 0)
+            f.seek(start)
+            tail = f.read(end - start) + tail
+            end = start
+            stripped = tail.rstrip(b"\r\n")
+            if b"\n" in stripped:
+                return stripped[stripped.rindex(b"\n") + 1:].decode()
+        return tail.rstrip(b"\r\n").decode()
+
+
+def read_time_range(file_path):
+    """
+    Return (start_time, end_time) of the first TIME_COLUMNS column of the file, NaN if it has none. Only the first and
+    last records are read, the records of a file are sorted by time.
+    """
+    with open(file_path) as f:
+        header = next(csv.reader([f.readline().rstrip("\r\n")]))
+        first_line = f.readline().rstrip("\r\n")
+    for time_column in TIME_COLUMNS:
+        if time_column in header:
+            if not first_line:
+                break
+            column_index = header.index(time_column)
+            times = pd.Series([next(csv.reader([line]))[column_index]
+                               for line in [first_line, read_last_line(file_path)]])
+            numeric_times = pd.to_numeric(times, errors='coerce')
+            if numeric_times.notna().all():
+                times = numeric_times
+            else:
+                times = (pd.to_datetime(times) - pd.Timestamp(0)) / pd.Timedelta(seconds=1)
+            return float(times.min()), float(times.max())
+    return np.nan, np.nan
+
+
+def convert_manifest_types(df):
+    return df.astype({'file_name': object, 'user_id': object, 'size': np.int64, 'mtime_ns': np.int64,
+                      'record_count': np.int64, 'start_time': np.float64, 'end_time': np.float64})
+
+
+def get_user_id_from_file_name(file_name):
+    return file_name.split('.')[0]
+
+
+def scan_file(task):
+    """
+    Scan one file of the manifest
+    :param task: (directory, file_name, size, mtime_ns)
+    :return: row of the manifest, record_count excludes the header
+    """
+    directory, file_name, size, mtime_ns = task
+    file_path = os.path.join(directory, file_name)
+    record_count = max(count_lines(file_path) - 1, 0)
+    start_time, end_time = read_time_range(file_path)
+    return [file_name, get_user_id_from_file_name(file_name), size, mtime_ns, record_count, start_time, end_time]
+
+
+class DatasetManifest:
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_file_path = os.path.join(directory, MANIFEST_FILE_NAME)
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self):
+        if os.path.isfile(self.manifest_file_path):
+            return pd.read_parquet(self.manifest_file_path)
+        return convert_manifest_types(pd.DataFrame(columns=MANIFEST_COLUMNS))
+
+    def save_manifest(self):
+        self.manifest = self.manifest.sort_values(['file_name']).reset_index(drop=True)
+        self.manifest.to_parquet(self.manifest_file_path, index=False)
+
+    def list_files(self):
+        """Return [file_name, size, mtime_ns] of the csv files of the directory"""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".csv"):
+                    stat = entry.stat()
+                    files.append([entry.name, stat.st_size, stat.st_mtime_ns])
+        return pd.DataFrame(files, columns=['file_name', 'size', 'mtime_ns'])
+
+    def refresh(self, processes=None):
+        """
+        Scan the new and changed files, drop the removed files and save the manifest
+        :param processes: number of worker processes, os.cpu_count() if None, 1 to scan in this process
+        :return: the manifest
+        """
+        files = self.list_files()
+        cached = pd.merge(files, self.manifest, on=['file_name', 'size', 'mtime_ns'])
+        changed = files[~files['file_name'].isin(cached['file_name'])]
+        tasks = [(self.directory, file_name, int(size), int(mtime_ns))
+                 for file_name, size, mtime_ns in changed.itertuples(index=False, name=None)]
+        print(len(tasks), "of", len(files), "files to scan in", self.directory)
+        if processes == 1 or len(tasks) <= 1:
+            rows = list(map(scan_file, tasks))
+        else:
+            with Pool(processes=processes) as pool:
+                rows = pool.map(scan_file, tasks, chunksize=max(len(tasks) // (4 * (processes or os.cpu_count())), 1))
+        scanned = pd.DataFrame(rows, columns=MANIFEST_COLUMNS)
+        manifest_list = [df for df in [cached[MANIFEST_COLUMNS], scanned] if len(df)]
+        if manifest_list:
+            self.manifest = convert_manifest_types(pd.concat(manifest_list, ignore_index=True))
+        else:
+            self.manifest = convert_manifest_types(pd.DataFrame(columns=MANIFEST_COLUMNS))
+        self.save_manifest()
+        return self.manifest
+
+    def get_files(self, suffix):
+        """Return the rows of the files ending with suffix"""
+        return self.manifest[self.manifest['file_name'].str.endswith(suffix)].reset_index(drop=True)
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .record_standardizer import calc_duty_cycle_index
+
+"""
+Aggregate the processed GPS records of each participant by duty cycles.
+Records are bucketed by the base duty cycle of the dataset, starting from the first record of the study (the same
+reference as the battery duty cycles), and the first fix of each bucket represents the bucket. The result has a column
+"DutyCycle" and integer grid columns, and is saved to "<user_id>.csv-<seconds>.csv" files (used by FeatureExtractor and
+the data quality analysis) and to a participant store.
+"""
+
+AGGREGATED_COLUMNS = ['user_id', 'DutyCycle', 'record_time', 'lat', 'lon', 'easting', 'northing', 'grid_x', 'grid_y']
+
+
+def get_aggregated_file_suffix(base_duty_cycle):
+    """Return the suffix of aggregated gps files, e.g. ".csv-300.csv" for a 5 minutes duty cycle"""
+    duty_cycle_in_seconds = base_duty_cycle * 60
+    return ".csv-" + str(duty_cycle_in_seconds) + ".csv"
+
+
+def get_aggregated_store_directory(participant_store_directory, base_duty_cycle):
+    """Return the directory of the participant store of aggregated records, next to the store of all records"""
+    store_directory = os.path.normpath(participant_store_directory)
+    return store_directory + "-" + str(base_duty_cycle * 60) + "/"
+
+
+def aggregate_by_duty_cycle(gps_df, base_duty_cycle, study_start_time=None):
+    """
+    Keep the first GPS record of each duty cycle of each participant
+    :param gps_df: processed GPS records of one or more participants, with columns "user_id", "record_time", "grid_x"
+        and "grid_y"
+    :param base_duty_cycle: length of duty cycle in minutes
+    :param study_start_time: start time of the first duty cycle, the earliest record_time if None
+    :return: dataframe of aggregated records sorted by user_id and DutyCycle
+    """
+    record_time = pd.to_datetime(gps_df['record_time'])
+    if study_start_time is None:
+        study_start_time = record_time.min()
+    aggregated_df = gps_df.assign(record_time=record_time,
+                                  DutyCycle=calc_duty_cycle_index(record_time, study_start_time, base_duty_cycle))
+    aggregated_df = aggregated_df.sort_values(['user_id', 'record_time'], kind='mergesort')
+    aggregated_df = aggregated_df.drop_duplicates(['user_id', 'DutyCycle'], keep='first')
+    aggregated_df = aggregated_df.astype({'grid_x': np.int64, 'grid_y': np.int64})
+    columns = [column for column in AGGREGATED_COLUMNS if column in aggregated_df.columns]
+    return aggregated_df[columns].reset_index(drop=True)
+
+
+def save_aggregated_gps_to_user_files(aggregated_df, out_dir, base_duty_cycle):
+    suffix = get_aggregated_file_suffix(base_duty_cycle)
+    for user_id, data in aggregated_df.groupby('user_id'):
+        data.to_csv(out_dir + str(user_id) + suffix, index=False)
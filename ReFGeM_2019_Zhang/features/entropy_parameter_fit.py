@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import curve_fit
+
+"""
+Fit of the entropy rate surface H(T, D, L) of each participant with the five constants C1 ... C5 of
+    H = log2(L) / (C1 * D^2 / (4 T^2 L) + C2 / (4 T^2 L) + C3 * 2 D / (4 T^2 L) + C4 * D / (T L) + C5 / (T L))
+The inverse is linear in the constants, log2(L) / H = terms(T, D, L) . C, so the constants of all participants are
+found by one batched least squares solve of the linearized problem, padded to the same number of rows per participant
+(zero rows don't change a least squares solution). The columns of the terms are scaled to unit norm per participant
+before the solve because they differ by orders of magnitude.
+The linearized fit minimizes the error of log2(L) / H rather than of H. The optional refinement runs curve_fit on H
+for each participant starting from the linearized constants, which converges in a few iterations instead of the
+thousands of evaluations of a fit from the default initial guess.
+R-squared is computed on H as in other_process.fit_entropy_parameters.calc_r_squared.
+Participants with fewer valid rows than constants have no unique fit, their constants and R-squared are NaN.
+"""
+
+ENTROPY_PARAMETER_COLUMNS = ['C1', 'C2', 'C3', 'C4', 'C5']
+# Entropy rates of the two smallest cells are not used for the fit
+EXCLUDED_CELL_SIZES = [15.625, 31.25]
+REFINEMENT_MAX_FUNCTION_EVALUATIONS = 20000
+# Smallest number of valid rows of a participant to fit the constants
+MIN_FIT_ROWS = len(ENTROPY_PARAMETER_COLUMNS)
+
+
+def calc_model_terms(T, D, L):
+    """Return the array [[D^2 / (4 T^2 L), 1 / (4 T^2 L), 2 D / (4 T^2 L), D / (T L), 1 / (T L)]] of the rows"""
+    T, D, L = (np.asarray(values, dtype=np.float64) for values in (T, D, L))
+    inverse_4_t2_l = 1 / (4 * T ** 2 * L)
+    inverse_t_l = 1 / (T * L)
+    return np.stack([D ** 2 * inverse_4_t2_l, inverse_4_t2_l, 2 * D * inverse_4_t2_l, D * inverse_t_l, inverse_t_l],
+                    axis=-1)
+
+
+def calc_model_entropy_rate(x, c1, c2, c3, c4, c5):
+    """The model of other_process.fit_entropy_parameters.func, x is [T, D, L]"""
+    return np.log2(x[2]) / calc_model_terms(x[0], x[1], x[2]).dot([c1, c2, c3, c4, c5])
+
+
+def select_valid_rows(entropy_rate_df):
+    """Keep the rows with a nonzero entropy rate and a cell size that is not in EXCLUDED_CELL_SIZES"""
+    return entropy_rate_df.loc[(entropy_rate_df.H != 0) & ~entropy_rate_df.D.isin(EXCLUDED_CELL_SIZES)]
+
+
+def stack_participants(entropy_rate_df):
+    """
+    Pad the rows of each participant to the same number of rows
+    :param entropy_rate_df: dataframe [user_id, T, D, L, H] of all participants
+    :return: (user ids, array [participant, row, T/D/L/H], boolean mask [participant, row] of the real rows)
+    """
+    user_ids, participant_index = np.unique(np.asarray(entropy_rate_df['user_id']), return_inverse=True)
+    row_counts = np.bincount(participant_index, minlength=user_ids.size)
+    order = np.argsort(participant_index, kind='stable')
+    row_index = np.arange(order.size) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+    values = np.ones((user_ids.size, row_counts.max() if row_counts.size else 0, 4), dtype=np.float64)
+    mask = np.zeros(values.shape[:2], dtype=bool)
+    values[participant_index[order], row_index] = entropy_rate_df[['T', 'D', 'L', 'H']].to_numpy(np.float64)[order]
+    mask[participant_index[order], row_index] = True
+    return user_ids, values, mask
+
+
+def solve_linearized_parameters(values, mask):
+    """
+    Solve log2(L) / H = terms(T, D, L) . C for all participants at once
+    :param values: array [participant, row, T/D/L/H] of stack_participants
+    :param mask: boolean mask of the real rows
+    :return: array [participant, C1 ... C5]
+    """
+    terms = calc_model_terms(values[..., 0], values[..., 1], values[..., 2]) * mask[..., np.newaxis]
+    targets = np.where(mask, np.log2(values[..., 2]) / values[..., 3], 0)
+    scales = np.sqrt((terms ** 2).sum(axis=1))
+    scales[scales == 0] = 1
+    scaled_parameters = np.matmul(np.linalg.pinv(terms / scales[:, np.newaxis, :]), targets[..., np.newaxis])[..., 0]
+    return scaled_parameters / scales
+
+
+def calc_r_squared_of_participants(values, mask, parameters):
+    """Return the R-squared of the fitted H of each participant, the same as calc_r_squared"""
+    predictions = np.log2(values[..., 2]) / np.einsum('prk,pk->pr', calc_model_terms(values[..., 0], values[..., 1],
+                                                                                        values[..., 2]), parameters)
+    entropy_rates = values[..., 3]
+    residuals = np.where(mask, entropy_rates - predictions, 0)
+    means = np.where(mask, entropy_rates, 0).sum(axis=1) / mask.sum(axis=1)
+    deviations = np.where(mask, entropy_rates - means[:, np.newaxis], 0)
+    return 1 - (residuals ** 2).sum(axis=1) / (deviations ** 2).sum(axis=1)
+
+
+def refine_parameters(participant_values, initial_parameters, maxfev=REFINEMENT_MAX_FUNCTION_EVALUATIONS):
+    """Fit H with curve_fit from the linearized constants, keep them if the fit fails"""
+    try:
+        parameters, _ = curve_fit(calc_model_entropy_rate, participant_values[:, 0:3].T, participant_values[:, 3],
+                                  p0=initial_parameters, maxfev=maxfev)
+        return parameters
+    except (RuntimeError, TypeError, ValueError):
+        return initial_parameters
+
+
+def fit_entropy_parameters(entropy_rate_df, refine=False):
+    """
+    Fit C1 ... C5 of all participants of a dataset
+    :param entropy_rate_df: dataframe [user_id, T, D, L, H], with the rows of all participants
+    :param refine: refine the linearized constants by a nonlinear fit of H
+    :return: dataframe [user_id, C1, C2, C3, C4, C5, R_squared] sorted by user_id, NaN constants and R_squared for the
+        participants with fewer than MIN_FIT_ROWS valid rows
+    """
+    user_ids, values, mask = stack_participants(select_valid_rows(entropy_rate_df))
+    parameters = solve_linearized_parameters(values, mask)
+    underdetermined = mask.sum(axis=1) < MIN_FIT_ROWS
+    if underdetermined.any():
+        print(int(underdetermined.sum()), "participants have fewer than", MIN_FIT_ROWS, "valid rows and are not fitted:",
+              user_ids[underdetermined].tolist())
+    parameters[underdetermined] = np.nan
+    if refine:
+        for i in np.flatnonzero(~underdetermined):
+            parameters[i] = refine_parameters(values[i, mask[i]], parameters[i])
+    df = pd.DataFrame(parameters, columns=ENTROPY_PARAMETER_COLUMNS)
+    df.insert(0, 'user_id', user_ids)
+    df['R_squared'] = calc_r_squared_of_participants(values, mask, parameters)
+    return df
+
+
+def read_entropy_rate_files(entropy_rate_directory):
+    """Read the [T, D, L, H] file <user_id>.csv of each participant into one dataframe [user_id, T, D, L, H]"""
+    entropy_rate_list = []
+    for file_name in sorted(os.listdir(entropy_rate_directory)):
+        user_id = file_name.split('.')[0]
+        if not file_name.endswith(".csv") or not user_id.isdigit():
+            continue
+        df = pd.read_csv(os.path.join(entropy_rate_directory, file_name), usecols=['T', 'D', 'L', 'H'])
+        df.insert(0, 'user_id', int(user_id))
+        entropy_rate_list.append(df)
+    return pd.concat(entropy_rate_list, ignore_index=True)
@@ -0,0 +1,159 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from .DatasetConfiguration import get_dataset_parameters
+from .calc_spatial_temporal_entropy_rate import ENTROPY_RATE_USEFUL_COLUMNS, calc_spatial_temporal_entropy_parameters
+from .duty_cycle_aggregator import get_aggregated_store_directory
+from .feature_profiler import FeatureProfiler
+from .participant_pool import run_participant_tasks
+from .participant_store import ParticipantStore
+from .results_store import ResultsStore
+
+"""
+Run the spatial temporal entropy rate of all participants of a dataset, each participant in its own process with
+participant_pool.run_participant_tasks, the driver of FeatureExtractor, so a participant that fails, crashes or runs past
+the timeout is recorded in the run summary and does not stop the others.
+The [T, D, L, H] list of a participant is written to the partial file "<user_id>.csv.<pid>.part" of its process and
+renamed to "<entropy_rate_results_path>/<user_id>.csv" when it is complete, so the result file of a participant exists
+only if the participant is finished, and a rerun skips the finished participants. Runs sharing the output directory
+don't write to the same partial file, and a run only removes the partial files of processes that are not running
+anymore. Each participant has its own scratch directory for the input file of the lzEntropy executable, so concurrent
+participants don't overwrite each other's "temp.csv".
+The entropy rate of each participant is profiled with the FeatureProfiler of FeatureExtractor and its profile is upserted
+to the feature_profiles table of the results store as the "entropy_rate" feature.
+"""
+
+ENTROPY_RATE_RUN_SUMMARY_FILE_NAME = "entropy_rate_run_summary.csv"
+RUN_SUMMARY_COLUMNS = ['user_id', 'status', 'seconds', 'error']
+PARTIAL_FILE_SUFFIX = ".part"
+
+
+def get_entropy_rate_output_file(output_directory, user_id):
+    return os.path.join(output_directory, str(user_id) + ".csv")
+
+
+def is_participant_finished(output_directory, user_id):
+    return os.path.isfile(get_entropy_rate_output_file(output_directory, user_id))
+
+
+def get_partial_output_file(output_file, pid):
+    return output_file + "." + str(pid) + PARTIAL_FILE_SUFFIX
+
+
+def get_partial_file_pid(file_name):
+    """Return the pid of the process writing a partial file, None if the name has no pid"""
+    pid = file_name[:-len(PARTIAL_FILE_SUFFIX)].rsplit('.', 1)[-1]
+    return int(pid) if pid.isdigit() else None
+
+
+def is_process_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # the process exists but belongs to another user
+        return True
+    return True
+
+
+def remove_partial_files(output_directory):
+    """
+    Remove the partial files left by participants that crashed or timed out, the partial files of running processes,
+    e.g. of another run in the same directory, are kept
+    """
+    for file_name in os.listdir(output_directory):
+        if not file_name.endswith(PARTIAL_FILE_SUFFIX):
+            continue
+        pid = get_partial_file_pid(file_name)
+        if pid is None or not is_process_running(pid):
+            try:
+                os.remove(os.path.join(output_directory, file_name))
+            except FileNotFoundError:
+                # removed by another run at the same time
+                pass
+
+
+def calc_entropy_rate_of_participant(task):
+    """
+    Calculate the [T, D, L, H] list of a participant and save it atomically
+    :param task: (store_directory, user_id, output_directory, base_duty_cycle, temporal_sampling_rate_list,
+        spatial_sampling_rate_list, backend, dataset_id), the profile is not saved if dataset_id is None
+    """
+    store_directory, user_id, output_directory, base_duty_cycle, temporal_sampling_rate_list, \
+        spatial_sampling_rate_list, backend, dataset_id = task
+    output_file = get_entropy_rate_output_file(output_directory, user_id)
+    partial_output_file = get_partial_output_file(output_file, os.getpid())
+    profiler = FeatureProfiler()
+    try:
+        df = ParticipantStore(store_directory).read_participant(user_id, ENTROPY_RATE_USEFUL_COLUMNS)
+        with tempfile.TemporaryDirectory(prefix="entropy_rate_") as scratch_directory:
+            scratch_file = os.path.join(scratch_directory, "temp.csv")
+            profiler.profile(user_id, 'entropy_rate',
+                             lambda df: calc_spatial_temporal_entropy_parameters(
+                                 df, base_duty_cycle, temporal_sampling_rate_list, spatial_sampling_rate_list,
+                                 partial_output_file, backend, scratch_file),
+                             df, ['grid_x', 'grid_y'])
+        os.replace(partial_output_file, output_file)
+        if dataset_id is not None:
+            ResultsStore().upsert('feature_profiles', dataset_id, profiler.get_participant_profile(user_id))
+    except Exception:
+        if os.path.isfile(partial_output_file):
+            os.remove(partial_output_file)
+        raise
+
+
+def save_run_summary(result, run_summary_file):
+    """Print the [user_id, status, seconds, error] of a participant and append it to the run summary file"""
+    print("Participant", result[0], result[1], "in", round(result[2], 2), "seconds")
+    if result[3]:
+        print(result[3])
+    if run_summary_file is not None:
+        pd.DataFrame([result], columns=RUN_SUMMARY_COLUMNS).to_csv(run_summary_file, index=False, mode='a',
+                                                                   header=not os.path.isfile(run_summary_file))
+
+
+def run_entropy_rate(store_directory, output_directory, base_duty_cycle, temporal_sampling_rate_list,
+                     spatial_sampling_rate_list, processes=None, backend=None, user_ids=None, timeout=None,
+                     run_summary_file=None, dataset_id=None):
+    """
+    Calculate the entropy rate parameters of participants in parallel, skipping finished participants
+    :param store_directory: directory of the participant store of records aggregated by duty cycles
+    :param output_directory: directory of the [T, D, L, H] file of each participant
+    :param processes: number of participants processed at the same time, os.cpu_count() if None
+    :param backend: backend of lzEntropy, see calc_spatial_temporal_entropy_rate.calc_entropy_rate
+    :param user_ids: participants to process, all participants of the store if None
+    :param timeout: seconds after which the process of a participant is terminated, no limit if None
+    :param run_summary_file: csv file the result of each participant is appended to when it ends, not saved if None
+    :param dataset_id: dataset the entropy rate profile of each participant is saved to in the results store, not saved
+        if None
+    :return: dataframe [user_id, status, seconds, error] of the participants processed in this run, status is "done",
+        "failed", "crashed" or "timeout"
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    remove_partial_files(output_directory)
+    if user_ids is None:
+        user_ids = ParticipantStore(store_directory).list_participants()
+    pending_user_ids = [user_id for user_id in user_ids if not is_participant_finished(output_directory, user_id)]
+    print(len(user_ids) - len(pending_user_ids), "participants are already finished,", len(pending_user_ids),
+          "participants to process")
+    tasks = [(user_id, (store_directory, user_id, output_directory, base_duty_cycle, temporal_sampling_rate_list,
+                        spatial_sampling_rate_list, backend, dataset_id)) for user_id in pending_user_ids]
+    run_summary = run_participant_tasks(calc_entropy_rate_of_participant, tasks, processes, timeout,
+                                        lambda result: save_run_summary(result, run_summary_file))
+    return pd.DataFrame(run_summary, columns=RUN_SUMMARY_COLUMNS)
+
+
+def run_entropy_rate_for_dataset(dataset_id, processes=None, backend=None, timeout=None):
+    dataset_configuration = get_dataset_parameters(dataset_id)
+    store_directory = get_aggregated_store_directory(dataset_configuration.participant_store_directory,
+                                                     dataset_configuration.base_duty_cycle)
+    # the summary is kept out of the entropy rate directory, which should only contain files of participants
+    summary_file = os.path.join(os.path.dirname(dataset_configuration.gps_data_path),
+                                ENTROPY_RATE_RUN_SUMMARY_FILE_NAME)
+    return run_entropy_rate(store_directory, dataset_configuration.entropy_rate_results_path,
+                            dataset_configuration.base_duty_cycle, dataset_configuration.duty_cycle_ratio,
+                            dataset_configuration.cell_size_ratio, processes, backend, timeout=timeout,
+                            run_summary_file=summary_file, dataset_id=dataset_id)
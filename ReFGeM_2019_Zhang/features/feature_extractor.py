@@ -1,81 +1,192 @@
 import os
+import traceback
 from time import time
 
 import features.DatasetConfiguration as dc
 import pandas as pd
-from features.calc_buffer_area import calc_buffer_area_cascaded_union
+from features.buffer_raster import BUFFER_AREA_CURVE_RADII
+from features.calc_buffer_area import BUFFER_SIMPLIFICATION_TOLERANCE, calc_buffer_area_cascaded_union, \
+    calc_buffer_area_curve_of_participant
+from features.calc_convex_hull import calc_convex_hull_volume
 from features.calc_top_n_convex import calc_multiple_top_n_convex
-
-from ReFGeM.features.calc_convex_hull import calc_convex_hull_volume
+from features.duty_cycle_aggregator import get_aggregated_file_suffix, get_aggregated_store_directory
+from features.feature_profiler import FeatureProfiler, summarize_profiles, to_long_profiles
+from features.grid_index import GridIndex
+from features.participant_pool import run_participant_tasks
+from features.participant_store import ParticipantStore
+from features.results_store import ResultsStore
 
 
 class FeatureExtractor:
-    def __init__(self, dataset_id):
+    def __init__(self, dataset_id, buffer_area_curve=False, processes=1, timeout=None, extract=True,
+                 trace_memory=False):
+        """
+        :param buffer_area_curve: also save the buffer area of each radius in BUFFER_AREA_CURVE_RADII per participant,
+            the buffer of the buffer_area feature measured by the raster engine
+        :param processes: number of participants processed at the same time, each in its own process if more than 1,
+            os.cpu_count() if None
+        :param timeout: seconds after which the process of a participant is terminated in parallel mode
+        :param extract: extract the features of all participants when the extractor is created
+        :param trace_memory: profile the tracemalloc peak of each feature instead of the peak RSS of the process
+        """
         self.dataset_id = dataset_id
+        self.buffer_area_curve = buffer_area_curve
+        self.processes = processes
+        self.timeout = timeout
+        self.trace_memory = trace_memory
         self.dataset_configuration = dc.get_dataset_parameters(self.dataset_id)
         self.gps_file_suffix = self.get_gps_file_suffix()
         self.binned_aggregated_useful_columns = ['DutyCycle', 'easting', 'northing', 'grid_x', 'grid_y']
         self.binned_only_useful_columns = ['grid_x','grid_y']
+        # records of each participant, and records aggregated by the base duty cycle, written by GPSProcessor
+        self.participant_store = ParticipantStore(self.dataset_configuration.participant_store_directory)
+        self.aggregated_participant_store = ParticipantStore(
+            get_aggregated_store_directory(self.dataset_configuration.participant_store_directory,
+                                           self.dataset_configuration.base_duty_cycle))
         # parameter for calculating top N convex hull
         self.N = 10
         self.features_output_file = "../results/" + self.dataset_id + "/convex_topNconvex_buffer.csv"
         self.time_consumption_output_file = "../results/" + self.dataset_id + "/time_consumption.csv"
         self.features_output_file_columns = ['user_id', 'convex_hull', 'buffer_area', 'N5', 'N10', 'N15', 'N20','ON5', 'ON10', 'ON15', 'ON20']
         self.time_consumption_columns = ['user_id','convex_hull','top_n_convex', 'buffer_area']
+        # B<radius> is the raster area of the square capped buffer of buffer_area, B200 matches buffer_area within the
+        # raster error bound
+        self.buffer_area_curve_columns = ['user_id'] + ['B' + str(radius) for radius in BUFFER_AREA_CURVE_RADII]
+        # vertices removed by the simplification of the path of buffer_area and the change of the area it caused,
+        # saved if the path is simplified
+        self.buffer_simplification_tolerance = BUFFER_SIMPLIFICATION_TOLERANCE
+        self.buffer_area_simplification_columns = ['user_id', 'removed_vertices', 'area_deviation']
+        self.run_summary_output_file = "../results/" + self.dataset_id + "/feature_extraction_run_summary.csv"
+        self.run_summary_columns = ['user_id', 'status', 'seconds', 'error']
+        # wall time, cpu time, peak memory, input rows and distinct points of each feature of each participant
+        self.profiler = FeatureProfiler(trace_memory)
+        # the entropy rate is profiled by entropy_rate_runner into the same feature_profiles table
+        self.profiled_features = ['convex_hull', 'top_n_convex', 'buffer_area', 'buffer_area_curve', 'entropy_rate']
+        self.feature_profiles_output_file = "../results/" + self.dataset_id + "/feature_profiles.csv"
+        self.feature_profile_summary_output_file = "../results/" + self.dataset_id + "/feature_profile_summary.csv"
+        # features, timings and buffer area curves of all participants are upserted to the results store
+        self.results_store = ResultsStore()
         # self.features_output_file = "../results/" + self.dataset_id + "/multiple_topNconvex_hull.csv"
         # self.features_output_file_columns = ['user_id', 'N5', 'N10', 'N15', 'N20']
-        self.extract_features_for_all_participants()
+        if extract:
+            self.extract_features_for_all_participants()
 
 
     def get_gps_file_suffix(self):
         """This function returns the suffix of aggregated gps files"""
-        duty_cycle_in_seconds = self.dataset_configuration.base_duty_cycle * 60
-        return ".csv-"+str(duty_cycle_in_seconds) + ".csv"
+        return get_aggregated_file_suffix(self.dataset_configuration.base_duty_cycle)
 
     def get_user_id_from_file_name(self, filename):
         user_id = filename.split('.')[0]
         return user_id
     
+    def get_participants(self):
+        return self.aggregated_participant_store.list_participants()
+
+    def is_participant_finished(self, user_id):
+        """The features of a participant are stored when all its features are extracted"""
+        return self.results_store.has_participant('features', self.dataset_id, user_id)
+
+    def get_pending_participants(self):
+        """Return the participants that are not finished by a previous run"""
+        user_ids = [user_id for user_id in self.get_participants() if not self.is_participant_finished(user_id)]
+        print(len(user_ids), "participants to process")
+        return user_ids
+
     def extract_features_for_all_participants(self):
-        features_of_all_participants = []
-        time_consumption_of_all_participants = []
-        for file_name in os.listdir(self.dataset_configuration.data_directory):
-            if file_name.endswith(self.gps_file_suffix):
-                print(file_name)
-                self.gps_binned_aggregated_dataframe = self.load_gps_dataframe_from_file(self.dataset_configuration.data_directory + file_name,
-                                                                                         self.binned_aggregated_useful_columns)
-                # self.gps_binned_aggregated_dataframe = sample_by_cell_size(self.gps_binned_aggregated_dataframe, 16)
-                # self.gps_binned_aggregated_dataframe.to_csv("temp_downsampled.csv")
-                self.user_id = self.get_user_id_from_file_name(file_name)
-
-                print("Processing user", self.user_id)
-                self.gps_binned_only_dataframe = self.load_gps_dataframe_from_file(self.dataset_configuration.data_directory +
-                                                                                   self.user_id + ".csv",
-                                                                                   self.binned_only_useful_columns)
-                # self.gps_binned_only_dataframe = sample_by_cell_size(self.gps_binned_only_dataframe, 16)
-                # if self.dataset_id == 'Taxi':
-                #     self.gps_binned_aggregated_dataframe = sample_by_duty_cycle(self.gps_binned_aggregated_dataframe, 5)
-                feature_list = [self.user_id]
-                time_list = [self.user_id]
-                # self.extract_features_for_each_participant()
-                features, time_consumption = self.extract_features_for_each_participant()
-                feature_list.extend(features)
-                time_list.extend(time_consumption)
-                # features_of_all_participants.append(feature_list)
-                # time_consumption_of_all_participants.append(time_list)
-                self.save_list_to_file([feature_list],
-                                       self.features_output_file + "_"+str(self.user_id)+ ".csv",
-                                       self.features_output_file_columns)
-                self.save_list_to_file([time_list],
-                                       self.time_consumption_output_file + "_"+str(self.user_id)+ ".csv",
-                                       self.time_consumption_columns)
-                # break
-        # self.save_list_to_file(features_of_all_participants,
-        #                        self.features_output_file,
-        #                        self.features_output_file_columns)
-        # self.save_list_to_file(time_consumption_of_all_participants,
-        #                        self.time_consumption_output_file,
-        #                        self.time_consumption_columns)
+        if self.processes == 1:
+            self.extract_features_for_all_participants_in_serial()
+        else:
+            self.extract_features_for_all_participants_in_parallel()
+        self.save_profile_summary()
+
+    def extract_features_for_all_participants_in_serial(self):
+        """
+        Extract the features of each participant in this process, skipping participants finished by a previous run.
+        A participant that fails is recorded in the run summary file and does not stop the others, the timeout only
+        applies to the parallel mode.
+        """
+        results = []
+        for user_id in self.get_pending_participants():
+            t0 = time()
+            try:
+                self.extract_features_of_participant(user_id)
+                result = [user_id, "done", time() - t0, ""]
+            except Exception:
+                result = [user_id, "failed", time() - t0, traceback.format_exc()]
+            self.save_run_summary(result)
+            results.append(result)
+        return results
+
+    def extract_features_for_all_participants_in_parallel(self):
+        """
+        Extract the features of each participant in its own process, skipping participants finished by a previous run.
+        A participant that fails or runs past the timeout is recorded in the run summary file and does not stop the
+        others.
+        """
+        tasks = [(user_id, (self.dataset_id, self.buffer_area_curve, self.trace_memory, user_id))
+                 for user_id in self.get_pending_participants()]
+        return run_participant_tasks(extract_features_of_participant_in_process, tasks, self.processes, self.timeout,
+                                     self.save_run_summary)
+
+    def get_feature_profiles(self):
+        """Return the profiles of all participants of the dataset, one row per feature of each participant"""
+        if not self.results_store.has_table('feature_profiles'):
+            return to_long_profiles(pd.DataFrame(columns=['user_id']), self.profiled_features)
+        return to_long_profiles(self.results_store.read('feature_profiles', self.dataset_id), self.profiled_features)
+
+    def save_profile_summary(self):
+        """Save the percentiles of the profiles of each feature across participants, see summarize_profiles"""
+        summary = summarize_profiles(self.get_feature_profiles())
+        print(summary.to_string(index=False))
+        summary.to_csv(self.feature_profile_summary_output_file, index=False)
+        return summary
+
+    def save_run_summary(self, result):
+        """Append the [user_id, status, seconds, error] of a participant to the run summary file"""
+        print("Participant", result[0], result[1], "in", round(result[2], 2), "seconds")
+        if result[3]:
+            print(result[3])
+        write_header = not os.path.isfile(self.run_summary_output_file)
+        pd.DataFrame([result], columns=self.run_summary_columns).to_csv(self.run_summary_output_file, index=False,
+                                                                         mode='a', header=write_header)
+
+    def extract_features_of_participant(self, user_id):
+        self.user_id = user_id
+        print("Processing user", self.user_id)
+        self.gps_binned_aggregated_dataframe = self.aggregated_participant_store.read_participant(
+            self.user_id, self.binned_aggregated_useful_columns)
+        self.profiler.clear()
+        self.gps_binned_only_dataframe = self.participant_store.read_participant(self.user_id,
+                                                                                 self.binned_only_useful_columns)
+        feature_list = [self.user_id]
+        time_list = [self.user_id]
+        features, time_consumption, simplification = self.extract_features_for_each_participant()
+        feature_list.extend(features)
+        time_list.extend(time_consumption)
+        table_dfs = {'features': pd.DataFrame([feature_list], columns=self.features_output_file_columns),
+                     'timings': pd.DataFrame([time_list], columns=self.time_consumption_columns)}
+        if self.buffer_simplification_tolerance is not None:
+            table_dfs['buffer_area_simplification'] = pd.DataFrame([[self.user_id] + simplification],
+                                                                   columns=self.buffer_area_simplification_columns)
+        if self.buffer_area_curve:
+            curve = self.profiler.profile(self.user_id, 'buffer_area_curve',
+                                          lambda df: calc_buffer_area_curve_of_participant(df, self.dataset_id,
+                                                                                           BUFFER_AREA_CURVE_RADII),
+                                          self.gps_binned_aggregated_dataframe, ['easting', 'northing'])
+            table_dfs['buffer_area_curve'] = pd.DataFrame([[self.user_id] + curve],
+                                                          columns=self.buffer_area_curve_columns)
+        table_dfs['feature_profiles'] = self.profiler.get_participant_profile(self.user_id)
+        # all results of the participant are saved in one transaction, the features mark the participant as finished
+        self.results_store.upsert_many(self.dataset_id, table_dfs)
+
+    def export_results_to_files(self):
+        """Save the features and timings of all participants of the dataset to the merged csv files"""
+        self.results_store.read('features', self.dataset_id).drop(columns='dataset').to_csv(self.features_output_file,
+                                                                                             index=False)
+        self.results_store.read('timings', self.dataset_id).drop(columns='dataset').to_csv(
+            self.time_consumption_output_file, index=False)
+        self.get_feature_profiles().to_csv(self.feature_profiles_output_file, index=False)
 
     def save_list_to_file(self, list_to_save, output_file, column_names):
         df = pd.DataFrame(list_to_save, columns=column_names)
@@ -88,22 +199,30 @@ class FeatureExtractor:
     
     def extract_features_for_each_participant(self):
         print("Extracting standard convex hull feature...")
-        t0 = time()
-        standard_convex_volume = calc_convex_hull_volume(self.gps_binned_only_dataframe)
+        standard_convex_volume = self.profiler.profile(self.user_id, 'convex_hull', calc_convex_hull_volume,
+                                                       self.gps_binned_only_dataframe, ['grid_x', 'grid_y'])
         print("The standard convex hull volume is", standard_convex_volume)
-        t1 = time()
-        print("Processing convex hull volume takes", t1 - t0)
+        convex_hull_seconds = self.profiler.get_last_wall_seconds()
+        print("Processing convex hull volume takes", convex_hull_seconds)
         print("Extracting Top N convex hull feature...")
-        top_n_convex_volume = calc_multiple_top_n_convex(self.gps_binned_aggregated_dataframe.copy(deep=True))
+        top_n_convex_volume = self.profiler.profile(self.user_id, 'top_n_convex',
+                                                    lambda df: calc_multiple_top_n_convex(df, GridIndex(df['grid_x'],
+                                                                                                        df['grid_y'])),
+                                                    self.gps_binned_aggregated_dataframe, ['grid_x', 'grid_y'])
         print("The top N convex hull volume is", top_n_convex_volume)
-        t2 = time()
-        print("Processing top N convex hull volume takes",t2 - t1)
+        top_n_convex_seconds = self.profiler.get_last_wall_seconds()
+        print("Processing top N convex hull volume takes", top_n_convex_seconds)
         # return top_n_convex_volume
         print("Extracting Buffer area feature...")
-        buffer_area = calc_buffer_area_cascaded_union(self.gps_binned_aggregated_dataframe.copy(deep=True),self.dataset_id)
+        buffer_area, removed_vertices, area_deviation = self.profiler.profile(
+            self.user_id, 'buffer_area',
+            lambda df: calc_buffer_area_cascaded_union(df.copy(deep=True), self.dataset_id,
+                                                       simplification_tolerance=self.buffer_simplification_tolerance,
+                                                       return_simplification=True),
+            self.gps_binned_aggregated_dataframe, ['easting', 'northing'])
         print("The buffer area is",buffer_area)
-        t3 = time()
-        print("Processing buffer area takes",t3 - t2)
+        buffer_area_seconds = self.profiler.get_last_wall_seconds()
+        print("Processing buffer area takes", buffer_area_seconds)
         # print("Extracting spatial temporal entropy rate feature...")
         # calc_spatial_temporal_entropy_parameters(self.gps_binned_aggregated_dataframe.copy(deep=True),
         #                                          self.dataset_configuration.base_duty_cycle,
@@ -114,7 +233,8 @@ class FeatureExtractor:
         # print("Processing entropy rate takes",t4 - t3)
         feature_list = [standard_convex_volume, buffer_area]
         feature_list.extend(top_n_convex_volume)
-        return feature_list,[t1-t0, t2-t1, t3-t2]
+        return feature_list, [convex_hull_seconds, top_n_convex_seconds, buffer_area_seconds], [removed_vertices,
+                                                                                               area_deviation]
         
         
 
@@ -123,3 +243,10 @@ class FeatureExtractor:
 
 
 
+
+
+def extract_features_of_participant_in_process(task):
+    """Worker of the parallel mode, task is (dataset_id, buffer_area_curve, trace_memory, user_id)"""
+    dataset_id, buffer_area_curve, trace_memory, user_id = task
+    FeatureExtractor(dataset_id, buffer_area_curve, extract=False, trace_memory=trace_memory).\
+        extract_features_of_participant(user_id)
@@ -0,0 +1,169 @@
+import os
+import sys
+import tracemalloc
+from time import perf_counter, process_time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak RSS is then not recorded
+    resource = None
+
+"""
+Profile each feature computation of a participant: wall time, CPU time, peak memory, the number of input rows and the
+number of distinct points in the input.
+Peak memory is the peak RSS of the process while the feature runs by default: on Linux the peak RSS (VmHWM) is reset
+through /proc/self/clear_refs before each feature, so each feature gets its own peak instead of the lifetime high-water
+mark of the process. Where the peak RSS can't be reset, and with trace_memory=True, it is the tracemalloc peak of the
+python allocations (numpy arrays included) made by the feature alone, which slows the features down.
+The profiles of all participants of a dataset are summarized as percentiles, and the exponent of the fit
+wall_seconds ~ rows ** exponent flags the features that grow faster than linearly with the input size.
+"""
+
+PROFILE_METRICS = ['wall_seconds', 'cpu_seconds', 'peak_memory_bytes', 'rows', 'points']
+PROFILE_PERCENTILES = [50, 90, 99]
+
+
+CLEAR_REFS_FILE = "/proc/self/clear_refs"
+STATUS_FILE = "/proc/self/status"
+
+
+def reset_peak_rss():
+    """Reset the peak RSS of the process to its current RSS, return False if it can't be reset"""
+    try:
+        with open(CLEAR_REFS_FILE, 'w') as f:
+            # "5" resets the peak RSS, see proc(5)
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss_bytes():
+    """Return the peak RSS of the process since the last reset_peak_rss, or since its start"""
+    if os.path.isfile(STATUS_FILE):
+        with open(STATUS_FILE) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    if resource is None:
+        return np.nan
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def count_points(df, point_columns):
+    """Return the number of distinct points of the dataframe, e.g. distinct grid cells for ['grid_x', 'grid_y']"""
+    if df is None or not point_columns:
+        return np.nan
+    return int(len(df[point_columns].drop_duplicates()))
+
+
+class FeatureProfiler:
+    def __init__(self, trace_memory=False):
+        """
+        :param trace_memory: record the tracemalloc peak of each feature instead of the peak RSS of the process while
+            the feature runs, the tracemalloc peak is also used where the peak RSS can't be reset
+        """
+        self.trace_memory = trace_memory or not reset_peak_rss()
+        self.profiles = []
+
+    def profile(self, user_id, feature, function, df, point_columns=None):
+        """
+        Call function(df) and record its profile
+        :param feature: name of the feature, e.g. "convex_hull"
+        :param df: input dataframe of the feature
+        :param point_columns: columns of a point, to count the distinct points of the input, not counted if None
+        :return: the return value of the function
+        """
+        rows = len(df)
+        points = count_points(df, point_columns)
+        if self.trace_memory:
+            tracemalloc.start()
+        else:
+            reset_peak_rss()
+        t0, c0 = perf_counter(), process_time()
+        try:
+            result = function(df)
+        finally:
+            wall_seconds, cpu_seconds = perf_counter() - t0, process_time() - c0
+            if self.trace_memory:
+                peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                peak_memory_bytes = get_peak_rss_bytes()
+            self.profiles.append([user_id, feature, wall_seconds, cpu_seconds, peak_memory_bytes, rows, points])
+        return result
+
+    def get_last_wall_seconds(self):
+        return self.profiles[-1][2]
+
+    def get_profiles(self):
+        """Return the profiles as a dataframe [user_id, feature, wall_seconds, cpu_seconds, peak_memory_bytes, rows,
+        points], one row per feature computation"""
+        return pd.DataFrame(self.profiles, columns=['user_id', 'feature'] + PROFILE_METRICS)
+
+    def get_participant_profile(self, user_id):
+        """Return the profiles of a participant as one row with a column <feature>_<metric> for each feature"""
+        profiles = self.get_profiles()
+        profiles = profiles[profiles['user_id'] == user_id]
+        row = {'user_id': user_id}
+        for feature, metrics in zip(profiles['feature'], profiles[PROFILE_METRICS].itertuples(index=False)):
+            for metric, value in zip(PROFILE_METRICS, metrics):
+                row[feature + '_' + metric] = value
+        return pd.DataFrame([row])
+
+    def clear(self):
+        self.profiles = []
+
+
+def to_long_profiles(participant_profiles, features):
+    """Convert participant profiles [user_id, <feature>_<metric>...] back to one row per feature computation"""
+    profile_list = []
+    for feature in features:
+        columns = [feature + '_' + metric for metric in PROFILE_METRICS]
+        if not set(columns).issubset(participant_profiles.columns):
+            continue
+        df = participant_profiles[['user_id'] + columns].dropna(subset=[feature + '_wall_seconds'])
+        df.columns = ['user_id'] + PROFILE_METRICS
+        df.insert(1, 'feature', feature)
+        profile_list.append(df)
+    if not profile_list:
+        return pd.DataFrame(columns=['user_id', 'feature'] + PROFILE_METRICS)
+    return pd.concat(profile_list, ignore_index=True)
+
+
+def calc_scaling_exponent(rows, seconds):
+    """Return the slope of log(seconds) over log(rows), about 1 for linear features, NaN without enough participants"""
+    rows, seconds = np.asarray(rows, dtype=np.float64), np.asarray(seconds, dtype=np.float64)
+    valid = (rows > 0) & (seconds > 0)
+    if np.unique(rows[valid]).size < 2:
+        return np.nan
+    return float(np.polyfit(np.log(rows[valid]), np.log(seconds[valid]), 1)[0])
+
+
+def summarize_profiles(profiles, percentiles=None):
+    """
+    Summarize the profiles of the participants of a dataset
+    :param profiles: dataframe [user_id, feature, wall_seconds, cpu_seconds, peak_memory_bytes, rows, points]
+    :param percentiles: list of percentiles, PROFILE_PERCENTILES if None
+    :return: dataframe with one row per feature: participants, <metric>_p<percentile> for each metric and
+        scaling_exponent
+    """
+    if percentiles is None:
+        percentiles = PROFILE_PERCENTILES
+    summary_list = []
+    for feature, df in profiles.groupby('feature', sort=False):
+        row = {'feature': feature, 'participants': len(df)}
+        for metric in PROFILE_METRICS:
+            values = df[metric].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            for percentile in percentiles:
+                row[metric + '_p' + str(percentile)] = np.percentile(values, percentile) if values.size else np.nan
+        row['scaling_exponent'] = calc_scaling_exponent(df['rows'], df['wall_seconds'])
+        summary_list.append(row)
+    return pd.DataFrame(summary_list)
@@ -4,6 +4,11 @@ import numpy as np
 # from pyproj import Proj,transform
 import os
 from .battery_processor import *
+from .duty_cycle_aggregator import aggregate_by_duty_cycle, get_aggregated_store_directory, \
+    save_aggregated_gps_to_user_files
+from .participant_store import ParticipantStore
+from .projection import project, project_point
+from .record_standardizer import standardize_gps_dataframe
 import sys
 
 """
@@ -17,8 +22,16 @@ Take in the original GPS file and battery file (if applicable) and do the follow
 5. Filter GPS records with city limits
 6. Add indexes of grids (use the smallest cell size)
 7. Save the processed GPS dataframe to file
-8. Split the whole GPS dataframe to files of each participant.
-9. Get study duration of each participant
+8. Split the whole GPS dataframe to partitions of each participant in the participant store (and to csv files of each
+    participant if user_csv_files is True).
+9. Get study duration of each participant from the metadata of the participant store
+10. Aggregate the GPS records of each participant by the base duty cycle, and save them to "<user_id>.csv-<seconds>.csv"
+    files and to the participant store of aggregated records
+
+Streaming mode (chunk_size is given):
+The original GPS file is read in chunks of chunk_size rows, and steps 2-6 are applied to each chunk. The result of each
+chunk is appended to the processed GPS file and to the files of each participant, so the memory usage depends on the
+chunk size instead of the size of the GPS file. The records of each participant are sorted by record time afterwards.
     
 Need to address:
 1. The original gps and battery files (Fixed)
@@ -29,7 +42,7 @@ Need to address:
 """
 
 class GPSProcessor:
-    def __init__(self, dataset_id):
+    def __init__(self, dataset_id, chunk_size=None, user_csv_files=True):
         self.dataset_configuration = get_dataset_parameters(dataset_id)
         self.useful_columns = ['user_id','record_time','accu','lat','lon']
         if dataset_id == 'Taxi':
@@ -41,9 +54,23 @@ class GPSProcessor:
         self.study_name = self.dataset_configuration.dataset_name
         self.data = "gps"
         self.user_gps_file_directory = self.dataset_configuration.data_directory
-        self.gps_dataframe = self.load_gps_dataframe_from_file(self.dataset_configuration.gps_data_path)
-        self.standardize_gps_dataframe()
-        self.process_gps_records()
+        dataset_directory = os.path.dirname(self.dataset_configuration.gps_data_path)
+        self.processed_gps_file_path = os.path.join(dataset_directory, "gps_after_processing.csv")
+        self.study_duration_file_path = os.path.join(dataset_directory, "study_duration.csv")
+        self.participant_store = ParticipantStore(self.dataset_configuration.participant_store_directory)
+        self.aggregated_participant_store = ParticipantStore(
+            get_aggregated_store_directory(self.dataset_configuration.participant_store_directory,
+                                           self.dataset_configuration.base_duty_cycle))
+        # the csv files of each participant are still read by other_process (move_processed_files,
+        # find_duplicate_files and the record counts of summarize_gps_datasets)
+        self.user_csv_files = user_csv_files
+        self.chunk_size = chunk_size
+        if self.chunk_size:
+            self.process_gps_records_in_chunks()
+        else:
+            self.gps_dataframe = self.load_gps_dataframe_from_file(self.dataset_configuration.gps_data_path)
+            self.standardize_gps_dataframe()
+            self.process_gps_records()
 
     def process_gps_records(self):
         # Filter GPS according to accuracy
@@ -53,20 +80,12 @@ class GPSProcessor:
         print(self.gps_dataframe.shape)
         # Filter GPS records according to battery records
         print("Filter GPS records of unreliable participants according to battery records count if applicable...")
-        if self.dataset_configuration.has_battery_data:
-            if self.dataset_configuration.battery_data_path:
-                print("Process battery data...")
-                battery_processor = BatteryProcessor(self.study_name, self.dataset_configuration.battery_data_path,
-                                                     self.dataset_configuration.battery_threshold,
-                                                     self.dataset_configuration.base_duty_cycle)
-                self.gps_dataframe = self.filter_out_participants_with_less_battery_records(self.gps_dataframe,
-                                                                                            battery_processor.valid_participant_list)
-                # remove column "count" from the valid participant list
-                del self.gps_dataframe['count']
-            else:
-                print("No battery file is given. Oops!")
-        else:
-            print("Battery data is not available. Pass!")
+        valid_participant_list = self.get_valid_participants_from_battery_records()
+        if valid_participant_list is not None:
+            self.gps_dataframe = self.filter_out_participants_with_less_battery_records(self.gps_dataframe,
+                                                                                        valid_participant_list)
+            # remove column "count" from the valid participant list
+            del self.gps_dataframe['count']
         print(self.gps_dataframe.shape)
         # Convert latitude and longitude to UTM coordinates
         self.gps_dataframe = self.add_utm_coordinates_to_dataframe(self.gps_dataframe)
@@ -87,23 +106,94 @@ class GPSProcessor:
         self.gps_dataframe = self.get_grid_xy(self.gps_dataframe)
         print(self.gps_dataframe.shape)
         # Save GPS dataframe after processing to csv file
-        self.gps_dataframe.to_csv("/Volumes/Seagate_Rui/dimensionality/data/"+self.study_name+"/gps_after_processing.csv",
-                                  index=False)
-        # Split and save user gps files seperately
-        self.split_gps_to_user_files(self.gps_dataframe, self.dataset_configuration.data_directory)
+        self.gps_dataframe.to_csv(self.processed_gps_file_path, index=False)
+        # Split and save user gps records seperately
+        self.participant_store.clear()
+        self.participant_store.write_participants(self.gps_dataframe)
+        if self.user_csv_files:
+            self.split_gps_to_user_files(self.gps_dataframe, self.dataset_configuration.data_directory)
         # Get study duration of each participant
-        self.get_study_duration_by_participant(self.dataset_configuration.data_directory,
-                                               "/Volumes/Seagate_Rui/dimensionality/data/" + self.study_name +
-                                               "/study_duration.csv")
+        self.save_study_duration(self.study_duration_file_path)
+        # Aggregate GPS records of each participant by duty cycles
+        self.aggregate_gps_records_by_duty_cycle(self.gps_dataframe)
         print("End of GPS process!")
 
+    def process_gps_records_in_chunks(self):
+        """
+        Streaming version of process_gps_records. The battery records are processed once, then the GPS file is read
+        chunk by chunk and each chunk goes through the same filters as process_gps_records. The processed chunks are
+        appended to the processed GPS file and to the files of each participant.
+        """
+        print("Filter GPS records of unreliable participants according to battery records count if applicable...")
+        valid_participant_list = self.get_valid_participants_from_battery_records()
+        if self.dataset_configuration.city_boundary_utm.__len__() != 4:
+            print("No city boundary is provided. Skip this step!")
+        self.participant_store.clear()
+        written_users = set()
+        is_first_chunk = True
+        for gps_chunk in pd.read_csv(self.dataset_configuration.gps_data_path, usecols=self.useful_columns,
+                                     chunksize=self.chunk_size):
+            self.gps_dataframe = gps_chunk
+            self.standardize_gps_dataframe()
+            processed_chunk = self.process_gps_chunk(self.gps_dataframe, valid_participant_list)
+            print(processed_chunk.shape)
+            processed_chunk.to_csv(self.processed_gps_file_path, index=False, mode='w' if is_first_chunk else 'a',
+                                   header=is_first_chunk)
+            is_first_chunk = False
+            self.participant_store.append_participants(processed_chunk)
+            if self.user_csv_files:
+                self.append_gps_to_user_files(processed_chunk, self.dataset_configuration.data_directory,
+                                              written_users)
+        self.gps_dataframe = None
+        # Chunks are not necessarily ordered by time, so sort the records of each participant
+        self.participant_store.compact()
+        if self.user_csv_files:
+            self.sort_user_files_by_record_time(self.dataset_configuration.data_directory, written_users)
+        # Get study duration of each participant
+        self.save_study_duration(self.study_duration_file_path)
+        # Aggregate GPS records of each participant by duty cycles, one participant at a time
+        self.aggregate_gps_records_by_duty_cycle()
+        print("End of GPS process!")
+
+    def process_gps_chunk(self, gps_df, valid_participant_list):
+        """
+        Apply accuracy filter, battery filter, UTM projection, city boundary filter and grid index to a chunk of
+        standardized GPS records.
+        :param gps_df: chunk of standardized GPS records
+        :param valid_participant_list: dataframe of valid participants, None if battery records are not applicable
+        :return: processed chunk of GPS records
+        """
+        gps_df = self.filter_gps_with_accuracy(gps_df)
+        if valid_participant_list is not None:
+            gps_df = self.filter_out_participants_with_less_battery_records(gps_df, valid_participant_list)
+            del gps_df['count']
+        gps_df = self.add_utm_coordinates_to_dataframe(gps_df.copy())
+        if self.dataset_configuration.city_boundary_utm.__len__() == 4:
+            gps_df = self.filter_gps_with_utm_city_limits(gps_df)
+        return self.get_grid_xy(gps_df.copy())
+
+    def get_valid_participants_from_battery_records(self):
+        """Return the dataframe of valid participants based on battery records, or None if it is not applicable"""
+        if self.dataset_configuration.has_battery_data:
+            if self.dataset_configuration.battery_data_path:
+                print("Process battery data...")
+                battery_processor = BatteryProcessor(self.study_name, self.dataset_configuration.battery_data_path,
+                                                     self.dataset_configuration.battery_threshold,
+                                                     self.dataset_configuration.base_duty_cycle)
+                return battery_processor.valid_participant_list
+            else:
+                print("No battery file is given. Oops!")
+        else:
+            print("Battery data is not available. Pass!")
+        return None
+
     def add_utm_coordinates_to_dataframe(self, gps_df):
         column_names = gps_df.columns
         if 'lat' in column_names and 'lon' in column_names:
             latitudes = gps_df['lat']
             longitudes = gps_df['lon']
-            eastings, northings = transform(self.dataset_configuration.proj_lat_long, self.dataset_configuration.proj_utm,
-                                            np.array(longitudes), np.array(latitudes))
+            eastings, northings = project(self.dataset_configuration.proj_lat_long, self.dataset_configuration.proj_utm,
+                                          np.array(longitudes), np.array(latitudes))
             gps_df['easting'] = eastings
             gps_df['northing'] = northings
             return gps_df
@@ -111,21 +201,15 @@ class GPSProcessor:
             sys.exit("No latitude or longitude columns in dataframe!")
 
     def standardize_gps_dataframe(self):
-        """"""
-        # handle data like "1,375" in column 'accu'
-        if 'accu' in self.gps_dataframe.columns:
-            self.gps_dataframe['accu'] = self.gps_dataframe['accu'].apply(lambda x: float(str(x).replace(',', '')))
-        self.gps_dataframe['user_id'] = self.gps_dataframe['user_id'].apply(lambda x: int(str(x).replace(',', '')))
-        self.gps_dataframe['record_time'] = pd.to_datetime(self.gps_dataframe['record_time'])
+        """Standardize the columns of the GPS dataframe, see record_standardizer.standardize_gps_dataframe"""
+        self.gps_dataframe = standardize_gps_dataframe(self.gps_dataframe)
 
     def load_gps_dataframe_from_file(self, file_path):
         gps_dataframe = pd.read_csv(file_path, usecols=self.useful_columns)
         return gps_dataframe
 
     def transform_to_utm(self, latitude, longitude):
-        utm_easting, utm_northing = transform(self.proj_lat_long, self.dataset_configuration.proj_utm,
-                                              [longitude], [latitude])
-        return [utm_easting[0], utm_northing[0]]
+        return project_point(self.proj_lat_long, self.dataset_configuration.proj_utm, longitude, latitude)
 
     def filter_gps_with_utm_city_limits(self, gps_df):
         print(gps_df.shape)
@@ -167,19 +251,32 @@ class GPSProcessor:
         del df_valid['counts']
         return df_valid
 
-    def get_study_duration_by_participant(self, directory, output_file):
-        study = self.study_name
-        data = self.data
-        duration_list = []
-        for file_name in os.listdir(directory):
-            print(file_name)
-            gps_records = pd.read_csv(directory + file_name)
-            user_id = gps_records['user_id'].drop_duplicates().values[0]
-            start_time = min(gps_records['record_time'])
-            end_time = max(gps_records['record_time'])
-            duration_list.append([study, user_id, data, start_time, end_time])
-        duration_df = pd.DataFrame(duration_list)
-        duration_df.to_csv(output_file, header=['study','user_id','data','start_time','end_time'], index=False)
+    def aggregate_gps_records_by_duty_cycle(self, gps_df=None):
+        """
+        Aggregate the GPS records of all participants by the base duty cycle of the dataset. Duty cycles start from the
+        first record of the study.
+        :param gps_df: processed GPS records of all participants, if None the records are read from the participant
+            store one participant at a time
+        """
+        print("Aggregate GPS records by duty cycles...")
+        base_duty_cycle = self.dataset_configuration.base_duty_cycle
+        study_start_time = self.participant_store.metadata['start_time'].min()
+        if gps_df is not None:
+            gps_dfs = [gps_df]
+        else:
+            gps_dfs = (self.participant_store.read_participant(user_id)
+                       for user_id in self.participant_store.list_participants())
+        self.aggregated_participant_store.clear()
+        for part_gps_df in gps_dfs:
+            aggregated_df = aggregate_by_duty_cycle(part_gps_df, base_duty_cycle, study_start_time)
+            self.aggregated_participant_store.write_participants(aggregated_df)
+            save_aggregated_gps_to_user_files(aggregated_df, self.dataset_configuration.data_directory,
+                                              base_duty_cycle)
+
+    def save_study_duration(self, output_file):
+        """Save the study duration of each participant using the metadata of the participant store"""
+        duration_df = self.participant_store.get_study_duration(self.study_name, self.data)
+        duration_df.to_csv(output_file, index=False)
 
     def split_gps_to_user_files(self, gps_df, out_dir):
         for user_id, data in gps_df.groupby('user_id'):
@@ -188,6 +285,27 @@ class GPSProcessor:
             sorted_part_df = part_df.sort_values(['record_time'])
             sorted_part_df.to_csv(file_path, index=False)
 
+    def append_gps_to_user_files(self, gps_df, out_dir, written_users):
+        """
+        Append a chunk of GPS records to the files of each participant. The file of a participant is overwritten the
+        first time the participant shows up in this run.
+        :param written_users: set of user ids already written in this run, updated in place
+        """
+        for user_id, data in gps_df.groupby('user_id'):
+            file_path = out_dir + str(user_id) + ".csv"
+            if user_id in written_users:
+                data.to_csv(file_path, index=False, mode='a', header=False)
+            else:
+                data.to_csv(file_path, index=False)
+                written_users.add(user_id)
+
+    def sort_user_files_by_record_time(self, out_dir, user_ids):
+        for user_id in user_ids:
+            file_path = out_dir + str(user_id) + ".csv"
+            part_df = pd.read_csv(file_path, parse_dates=['record_time'])
+            sorted_part_df = part_df.sort_values(['record_time'], kind='mergesort')
+            sorted_part_df.to_csv(file_path, index=False)
+
     def get_grid_xy(self, gps_df):
         """grid_x and grid_y starts from 0"""
         if 'easting' in gps_df.columns and 'northing' in gps_df.columns:
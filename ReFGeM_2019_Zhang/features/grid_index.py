@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+"""
+Multi-resolution index of the grid cells of GPS records.
+The grid columns "grid_x" and "grid_y" are the indices of cells of MIN_CELL_SIZE meters. A coarser grid with cell size
+MIN_CELL_SIZE * ratio is obtained by floor dividing the indices by the ratio. The index stores the base resolution
+cells once as int32 arrays, and each coarser level is computed once with a vectorized shift (power-of-two ratios as in
+SPATIO_SAMPLING_RATE_LIST) or floor division (other ratios).
+A cell is also identified by a packed int64 id, grid_x in the high 32 bits and grid_y in the low 32 bits, which is
+convenient for hashing, grouping and encoding cells as symbols.
+"""
+
+INT32_MIN = np.iinfo(np.int32).min
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def pack_cell_ids(grid_x, grid_y):
+    """
+    Pack cells into int64 ids, two cells have the same id if and only if they are equal
+    :param grid_x: array of int32 grid x indices
+    :param grid_y: array of int32 grid y indices
+    :return: int64 array of cell ids
+    """
+    grid_x = np.asarray(grid_x, dtype=np.int64)
+    grid_y = np.asarray(grid_y, dtype=np.int64)
+    for grid in [grid_x, grid_y]:
+        if grid.size and (grid.min() < INT32_MIN or grid.max() > INT32_MAX):
+            raise ValueError("Grid indices are out of the int32 range")
+    return (grid_x << 32) | (grid_y & 0xFFFFFFFF)
+
+
+def unpack_cell_ids(cell_ids):
+    """Return the (grid_x, grid_y) arrays of packed cell ids"""
+    cell_ids = np.asarray(cell_ids, dtype=np.int64)
+    grid_x = cell_ids >> 32
+    grid_y = (cell_ids & 0xFFFFFFFF).astype(np.uint32).view(np.int32)
+    return grid_x.astype(np.int32), grid_y
+
+
+def to_base_grid(grid):
+    """Convert a grid column (int or float) to int32 indices, the same as int(x) after floor division"""
+    grid = np.floor(np.asarray(grid, dtype=np.float64))
+    if grid.size and (grid.min() < INT32_MIN or grid.max() > INT32_MAX):
+        raise ValueError("Grid indices are out of the int32 range")
+    return grid.astype(np.int32)
+
+
+class GridIndex:
+    def __init__(self, grid_x, grid_y, cell_size_ratios=None):
+        """
+        :param grid_x: grid x indices of the base resolution, e.g. column "grid_x"
+        :param grid_y: grid y indices of the base resolution, e.g. column "grid_y"
+        :param cell_size_ratios: ratios between the minimum cell size and the coarser cell sizes computed at once,
+            other ratios are computed when they are first used
+        """
+        self.grid_x = to_base_grid(grid_x)
+        self.grid_y = to_base_grid(grid_y)
+        if self.grid_x.shape != self.grid_y.shape:
+            raise ValueError("grid_x and grid_y have different lengths")
+        self.levels = {1: (self.grid_x, self.grid_y)}
+        self.cell_ids = {}
+        for cell_size_ratio in cell_size_ratios or []:
+            self.get_level(cell_size_ratio)
+
+    def __len__(self):
+        return self.grid_x.size
+
+    def get_level(self, cell_size_ratio):
+        """Return the int32 (grid_x, grid_y) arrays of the cells with cell size MIN_CELL_SIZE * cell_size_ratio"""
+        if cell_size_ratio not in self.levels:
+            cell_size_ratio = int(cell_size_ratio)
+            if cell_size_ratio < 1:
+                raise ValueError("Cell size ratio must be a positive integer: " + str(cell_size_ratio))
+            if cell_size_ratio & (cell_size_ratio - 1) == 0:
+                # arithmetic shift is the floor division by a power of two
+                shift = cell_size_ratio.bit_length() - 1
+                self.levels[cell_size_ratio] = (self.grid_x >> shift, self.grid_y >> shift)
+            else:
+                self.levels[cell_size_ratio] = (self.grid_x // cell_size_ratio, self.grid_y // cell_size_ratio)
+        return self.levels[cell_size_ratio]
+
+    def get_cell_ids(self, cell_size_ratio=1):
+        """Return the packed int64 ids of the cells with cell size MIN_CELL_SIZE * cell_size_ratio"""
+        if cell_size_ratio not in self.cell_ids:
+            self.cell_ids[cell_size_ratio] = pack_cell_ids(*self.get_level(cell_size_ratio))
+        return self.cell_ids[cell_size_ratio]
+
+    def get_symbols(self, cell_size_ratio=1):
+        """Encode the cells as compact integer symbols 0..k-1, e.g. for the LZ entropy rate"""
+        _, symbols = np.unique(self.get_cell_ids(cell_size_ratio), return_inverse=True)
+        return symbols.reshape(-1).astype(np.int64)
+
+    def take(self, row_index):
+        """Return the GridIndex of a subset of the records, e.g. the rows of a level of a TemporalPyramid"""
+        subset = GridIndex.__new__(GridIndex)
+        subset.grid_x = self.grid_x[row_index]
+        subset.grid_y = self.grid_y[row_index]
+        subset.levels = {cell_size_ratio: (grid_x[row_index], grid_y[row_index])
+                         for cell_size_ratio, (grid_x, grid_y) in self.levels.items()}
+        subset.cell_ids = {}
+        return subset
+
+    def get_level_dataframe(self, cell_size_ratio):
+        """Return a dataframe with int64 columns "grid_x" and "grid_y" of the cells of the given size"""
+        grid_x, grid_y = self.get_level(cell_size_ratio)
+        return pd.DataFrame({'grid_x': grid_x.astype(np.int64), 'grid_y': grid_y.astype(np.int64)})
+
+    def sample(self, df, cell_size_ratio):
+        """
+        Represent the locations with a different cell size, same result as sample_by_cell_size
+        :param df: dataframe the index was built from, must include columns "grid_x" and "grid_y"
+        :return: copy of df with int64 "grid_x" and "grid_y" of the new cell size
+        """
+        grid_x, grid_y = self.get_level(cell_size_ratio)
+        return df.assign(grid_x=grid_x.astype(np.int64), grid_y=grid_y.astype(np.int64))
@@ -0,0 +1,179 @@
+import re
+import sys
+
+import numpy as np
+
+from .grid_index import pack_cell_ids
+
+"""
+In-process Lempel-Ziv entropy rate estimator, a python port of lz_entropy_rate_master/LZEntropy.h.
+For each position i > 0 of the sequence, lambda_i is the length of the shortest subsequence starting at i that doesn't
+appear in seq[0:i] (searching at most up to position 2i). The entropy rate is
+    H = n / sum(lambda_i) * log2(n)
+Each location is a symbol, so a sequence of (grid_x, grid_y) is first encoded as an array of integer symbols.
+
+Two ways of calculating sum(lambda_i) are available:
+    calc_lambda_sum                     direct port of the search in LZEntropy.h, quadratic or worse
+    calc_lambda_sum_suffix_automaton    same lambda_i in linear time with a suffix automaton of the growing prefix
+"""
+
+# Same delimiters as the lzEntropy executable: comma and whitespace characters
+LZ_INPUT_DELIMITERS = re.compile(r"[,\s]+")
+
+
+def encode_grid_symbols(grid_x, grid_y):
+    """
+    Encode a sequence of grid cells as integer symbols, two cells have the same symbol if and only if they are equal
+    :param grid_x: array of grid x indices
+    :param grid_y: array of grid y indices
+    :return: int64 array of symbols
+    """
+    _, symbols = np.unique(pack_cell_ids(grid_x, grid_y), return_inverse=True)
+    return symbols.reshape(-1).astype(np.int64)
+
+
+def encode_rows(rows):
+    """Encode a list of rows (tuples of any length) as integer symbols"""
+    symbol_ids = {}
+    return np.array([symbol_ids.setdefault(tuple(row), len(symbol_ids)) for row in rows], dtype=np.int64)
+
+
+def read_rows_from_file(file_path):
+    """
+    Read rows of numbers from an input file of the lzEntropy executable. The first line is the header, and lines
+    without numbers are ignored.
+    """
+    rows = []
+    with open(file_path) as input_file:
+        next(input_file, None)
+        for line in input_file:
+            words = [word for word in LZ_INPUT_DELIMITERS.split(line) if word]
+            if words:
+                rows.append(tuple(int(word) for word in words))
+    return rows
+
+
+def symbols_to_text(symbols):
+    """Map each symbol to a single character, so that substring search is done by str.find"""
+    symbols = np.asarray(symbols)
+    if symbols.size == 0:
+        return ""
+    _, compact_symbols = np.unique(symbols, return_inverse=True)
+    if compact_symbols.max() > sys.maxunicode:
+        raise ValueError("Too many distinct symbols to encode: " + str(compact_symbols.max() + 1))
+    return "".join(map(chr, compact_symbols.reshape(-1).tolist()))
+
+
+def calc_lambda_sum(symbols):
+    """
+    Calculate sum(lambda_i) exactly like LZEntropy<T>::lzEntropy
+    :param symbols: array of integer symbols
+    :return: sum of the lengths of the shortest new subsequences, starting from 1 for position 0
+    """
+    text = symbols_to_text(symbols)
+    seq_len = len(text)
+    lambda_sum = 1
+    for i in range(1, seq_len):
+        j_max = min(seq_len - 1, 2 * i)
+        for j in range(i, j_max + 1):
+            # the subsequence must be found completely inside text[0:i]
+            if text.find(text[i:j + 1], 0, i) < 0:
+                lambda_sum += j - i + 1
+                break
+    return lambda_sum
+
+
+def calc_lambda_sum_suffix_automaton(symbols):
+    """
+    Calculate sum(lambda_i) like calc_lambda_sum in linear time.
+    Let M(i) be the length of the longest prefix of seq[i:] which is a subsequence of seq[0:i], then lambda_i is
+    M(i) + 1, or nothing is added when seq[i:] is completely found (same as the executable). A suffix automaton of
+    seq[0:i] is built online, and the current match seq[i:i+M(i)] is kept as a state of the automaton. Because
+    M(i+1) >= M(i) - 1, moving from i to i+1 only drops the first symbol of the match, so the total work is linear.
+    :param symbols: array of integer symbols
+    :return: sum of the lengths of the shortest new subsequences, starting from 1 for position 0
+    """
+    seq = np.asarray(symbols).tolist()
+    seq_len = len(seq)
+    lambda_sum = 1
+    if seq_len == 0:
+        return lambda_sum
+    # suffix automaton: state 0 is the root
+    length = [0]
+    link = [-1]
+    transitions = [{}]
+    last = 0
+    # current match seq[i:i+match_len] is in state match_state
+    match_state = 0
+    match_len = 0
+    for i in range(seq_len):
+        if i > 0:
+            while i + match_len < seq_len:
+                next_state = transitions[match_state].get(seq[i + match_len])
+                if next_state is None:
+                    break
+                match_state = next_state
+                match_len += 1
+            if i + match_len < seq_len:
+                lambda_sum += match_len + 1
+            # drop the first symbol of the match
+            if match_len > 0:
+                match_len -= 1
+                if match_len <= length[link[match_state]]:
+                    match_state = link[match_state]
+        # add seq[i] to the automaton
+        symbol = seq[i]
+        new_state = len(length)
+        length.append(length[last] + 1)
+        link.append(0)
+        transitions.append({})
+        p = last
+        while p != -1 and symbol not in transitions[p]:
+            transitions[p][symbol] = new_state
+            p = link[p]
+        if p != -1:
+            q = transitions[p][symbol]
+            if length[p] + 1 == length[q]:
+                link[new_state] = q
+            else:
+                clone = len(length)
+                length.append(length[p] + 1)
+                link.append(link[q])
+                transitions.append(dict(transitions[q]))
+                while p != -1 and transitions[p].get(symbol) == q:
+                    transitions[p][symbol] = clone
+                    p = link[p]
+                link[q] = clone
+                link[new_state] = clone
+                # the shorter subsequences of q now belong to the clone
+                if match_state == q and match_len <= length[clone]:
+                    match_state = clone
+        last = new_state
+    return lambda_sum
+
+
+# Functions calculating sum(lambda_i), selected by name in the entropy rate code
+LAMBDA_SUM_FUNCTIONS = {"python": calc_lambda_sum,
+                        "suffix_automaton": calc_lambda_sum_suffix_automaton}
+
+
+def calc_lz_entropy_rate(symbols, lambda_sum_function=calc_lambda_sum_suffix_automaton):
+    """
+    Calculate the LZ entropy rate of a sequence of symbols
+    :param symbols: array of integer symbols, e.g. from encode_grid_symbols
+    :param lambda_sum_function: function calculating sum(lambda_i) of the symbols
+    :return: entropy rate H
+    """
+    seq_len = len(symbols)
+    if seq_len == 0:
+        return float('nan')
+    lambda_sum = lambda_sum_function(symbols)
+    return (1.0 * seq_len / lambda_sum) * np.log2(seq_len)
+
+
+def calc_lz_entropy_rate_of_grid(df, method="suffix_automaton"):
+    """
+    Calculate the LZ entropy rate of the sequence of cells in a dataframe with columns "grid_x" and "grid_y"
+    :param method: name of the function calculating sum(lambda_i), see LAMBDA_SUM_FUNCTIONS
+    """
+    return calc_lz_entropy_rate(encode_grid_symbols(df['grid_x'], df['grid_y']), LAMBDA_SUM_FUNCTIONS[method])
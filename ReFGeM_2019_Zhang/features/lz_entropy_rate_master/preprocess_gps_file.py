@@ -11,8 +11,8 @@ useful_cols = [7, 8]
 
 def main(filename):
     df = pd.read_csv(filename, usecols=useful_cols)
-    df['grid_x'] = df['grid_x'].apply(lambda x: int(x))
-    df['grid_y'] = df['grid_y'].apply(lambda x: int(x))
+    # Aggregated files written by the GPS processor already have integer grid columns, this only converts older files
+    df = df.astype({'grid_x': 'int64', 'grid_y': 'int64'})
     # print(df)
     # df_unique = df.drop_duplicates()
     # print(df_unique)
@@ -3,6 +3,8 @@ import matplotlib.pyplot as pl
 from scipy.optimize import curve_fit
 import pandas as pd
 import os
+from features import entropy_parameter_fit
+from features.results_store import ResultsStore
 
 
 def func(x, a, b, c, d, e):
@@ -28,26 +30,13 @@ def get_user_id_from_file_name(filename):
     return user_id
 
 if __name__ == '__main__':
-    dir = "/Volumes/Seagate_Rui/dimensionality/data/Vancouver/entropy_rate/"
-    para_list = []
-    for file in os.listdir(dir):
-        df = pd.read_csv(dir+file)
-        user_id = get_user_id_from_file_name(file)
-        print(user_id)
-        # if user_id != '5673':
-        #     continue
-        # input: T, D, L, H
-        # df_valid = df[(df['H'] != 0) & (df['D'] != 15.625) & (df['D'] != 31.25)]
-        df_valid = df.loc[(df.H != 0) & (df.D != 15.625) & (df.D != 31.25)]
-        array_valid = np.array(df_valid)
-        x = array_valid[:, 0:3].T
-        y = array_valid[:, 3]
-        popt, pcov = curve_fit(func, x, y,maxfev=20000)
-        r_squared = calc_r_squared(x, y, popt)
-        print(r_squared)
-
-        para_list.append([user_id, popt[0], popt[1], popt[2], popt[3], popt[4], r_squared])
-        # print(fit_param)
-    df = pd.DataFrame(para_list, columns=['user_id','C1','C2','C3','C4','C5','R_squared'])
+    dataset_id = "Vancouver"
+    dir = "/Volumes/Seagate_Rui/dimensionality/data/" + dataset_id + "/entropy_rate/"
+    # the batched linearized fit of all participants, refined by curve_fit from its solution, replaces one
+    # curve_fit(func, x, y, maxfev=20000) from the default initial guess per participant
+    df = entropy_parameter_fit.fit_entropy_parameters(entropy_parameter_fit.read_entropy_rate_files(dir), refine=True)
+    print(df)
     df.to_csv(dir+"entropy_rate_params.csv", index=False)
-    
\ No newline at end of file
+    results_store = ResultsStore()
+    results_store.upsert('entropy_parameters', dataset_id, df)
+    results_store.close()
@@ -1,41 +1,46 @@
 import os
-import csv
+
+import pandas as pd
+from features.results_store import ResultsStore
 
 """
-Because some participants in foodstudy and Victoria fails to get buffer area, which will disturb 
-the process of other features and interrupt the whole process. So we get seperate file for each participant,
-then run the script in this file to merge all seperate files into one.
+Because some participants in foodstudy and Victoria fails to get buffer area, which will disturb
+the process of other features and interrupt the whole process. So the features of each participant are saved to the
+results store as soon as they are extracted (see FeatureExtractor), and this script exports the merged files of a dataset
+from the store. Separate files of each participant written by older runs are loaded into the store first.
 """
 dataset_id = "foodstudy"
 data_directory = "../../results/"+dataset_id + "/"
-features_list = []
 features_columns = ['user_id','convex_hull','buffer_area','N5','N10','N15','N20', 'ON5','ON10','ON15','ON20']
-time_consumption_list = []
 time_consumption_columns = ['user_id','convex_hull','top_n_convex','buffer_area']
-features_list.append(features_columns)
-time_consumption_list.append(time_consumption_columns)
-
-for file in os.listdir(data_directory):
-    if file.startswith("convex_topNconvex_buffer"):
-        user_id = file.split('.csv_')[1].split('.')[0]
-        time_consumption_list_file = "time_consumption.csv_" + user_id + ".csv"
-        with open(data_directory+file) as fd:
-            for i, line in enumerate(fd):
-                if i == 1:
-                    features_list.append(line.rstrip().split(','))
-                    break
-        with open(data_directory + time_consumption_list_file) as fp:
-            for j, line in enumerate(fp):
-                if j == 1:
-                    time_consumption_list.append(line.rstrip().split(','))
-                    break
-
-with open(data_directory + "convex_topNconvex_buffer.csv", 'w+', newline='') as fd:
-    writer = csv.writer(fd)
-    writer.writerows(features_list)
-
-with open(data_directory + "time_consumption.csv",'w+',newline='') as fd:
-    writer = csv.writer(fd)
-    writer.writerows(time_consumption_list)
 
 
+def load_single_participant_files(results_store, d_id, directory):
+    """Upsert the convex_topNconvex_buffer.csv_<user_id>.csv and time_consumption.csv_<user_id>.csv files"""
+    features_list = []
+    time_consumption_list = []
+    for file in os.listdir(directory):
+        if file.startswith("convex_topNconvex_buffer.csv_"):
+            user_id = file.split('.csv_')[1].split('.')[0]
+            features_list.append(pd.read_csv(directory + file, nrows=1))
+            time_consumption_file = directory + "time_consumption.csv_" + user_id + ".csv"
+            if os.path.isfile(time_consumption_file):
+                time_consumption_list.append(pd.read_csv(time_consumption_file, nrows=1))
+    if features_list:
+        results_store.upsert('features', d_id, pd.concat(features_list)[features_columns])
+    if time_consumption_list:
+        results_store.upsert('timings', d_id, pd.concat(time_consumption_list)[time_consumption_columns])
+    print(len(features_list), "participant files loaded")
+
+
+def export_merged_files(results_store, d_id, directory):
+    results_store.read('features', d_id).drop(columns='dataset').to_csv(directory + "convex_topNconvex_buffer.csv",
+                                                                        index=False)
+    results_store.read('timings', d_id).drop(columns='dataset').to_csv(directory + "time_consumption.csv",
+                                                                       index=False)
+
+
+if __name__ == '__main__':
+    store = ResultsStore()
+    load_single_participant_files(store, dataset_id, data_directory)
+    export_merged_files(store, dataset_id, data_directory)
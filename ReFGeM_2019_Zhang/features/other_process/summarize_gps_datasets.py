@@ -1,5 +1,7 @@
 import pandas as pd
 import os
+from features.dataset_manifest import DatasetManifest, count_lines
+from features.participant_store import ParticipantStore
 
 dataset_info = {"foodstudy":8,
                 "SHED9":5,
@@ -20,11 +22,8 @@ processed_gps_file = "gps_after_processing.csv"
 
 
 def count_lines_in_csv_file(fname):
-    with open(fname) as f:
-        for i, line in enumerate(f):
-            pass
-    # if you need count of line including header, return i+1
-    return i
+    # if you need count of line including header, return count_lines(fname)
+    return count_lines(fname) - 1
 
 
 def get_user_id_from_fname(fname):
@@ -41,39 +40,52 @@ def read_dataframe_from_csv_file(file_name):
         print("Fail to read csv file ", file_name)
 
 
-def summarize_gps_records_in_one_dataset(d_id, file_suffix):
-    gps_count_list = []
-    dir = gps_data_dir + d_id + "/gps/"
-    for file in os.listdir(dir):
-        if file.endswith(file_suffix):
-            user_id = get_user_id_from_fname(file)
-            # print(user_id)
-            aggregated_gps_count = count_lines_in_csv_file(dir+file)
-            original_gps_count = count_lines_in_csv_file(dir + user_id + ".csv")
-            gps_count_list.append([d_id, user_id, original_gps_count, aggregated_gps_count])
-
-    gps_count_df = pd.DataFrame(gps_count_list, columns=['dataset','user_id','original_gps_count','aggregated_gps_count'])
+def summarize_gps_records_in_one_dataset(d_id, file_suffix, processes=None):
+    """
+    Count the records of the original and aggregated file of each participant from the manifest of the gps directory,
+    only the files changed since the last summary are read
+    :param processes: number of processes scanning the changed files, os.cpu_count() if None
+    """
+    manifest = DatasetManifest(gps_data_dir + d_id + "/gps/").refresh(processes)
+    record_counts = manifest.set_index('file_name')['record_count']
+    aggregated_files = manifest.loc[manifest['file_name'].str.endswith(file_suffix)]
+    gps_count_df = pd.DataFrame({'dataset': d_id,
+                                 'user_id': aggregated_files['user_id'].to_numpy(),
+                                 # NaN if the original file of a participant is missing
+                                 'original_gps_count': record_counts.reindex(aggregated_files['user_id'] +
+                                                                             ".csv").to_numpy(),
+                                 'aggregated_gps_count': aggregated_files['record_count'].to_numpy()})
     return gps_count_df
 
 
 def filter_out_participants_with_less_aggrgated_gps_records(df):
-    valid_participants_list = []
-    for dataset_id, group in df.groupby(['dataset']):
-        max_duty_cycles = max(group['aggregated_gps_count'])
-        group_filtered = group.loc[group['aggregated_gps_count'] >= 0.25 * max_duty_cycles]
-        valid_participants_list.append(group_filtered)
-        print(group_filtered.shape)
-    valid_participants_df = pd.concat(valid_participants_list)
+    """Keep the participants with at least 25% of the largest aggregated record count of their dataset"""
+    max_duty_cycles = df.groupby('dataset')['aggregated_gps_count'].transform('max')
+    valid_participants_df = df.loc[df['aggregated_gps_count'] >= 0.25 * max_duty_cycles]
+    valid_participants_df = valid_participants_df.sort_values(['dataset'], kind='stable')
+    print(valid_participants_df.groupby('dataset').size())
     return valid_participants_df
 
 
 def gps_data_valid_participant_only(dataset_list):
+    """
+    Save the processed records of the valid participants of each dataset, only the partitions of the valid participants
+    are read from the participant store written by GPSProcessor
+    """
     valid_gps_df = pd.read_csv(output_dir + "normalized_features_all_datasets.csv", usecols=['dataset','user_id'])
     for dataset in dataset_list:
-        df = pd.read_csv(gps_data_dir + dataset + "/gps_after_processing.csv")
-        valid_gps_df_part = valid_gps_df.loc[valid_gps_df['dataset'] == dataset]
-        df_valid = pd.merge(df, valid_gps_df_part)
-        df_valid.to_csv(gps_data_dir + dataset + "/gps_after_processing_valid_participants_only.csv", index=False)
+        participant_store = ParticipantStore(gps_data_dir + dataset + "/participants/")
+        stored_user_ids = set(participant_store.list_participants())
+        valid_user_ids = valid_gps_df.loc[valid_gps_df['dataset'] == dataset, 'user_id']
+        output_file = gps_data_dir + dataset + "/gps_after_processing_valid_participants_only.csv"
+        is_first_participant = True
+        for user_id in valid_user_ids.drop_duplicates():
+            if int(user_id) not in stored_user_ids:
+                continue
+            df = participant_store.read_participant(int(user_id))
+            df.insert(len(df.columns), 'dataset', dataset)
+            df.to_csv(output_file, index=False, mode='w' if is_first_participant else 'a', header=is_first_participant)
+            is_first_participant = False
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+import os
+import queue
+import traceback
+from multiprocessing import Process, Queue
+from time import sleep, time
+
+"""
+Run one task per participant on a bounded set of worker processes, with a timeout per task.
+Each task runs in its own process, so a participant that raises, crashes the interpreter or runs past the timeout only
+loses its own slot: the error is recorded for that participant, a timed out process is terminated, and the next
+participant starts in its place. Results are reported to a callback as soon as each participant finishes, so that the
+caller can save them incrementally.
+"""
+
+# Seconds between two checks of the running processes
+POLL_INTERVAL = 0.05
+
+
+def run_task(task_function, task_id, task, result_queue):
+    t0 = time()
+    try:
+        task_function(task)
+        result_queue.put([task_id, "done", time() - t0, ""])
+    except Exception:
+        result_queue.put([task_id, "failed", time() - t0, traceback.format_exc()])
+
+
+def run_participant_tasks(task_function, tasks, processes=None, timeout=None, on_result=None):
+    """
+    Run task_function(task) for each task in a separate process, at most `processes` at the same time
+    :param task_function: module level function, its return value is ignored
+    :param tasks: list of (task_id, task), e.g. (user_id, file_name)
+    :param processes: number of concurrent processes, os.cpu_count() if None
+    :param timeout: seconds after which a task is terminated, no limit if None
+    :param on_result: function called with [task_id, status, seconds, error] when a task ends, in the main process
+    :return: list of [task_id, status, seconds, error], status is "done", "failed", "crashed" or "timeout"
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    result_queue = Queue()
+    pending = list(reversed(tasks))
+    # task_id -> (process, start time)
+    running = {}
+    results = []
+
+    def finish(result):
+        if result[0] not in running:
+            # late result of a terminated task
+            return
+        process, _ = running.pop(result[0])
+        process.join()
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    while pending or running:
+        while pending and len(running) < processes:
+            task_id, task = pending.pop()
+            process = Process(target=run_task, args=(task_function, task_id, task, result_queue))
+            process.start()
+            running[task_id] = (process, time())
+        try:
+            while True:
+                finish(result_queue.get(timeout=POLL_INTERVAL))
+        except queue.Empty:
+            pass
+        for task_id, (process, start_time) in list(running.items()):
+            if not process.is_alive():
+                # the result of a process is in the queue before it exits, unless the process crashed
+                sleep(POLL_INTERVAL)
+                try:
+                    while True:
+                        finish(result_queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if task_id in running:
+                    finish([task_id, "crashed", time() - start_time, "exit code " + str(process.exitcode)])
+            elif timeout is not None and time() - start_time > timeout:
+                process.terminate()
+                finish([task_id, "timeout", time() - start_time, "terminated after " + str(timeout) + " seconds"])
+    return results
@@ -0,0 +1,196 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+"""
+Partitioned columnar store of the GPS records of each participant.
+Layout:
+    <store_directory>/user_id=<user_id>/part-<n>.parquet    records of one participant, sorted by record_time
+    <store_directory>/_participants.parquet                 record count, start time and end time of each participant
+The metadata is computed while the records are written, so study durations and record counts don't need to read the
+records back. Readers only load the partition of the participant and the columns they need.
+Records appended chunk by chunk are summarized in memory, and the metadata is merged and saved once by flush_metadata or
+compact at the end of the stream.
+"""
+
+METADATA_FILE_NAME = "_participants.parquet"
+METADATA_COLUMNS = ['user_id', 'record_count', 'start_time', 'end_time']
+PARTITION_PREFIX = "user_id="
+# Column types of the stored records, columns not listed here are stored as they are
+COLUMN_TYPES = {'user_id': np.int64,
+                'accu': np.float64,
+                'lat': np.float64,
+                'lon': np.float64,
+                'easting': np.float64,
+                'northing': np.float64,
+                'grid_x': np.int32,
+                'grid_y': np.int32,
+                'DutyCycle': np.int64}
+
+
+def convert_column_types(df):
+    df = df.astype({column: column_type for column, column_type in COLUMN_TYPES.items() if column in df.columns})
+    if 'record_time' in df.columns:
+        df['record_time'] = pd.to_datetime(df['record_time'])
+    return df
+
+
+class ParticipantStore:
+    def __init__(self, store_directory):
+        self.store_directory = store_directory
+        self.metadata_file_path = os.path.join(store_directory, METADATA_FILE_NAME)
+        os.makedirs(store_directory, exist_ok=True)
+        self.metadata = self.load_metadata()
+        # metadata of the appended records not merged yet, and number of parts of each partition appended to
+        self.pending_summaries = []
+        self.part_counts = {}
+
+    def load_metadata(self):
+        if os.path.isfile(self.metadata_file_path):
+            return pd.read_parquet(self.metadata_file_path)
+        return pd.DataFrame({'user_id': pd.Series(dtype=np.int64),
+                             'record_count': pd.Series(dtype=np.int64),
+                             'start_time': pd.Series(dtype='datetime64[ns]'),
+                             'end_time': pd.Series(dtype='datetime64[ns]')})
+
+    def save_metadata(self):
+        self.metadata = self.metadata.sort_values(['user_id']).reset_index(drop=True)
+        self.metadata.to_parquet(self.metadata_file_path, index=False)
+
+    def get_partition_directory(self, user_id):
+        return os.path.join(self.store_directory, PARTITION_PREFIX + str(user_id))
+
+    def get_part_files(self, user_id):
+        partition_directory = self.get_partition_directory(user_id)
+        if not os.path.isdir(partition_directory):
+            return []
+        part_files = [file_name for file_name in os.listdir(partition_directory) if file_name.endswith(".parquet")]
+        part_files.sort(key=lambda file_name: int(file_name[len("part-"):-len(".parquet")]))
+        return [os.path.join(partition_directory, file_name) for file_name in part_files]
+
+    def list_participants(self):
+        return self.metadata['user_id'].tolist()
+
+    def summarize_records(self, gps_df):
+        """Return the metadata [user_id, record_count, start_time, end_time] of each participant in gps_df"""
+        grouped = gps_df.groupby('user_id')
+        if 'record_time' in gps_df.columns:
+            summary = grouped['record_time'].agg(['size', 'min', 'max']).reset_index()
+        else:
+            summary = grouped.size().reset_index(name='size')
+            summary['min'] = pd.NaT
+            summary['max'] = pd.NaT
+        summary.columns = METADATA_COLUMNS
+        return summary
+
+    def update_metadata(self, summary, replace):
+        """
+        Merge the metadata of new records into the metadata of the store
+        :param summary: metadata of the new records
+        :param replace: if True, the new records replace the records of the participants, otherwise they are appended
+        """
+        existing = self.metadata[self.metadata['user_id'].isin(summary['user_id'])]
+        others = self.metadata[~self.metadata['user_id'].isin(summary['user_id'])]
+        if not replace and existing.shape[0] > 0:
+            merged = pd.concat([existing, summary]).groupby('user_id').agg({'record_count': 'sum',
+                                                                           'start_time': 'min',
+                                                                           'end_time': 'max'}).reset_index()
+        else:
+            merged = summary
+        self.metadata = pd.concat([df for df in [others, merged] if df.shape[0] > 0], ignore_index=True)
+        self.save_metadata()
+
+    def flush_metadata(self):
+        """Merge the metadata of the records appended since the last flush into the metadata of the store and save it"""
+        if not self.pending_summaries:
+            return
+        summary = pd.concat(self.pending_summaries).groupby('user_id').agg({'record_count': 'sum',
+                                                                            'start_time': 'min',
+                                                                            'end_time': 'max'}).reset_index()
+        self.pending_summaries = []
+        self.update_metadata(summary, replace=False)
+
+    def write_participants(self, gps_df):
+        """Write the records of each participant in gps_df, replacing what is stored for these participants"""
+        self.flush_metadata()
+        gps_df = convert_column_types(gps_df)
+        for user_id, data in gps_df.groupby('user_id'):
+            partition_directory = self.get_partition_directory(user_id)
+            self.part_counts.pop(user_id, None)
+            if os.path.isdir(partition_directory):
+                shutil.rmtree(partition_directory)
+            os.makedirs(partition_directory)
+            if 'record_time' in data.columns:
+                data = data.sort_values(['record_time'])
+            data.to_parquet(os.path.join(partition_directory, "part-0.parquet"), index=False)
+        self.update_metadata(self.summarize_records(gps_df), replace=True)
+
+    def append_participants(self, gps_df):
+        """
+        Append the records of each participant in gps_df as a new part of the partitions. The metadata is updated by
+        flush_metadata or compact.
+        """
+        gps_df = convert_column_types(gps_df)
+        for user_id, data in gps_df.groupby('user_id'):
+            partition_directory = self.get_partition_directory(user_id)
+            os.makedirs(partition_directory, exist_ok=True)
+            part_count = self.part_counts.get(user_id)
+            if part_count is None:
+                part_count = len(self.get_part_files(user_id))
+            data.to_parquet(os.path.join(partition_directory, "part-" + str(part_count) + ".parquet"), index=False)
+            self.part_counts[user_id] = part_count + 1
+        self.pending_summaries.append(self.summarize_records(gps_df))
+
+    def compact(self, user_ids=None):
+        """Save the metadata of the appended records and merge the parts of each partition into a single part sorted by
+        record_time"""
+        self.flush_metadata()
+        if user_ids is None:
+            user_ids = self.list_participants()
+        for user_id in user_ids:
+            part_files = self.get_part_files(user_id)
+            if len(part_files) <= 1:
+                continue
+            data = pd.concat([pd.read_parquet(part_file) for part_file in part_files], ignore_index=True)
+            if 'record_time' in data.columns:
+                data = data.sort_values(['record_time'], kind='mergesort')
+            partition_directory = self.get_partition_directory(user_id)
+            shutil.rmtree(partition_directory)
+            os.makedirs(partition_directory)
+            data.to_parquet(os.path.join(partition_directory, "part-0.parquet"), index=False)
+            self.part_counts.pop(user_id, None)
+
+    def clear(self):
+        """Remove all records and metadata from the store"""
+        for file_name in os.listdir(self.store_directory):
+            if file_name.startswith(PARTITION_PREFIX):
+                shutil.rmtree(os.path.join(self.store_directory, file_name))
+        if os.path.isfile(self.metadata_file_path):
+            os.remove(self.metadata_file_path)
+        self.metadata = self.load_metadata()
+        self.pending_summaries = []
+        self.part_counts = {}
+
+    def read_participant(self, user_id, columns=None):
+        """
+        Read the records of a participant
+        :param user_id: id of the participant
+        :param columns: list of columns to read, all columns if None
+        :return: dataframe of the records of the participant
+        """
+        part_files = self.get_part_files(user_id)
+        if not part_files:
+            raise KeyError("Participant " + str(user_id) + " is not in the store " + self.store_directory)
+        part_dfs = [pd.read_parquet(part_file, columns=columns) for part_file in part_files]
+        if len(part_dfs) == 1:
+            return part_dfs[0]
+        return pd.concat(part_dfs, ignore_index=True)
+
+    def get_study_duration(self, study, data):
+        """Return the study duration of each participant in the format of study_duration.csv"""
+        duration_df = self.metadata[['user_id', 'start_time', 'end_time']].copy()
+        duration_df.insert(0, 'study', study)
+        duration_df.insert(2, 'data', data)
+        return duration_df
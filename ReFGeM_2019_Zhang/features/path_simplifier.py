@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+import numpy as np
+
+"""
+Douglas-Peucker simplification of GPS paths before buffering.
+A vertex is removed if it is within the tolerance of the segment between the kept vertices around it, so nearly
+collinear runs of fixes become one segment. The distances of the points of a run to its segment are computed with numpy,
+and runs are split with an explicit stack instead of recursion.
+The change of the buffer area caused by the simplification is measured by
+calc_buffer_area.calc_simplification_area_deviation.
+"""
+
+# Default tolerance in meters, well below the 200m buffer radius
+DEFAULT_SIMPLIFICATION_TOLERANCE = 10.0
+
+SimplifiedPath = namedtuple('SimplifiedPath', ['path', 'removed_vertices', 'max_distance'])
+
+
+def calc_point_segment_distances(points, start, end):
+    """Return the distance of each point of an array [[x, y]] to the segment from start to end"""
+    direction = end - start
+    squared_length = direction.dot(direction)
+    if squared_length == 0:
+        return np.hypot(points[:, 0] - start[0], points[:, 1] - start[1])
+    fractions = np.clip((points - start).dot(direction) / squared_length, 0, 1)
+    projections = start + fractions[:, np.newaxis] * direction
+    return np.hypot(points[:, 0] - projections[:, 0], points[:, 1] - projections[:, 1])
+
+
+def calc_douglas_peucker_mask(points, tolerance):
+    """
+    :param points: array [[x, y]] of the vertices of the path
+    :param tolerance: maximum distance of a removed vertex to the simplified path
+    :return: (boolean mask of the kept vertices, maximum distance of the removed vertices to the simplified path)
+    """
+    point_count = points.shape[0]
+    keep = np.zeros(point_count, dtype=bool)
+    keep[[0, -1]] = True
+    max_distance = 0.0
+    stack = [(0, point_count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = calc_point_segment_distances(points[start + 1:end], points[start], points[end])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            keep[start + 1 + farthest] = True
+            stack.append((start, start + 1 + farthest))
+            stack.append((start + 1 + farthest, end))
+        else:
+            max_distance = max(max_distance, float(distances[farthest]))
+    return keep, max_distance
+
+
+def simplify_path(utm_path, tolerance=DEFAULT_SIMPLIFICATION_TOLERANCE):
+    """
+    Simplify a path with the Douglas-Peucker algorithm
+    :param utm_path: array [[easting, northing]] of the vertices of the path
+    :param tolerance: maximum distance in meters of a removed vertex to the simplified path, None to keep all vertices
+    :return: SimplifiedPath(path, removed_vertices, max_distance)
+    """
+    utm_path = np.asarray(utm_path, dtype=np.float64).reshape(-1, 2)
+    if tolerance is None or utm_path.shape[0] < 3:
+        return SimplifiedPath(utm_path, 0, 0.0)
+    keep, max_distance = calc_douglas_peucker_mask(utm_path, tolerance)
+    return SimplifiedPath(utm_path[keep], int(np.count_nonzero(~keep)), max_distance)
+
@@ -1,13 +1,15 @@
 import folium
 import numpy as np
 import pandas as pd
-from folium.plugins import HeatMap
+from folium.raster_layers import ImageOverlay
 from folium.map import FitBounds
 from folium import PolyLine
 import time
 from selenium import webdriver
-from pyproj import Proj,transform
+from pyproj import Proj
 from features.DatasetConfiguration import get_dataset_parameters
+from features.plot.heatmap_raster import build_heatmap_raster, get_latlon_bounds, save_heatmap_raster
+from features.projection import project
 import branca.colormap as cm
 import matplotlib.pyplot as plt
 import matplotlib as mpl
@@ -45,27 +47,6 @@ VAN_PROJ_UTM = Proj(init='epsg:32610')
 # ROME_PROJ_UTM = Proj(init='epsg:26591')
 ROME_PROJ_UTM = Proj(init='epsg:32633')
 
-def get_UTM_grid_center(latitudes, longitudes, grid_size, proj_utm, utm_boundary):
-    min_easting = utm_boundary[0]
-    min_northing = utm_boundary[1]
-    eastings, northings = transform(PROJ_LATLONG, proj_utm, np.array(longitudes), np.array(latitudes))
-    grid_x = np.floor((eastings - min_easting) / grid_size)
-    grid_y = np.floor((northings - min_northing) / grid_size)
-    easting_new = np.array(grid_x) * grid_size + min_easting
-    northing_new = np.array(grid_y) * grid_size + min_northing
-    new_lat, new_long = transform(proj_utm, PROJ_LATLONG, easting_new, northing_new)
-    return new_lat, new_long
-
-def get_location_frequency(gps_df, grid_size, proj_utm, utm_boundary):
-    latitudes = gps_df['lat']
-    longitudes = gps_df['lon']
-    new_lon, new_lat = get_UTM_grid_center(latitudes, longitudes, grid_size, proj_utm, utm_boundary)
-    gps_df['latitude'] = new_lat
-    gps_df['longitude'] = new_lon
-    new_df = gps_df.groupby(['latitude', 'longitude']).size().reset_index(name='counts')
-    return new_df
-
-
 if __name__ == "__main__":
     # fig, ax = plt.subplots(figsize=(6, 1))
     # fig.subplots_adjust(bottom=0.5)
@@ -80,13 +61,17 @@ if __name__ == "__main__":
     # plt.show()
 
     grid_size = 250
+    # standard deviation of the smoothing kernel in cells, None to show the counts of the cells
+    smoothing_sigma = None
     for db_name in DATASET:
         gps_df = pd.read_csv("/Volumes/Seagate_Rui/dimensionality/data/"+
                              db_name + "/gps_after_processing_valid_participants_only.csv", usecols=['lon', 'lat'])
         db_config = get_dataset_parameters(db_name)
-        gps_df_processed = get_location_frequency(gps_df, grid_size, db_config.proj_utm, db_config.city_boundary_utm)
-        lats = np.array(gps_df_processed['latitude'])
-        lons = np.array(gps_df_processed['longitude'])
+        eastings, northings = project(PROJ_LATLONG, db_config.proj_utm, gps_df['lon'], gps_df['lat'])
+        raster = build_heatmap_raster(eastings, northings, grid_size, db_config.city_boundary_utm, smoothing_sigma)
+        print(raster.dropped_fixes, "fixes outside the city boundary")
+        image_bounds = get_latlon_bounds(raster.utm_bounds, PROJ_LATLONG, db_config.proj_utm)
+        image_file = save_heatmap_raster(raster, PLOT_PATH + db_name + "_heatmap", image_bounds)
         lat_lon_boundary = db_config.city_boundary
         bounding_box = [(lat_lon_boundary[0], lat_lon_boundary[1]),
                         (lat_lon_boundary[2], lat_lon_boundary[1]),
@@ -99,18 +84,8 @@ if __name__ == "__main__":
                        width=550, height=500, control_scale=True)
         # m = folium.Map(location=[37.578,-57.728], tiles="OpenStreetMap", zoom_start=10,
         #                width=550, height=500, control_scale=True)
-        gps_df_processed['normalized_counts'] = gps_df_processed['counts'] / gps_df_processed['counts'].sum()
-        stationArr = gps_df_processed[['latitude', 'longitude','normalized_counts']].as_matrix().tolist()
-
-        # print(stationArr)
-
-        # # plot heatmap
-        # colormap = cm.LinearColormap(['blue', 'lime', 'yellow', 'red'], index=[0.3, 0.5, 0.7, 1.0])
-        # colormap.caption = 'A colormap caption'
-        # m.add_child(colormap)
-        # {0:'blue', 0.25:'green',0.75:'yellow', 1.0:'red'}
-        m.add_child(HeatMap(stationArr, gradient={0.3: 'blue', 0.5: 'lime', 0.7: 'yellow', 1: 'red'}, radius=0,
-                            min_opacity=0.3, blur=0))
+        # the density is drawn as one image instead of a HeatMap point per cell
+        m.add_child(ImageOverlay(image_file, bounds=image_bounds, interactive=False))
         PolyLine(bounding_box, color="blue", weight=1, opacity=1).add_to(m)
         m.save(db_name+"_test.html")
 
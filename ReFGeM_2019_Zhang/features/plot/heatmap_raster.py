@@ -0,0 +1,122 @@
+from collections import namedtuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import LinearSegmentedColormap, to_rgba
+from scipy.signal import fftconvolve
+
+from features.projection import project
+
+"""
+Raster heatmap of the GPS fixes of a dataset.
+Fixes are binned on the UTM grid of the city boundary with one np.bincount of the flat cell index, optionally smoothed
+with a Gaussian kernel by FFT convolution, and saved as one RGBA image plus its bounds, which the map shows with a single
+image overlay instead of one heatmap point per cell.
+Row 0 of the density is the northern edge of the boundary, the orientation of an image. The overlay is placed on the
+latitude/longitude box of the corners of the UTM boundary, which ignores the small rotation between the UTM grid and the
+meridians at city scale.
+"""
+
+# The gradient and minimum opacity of the folium HeatMap of draw_dataset_heatmap, empty cells are transparent
+HEATMAP_GRADIENT = {0.3: 'blue', 0.5: 'lime', 0.7: 'yellow', 1: 'red'}
+HEATMAP_MIN_OPACITY = 0.3
+# Kernel is truncated at this many standard deviations
+KERNEL_TRUNCATE = 3.0
+# Smoothed values below this fraction of the maximum are FFT rounding errors and are set to 0
+FFT_ROUNDING_EPSILON = 1e-12
+
+HeatmapRaster = namedtuple('HeatmapRaster', ['density', 'utm_bounds', 'grid_size', 'dropped_fixes'])
+
+
+def bin_fixes(eastings, northings, grid_size, utm_boundary):
+    """
+    Count the fixes in each grid cell of the boundary
+    :param utm_boundary: [min_easting, min_northing, max_easting, max_northing]
+    :return: (array [row, column] of counts with row 0 at max_northing, number of fixes outside the boundary)
+    """
+    eastings = np.asarray(eastings, dtype=np.float64)
+    northings = np.asarray(northings, dtype=np.float64)
+    columns = int(np.ceil((utm_boundary[2] - utm_boundary[0]) / grid_size))
+    rows = int(np.ceil((utm_boundary[3] - utm_boundary[1]) / grid_size))
+    grid_x = np.floor((eastings - utm_boundary[0]) / grid_size)
+    grid_y = np.floor((northings - utm_boundary[1]) / grid_size)
+    inside = (grid_x >= 0) & (grid_x < columns) & (grid_y >= 0) & (grid_y < rows)
+    flat_index = (rows - 1 - grid_y[inside].astype(np.int64)) * columns + grid_x[inside].astype(np.int64)
+    counts = np.bincount(flat_index, minlength=rows * columns).reshape(rows, columns)
+    return counts, int(np.count_nonzero(~inside))
+
+
+def make_gaussian_kernel(sigma):
+    """Return the normalized 2D Gaussian kernel of a standard deviation in cells"""
+    radius = max(int(np.ceil(KERNEL_TRUNCATE * sigma)), 1)
+    offsets = np.arange(-radius, radius + 1)
+    kernel_1d = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel = np.outer(kernel_1d, kernel_1d)
+    return kernel / kernel.sum()
+
+
+def smooth_density(counts, sigma):
+    """Convolve the counts with a Gaussian kernel by FFT, the result has the shape of the counts"""
+    smoothed = fftconvolve(counts.astype(np.float64), make_gaussian_kernel(sigma), mode='same')
+    # FFT rounding leaves tiny values of either sign in empty areas, which would be drawn as non empty cells
+    smoothed[smoothed < FFT_ROUNDING_EPSILON * smoothed.max()] = 0
+    return smoothed
+
+
+def build_heatmap_raster(eastings, northings, grid_size, utm_boundary, sigma=None):
+    """
+    Bin and smooth the fixes of a dataset
+    :param grid_size: size of the cells in meters
+    :param sigma: standard deviation of the smoothing kernel in cells, no smoothing if None
+    :return: HeatmapRaster(density normalized to sum 1, utm_bounds, grid_size, dropped_fixes)
+    """
+    counts, dropped_fixes = bin_fixes(eastings, northings, grid_size, utm_boundary)
+    density = counts.astype(np.float64) if sigma is None else smooth_density(counts, sigma)
+    total = density.sum()
+    if total > 0:
+        density /= total
+    rows, columns = counts.shape
+    utm_bounds = [utm_boundary[0], utm_boundary[1], utm_boundary[0] + columns * grid_size,
+                  utm_boundary[1] + rows * grid_size]
+    return HeatmapRaster(density, utm_bounds, grid_size, dropped_fixes)
+
+
+def get_latlon_bounds(utm_bounds, proj_latlong, proj_utm):
+    """Return [[south, west], [north, east]] of the corners of the UTM bounds, the bounds of a folium ImageOverlay"""
+    longitudes, latitudes = project(proj_utm, proj_latlong, [utm_bounds[0], utm_bounds[0], utm_bounds[2], utm_bounds[2]],
+                                    [utm_bounds[1], utm_bounds[3], utm_bounds[1], utm_bounds[3]])
+    return [[float(np.min(latitudes)), float(np.min(longitudes))], [float(np.max(latitudes)), float(np.max(longitudes))]]
+
+
+def to_rgba_image(density, gradient=None, min_opacity=HEATMAP_MIN_OPACITY):
+    """
+    Color the density scaled to its maximum with the gradient
+    :param gradient: dict of position in [0, 1] -> color, HEATMAP_GRADIENT if None
+    :return: uint8 array [row, column, RGBA], empty cells are transparent
+    """
+    if gradient is None:
+        gradient = HEATMAP_GRADIENT
+    positions = sorted(gradient)
+    colors = [(0.0, to_rgba(gradient[positions[0]]))] + [(position, to_rgba(gradient[position]))
+                                                         for position in positions]
+    if positions[-1] < 1:
+        colors.append((1.0, to_rgba(gradient[positions[-1]])))
+    colormap = LinearSegmentedColormap.from_list("heatmap", colors)
+    peak = density.max()
+    scaled = density / peak if peak > 0 else density
+    image = colormap(scaled)
+    image[..., 3] = np.where(scaled > 0, min_opacity + (1 - min_opacity) * scaled, 0)
+    return (image * 255).round().astype(np.uint8)
+
+
+def save_heatmap_raster(raster, output_prefix, latlon_bounds=None):
+    """
+    Save <output_prefix>.png, the image of the density, and <output_prefix>.npz with the density and its bounds
+    :return: path of the png file
+    """
+    image_file = output_prefix + ".png"
+    plt.imsave(image_file, to_rgba_image(raster.density))
+    np.savez_compressed(output_prefix + ".npz", density=raster.density, utm_bounds=np.array(raster.utm_bounds),
+                        grid_size=raster.grid_size,
+                        latlon_bounds=np.array(latlon_bounds if latlon_bounds is not None else np.nan))
+    return image_file
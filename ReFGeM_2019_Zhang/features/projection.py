@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pyproj import Transformer
+
+"""
+Coordinate projection shared by the GPS processing, the boundary helpers and the plots.
+One pyproj Transformer is built for each pair of projections and cached, instead of calling the deprecated
+pyproj.transform(Proj, Proj, ...) which rebuilds the transformation on every call. Large arrays are projected in chunks
+on a thread pool (pyproj releases the GIL while transforming). The thread pools live for the whole process, so each of
+their threads builds its Transformers once and reuses them across calls.
+"""
+
+# CONFIGURE
+PROJECTION_CHUNK_SIZE = 500000
+PROJECTION_MAX_WORKERS = 4
+# END CONFIGURE
+
+# Transformers are cached per thread because older pyproj versions don't allow sharing them between threads
+_transformer_cache = threading.local()
+# Thread pools of project, one per max_workers, created on first use
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_projection_key(proj):
+    """Return a hashable definition of a pyproj Proj (or a CRS string such as 'epsg:32613')"""
+    return getattr(proj, 'srs', proj)
+
+
+def get_transformer(proj_from, proj_to):
+    """
+    Return the cached Transformer from proj_from to proj_to. Like pyproj.transform, the order of coordinates is
+    (x, y), i.e. (longitude, latitude) or (easting, northing).
+    """
+    if not hasattr(_transformer_cache, 'transformers'):
+        _transformer_cache.transformers = {}
+    key = (get_projection_key(proj_from), get_projection_key(proj_to))
+    transformer = _transformer_cache.transformers.get(key)
+    if transformer is None:
+        transformer = Transformer.from_crs(key[0], key[1], always_xy=True)
+        _transformer_cache.transformers[key] = transformer
+    return transformer
+
+
+def get_executor(max_workers):
+    """Return the thread pool of max_workers threads shared by all calls of project"""
+    with _executors_lock:
+        executor = _executors.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="projection")
+            _executors[max_workers] = executor
+    return executor
+
+
+def _project_chunk(proj_from, proj_to, xs, ys):
+    return get_transformer(proj_from, proj_to).transform(xs, ys)
+
+
+def project(proj_from, proj_to, xs, ys, chunk_size=PROJECTION_CHUNK_SIZE, max_workers=PROJECTION_MAX_WORKERS):
+    """
+    Project arrays of coordinates from proj_from to proj_to.
+    :param xs: array of x coordinates (longitude or easting)
+    :param ys: array of y coordinates (latitude or northing)
+    :param chunk_size: arrays longer than chunk_size are split into chunks projected on a thread pool
+    :param max_workers: size of the thread pool
+    :return: projected arrays (new_xs, new_ys)
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    if xs.size <= chunk_size or max_workers <= 1:
+        return _project_chunk(proj_from, proj_to, xs, ys)
+    bounds = range(0, xs.size, chunk_size)
+    new_xs = np.empty_like(xs)
+    new_ys = np.empty_like(ys)
+    executor = get_executor(max_workers)
+    futures = [(start, executor.submit(_project_chunk, proj_from, proj_to,
+                                       xs[start:start + chunk_size], ys[start:start + chunk_size]))
+               for start in bounds]
+    for start, future in futures:
+        chunk_xs, chunk_ys = future.result()
+        new_xs[start:start + chunk_size] = chunk_xs
+        new_ys[start:start + chunk_size] = chunk_ys
+    return new_xs, new_ys
+
+
+def project_point(proj_from, proj_to, x, y):
+    """Project a single point, return [new_x, new_y]"""
+    new_x, new_y = get_transformer(proj_from, proj_to).transform(x, y)
+    return [new_x, new_y]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+"""
+Vectorized standardization of raw GPS and battery records.
+The raw exports may contain numbers with thousands separators (e.g. "1,375" in column 'accu' or "1,001" in column
+'user_id'). The functions below clean whole columns with pandas string operations instead of a python function per row.
+"""
+
+NANOSECONDS_PER_MINUTE = 60 * 10 ** 9
+
+
+def remove_thousands_separator(series):
+    """
+    Remove "," from a column of numbers, the column is returned untouched if it is already numeric
+    :param series: column of raw values
+    :return: column of strings (or numbers) without thousands separators
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    # missing values stay missing instead of becoming the string "nan"
+    return series.astype(str).str.replace(',', '', regex=False).where(series.notna())
+
+
+def standardize_accuracy(series):
+    """Convert column 'accu' to float, same as float(str(x).replace(',', '')) for each row"""
+    return pd.to_numeric(remove_thousands_separator(series)).astype(np.float64)
+
+
+def standardize_user_id(series):
+    """Convert column 'user_id' to int, same as int(str(x).replace(',', '')) for each row"""
+    return pd.to_numeric(remove_thousands_separator(series)).astype(np.int64)
+
+
+def standardize_record_time(series):
+    return pd.to_datetime(series)
+
+
+def calc_duty_cycle_index(record_time, start_time, duty_cycle_minutes):
+    """
+    Calculate the index of duty cycle of each record, i.e. floor((record_time - start_time) / duty_cycle) with int64
+    nanosecond arithmetic.
+    :param record_time: column of datetime
+    :param start_time: start time of the first duty cycle
+    :param duty_cycle_minutes: length of a duty cycle in minutes
+    :return: array of int64 duty cycle indices
+    """
+    record_time_ns = record_time.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    start_time_ns = np.datetime64(pd.Timestamp(start_time).to_datetime64(), 'ns').view(np.int64)
+    return (record_time_ns - start_time_ns) // np.int64(duty_cycle_minutes * NANOSECONDS_PER_MINUTE)
+
+
+def standardize_gps_dataframe(gps_df):
+    """Standardize columns 'accu' (if applicable), 'user_id' and 'record_time' of raw GPS records in place"""
+    if 'accu' in gps_df.columns:
+        gps_df['accu'] = standardize_accuracy(gps_df['accu'])
+    gps_df['user_id'] = standardize_user_id(gps_df['user_id'])
+    gps_df['record_time'] = standardize_record_time(gps_df['record_time'])
+    return gps_df
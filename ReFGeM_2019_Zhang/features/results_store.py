@@ -0,0 +1,196 @@
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+"""
+Single SQLite store of the results of all datasets, in WAL mode so that worker processes can write while others read.
+Each table has one row per (dataset, user_id), and the other columns are the results, e.g.
+    features              convex_hull, buffer_area, N5 ... ON20 of FeatureExtractor
+    timings               seconds taken by each feature of FeatureExtractor
+    buffer_area_curve     B50 ... B800 of FeatureExtractor(buffer_area_curve=True), raster areas of the buffer_area
+    buffer_area_simplification  removed_vertices, area_deviation of the simplified path of buffer_area
+    entropy_parameters    C1 ... C5, R_squared of the entropy rate surface fit
+    dimensionality        fit_params_0, fit_params_1, fit_params_2, mse, dim of the fractal dimensionality
+    valid_participants    participants kept for the analysis
+An upsert writes all rows of a call in one transaction, replacing the values of participants that are already stored,
+and upsert_many writes the rows of several tables in one transaction, e.g. all results of a participant.
+Columns are added to a table the first time they are written.
+"""
+
+# One store for all scripts, results/results.sqlite of the project whatever the working directory
+RESULTS_STORE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results",
+                                  "results.sqlite")
+# Tables joined into the features of a participant, in the order of their columns
+MERGED_FEATURES_TABLES = ['features', 'dimensionality', 'entropy_parameters']
+NORMALIZED_COLUMNS = ['dim', 'C1', 'C2', 'C3', 'C4', 'C5', 'R_squared', 'convex_hull', 'buffer_area',
+                      'N5', 'N10', 'N15', 'N20', 'ON5', 'ON10', 'ON15', 'ON20']
+KEY_COLUMNS = ['dataset', 'user_id']
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+BUSY_TIMEOUT_MILLISECONDS = 60000
+
+
+def check_identifier(name):
+    """Table and column names are put in the SQL statements, so only plain identifiers are accepted"""
+    if not IDENTIFIER.match(name):
+        raise ValueError("Invalid table or column name " + repr(name))
+    return name
+
+
+def normalize_user_id(user_id):
+    """User ids from file names are strings and user ids from csv files are integers, both are stored as integers"""
+    user_id = str(user_id).strip()
+    return int(user_id) if re.match(r"^-?\d+$", user_id) else user_id
+
+
+def to_sql_value(value):
+    """Convert numpy scalars to python values, NaN is stored as NULL"""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class ResultsStore:
+    def __init__(self, database_file=None):
+        """
+        :param database_file: path of the SQLite file, RESULTS_STORE_FILE if None
+        """
+        if database_file is None:
+            database_file = RESULTS_STORE_FILE
+        self.database_file = database_file
+        database_directory = os.path.dirname(database_file)
+        if database_directory:
+            os.makedirs(database_directory, exist_ok=True)
+        self.connection = sqlite3.connect(database_file, timeout=BUSY_TIMEOUT_MILLISECONDS / 1000)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA busy_timeout=" + str(BUSY_TIMEOUT_MILLISECONDS))
+
+    def close(self):
+        self.connection.close()
+
+    def get_columns(self, table):
+        rows = self.connection.execute("PRAGMA table_info(" + check_identifier(table) + ")").fetchall()
+        return [row[1] for row in rows]
+
+    def has_table(self, table):
+        return len(self.get_columns(table)) > 0
+
+    def ensure_columns(self, table, columns):
+        """Create the table or add the missing columns, the caller holds the write transaction"""
+        existing_columns = self.get_columns(table)
+        if not existing_columns:
+            column_definitions = ", ".join(["dataset TEXT NOT NULL", "user_id NOT NULL"] +
+                                           [check_identifier(column) for column in columns])
+            self.connection.execute("CREATE TABLE " + check_identifier(table) + " (" + column_definitions +
+                                    ", PRIMARY KEY (dataset, user_id))")
+            return
+        for column in columns:
+            if column not in existing_columns:
+                self.connection.execute("ALTER TABLE " + check_identifier(table) + " ADD COLUMN " +
+                                        check_identifier(column))
+
+    def upsert(self, table, dataset, df):
+        """
+        Insert or replace the results of participants atomically
+        :param table: name of the table, e.g. "features"
+        :param dataset: dataset id
+        :param df: dataframe with a column "user_id" and a column for each result
+        """
+        self.upsert_many(dataset, {table: df})
+
+    def upsert_many(self, dataset, table_dfs):
+        """
+        Insert or replace the results of participants in several tables in one transaction
+        :param dataset: dataset id
+        :param table_dfs: dict of table name -> dataframe with a column "user_id" and a column for each result
+        """
+        with self.connection:
+            # take the write lock before reading the schema, so concurrent writers don't add the same column
+            self.connection.execute("BEGIN IMMEDIATE")
+            for table, df in table_dfs.items():
+                self.write_rows(table, dataset, df)
+
+    def write_rows(self, table, dataset, df):
+        """Upsert the rows of a dataframe, the caller holds the write transaction"""
+        columns = [column for column in df.columns if column not in KEY_COLUMNS]
+        column_values = [df[column].tolist() for column in columns]
+        rows = [[dataset, normalize_user_id(user_id)] + [to_sql_value(values[i]) for values in column_values]
+                for i, user_id in enumerate(df['user_id'])]
+        column_list = ", ".join(KEY_COLUMNS + columns)
+        placeholders = ", ".join(["?"] * (len(columns) + 2))
+        if columns:
+            update = " DO UPDATE SET " + ", ".join(column + " = excluded." + column for column in columns)
+        else:
+            update = " DO NOTHING"
+        self.ensure_columns(table, columns)
+        self.connection.executemany("INSERT INTO " + check_identifier(table) + " (" + column_list + ") VALUES (" +
+                                    placeholders + ") ON CONFLICT (dataset, user_id)" + update, rows)
+
+    def has_participant(self, table, dataset, user_id):
+        if not self.has_table(table):
+            return False
+        row = self.connection.execute("SELECT 1 FROM " + check_identifier(table) +
+                                      " WHERE dataset = ? AND user_id = ?",
+                                      (dataset, normalize_user_id(user_id))).fetchone()
+        return row is not None
+
+    def read(self, table, dataset=None):
+        """Return the rows of a table as a dataframe sorted by dataset and user_id, for one dataset or all datasets"""
+        query = "SELECT * FROM " + check_identifier(table)
+        parameters = []
+        if dataset is not None:
+            query += " WHERE dataset = ?"
+            parameters.append(dataset)
+        return pd.read_sql_query(query + " ORDER BY dataset, user_id", self.connection, params=parameters)
+
+    def get_merged_features_query(self, datasets=None, valid_only=False):
+        """Return the query joining the MERGED_FEATURES_TABLES of each participant and its parameters"""
+        select_columns = ["features.dataset", "features.user_id"]
+        for table in MERGED_FEATURES_TABLES:
+            select_columns += [table + "." + column for column in self.get_columns(table) if column not in KEY_COLUMNS]
+        query = "SELECT " + ", ".join(select_columns) + " FROM features"
+        for table in MERGED_FEATURES_TABLES[1:]:
+            query += " JOIN " + table + " USING (dataset, user_id)"
+        if valid_only:
+            query += " JOIN (SELECT dataset, user_id FROM valid_participants) USING (dataset, user_id)"
+        parameters = []
+        if datasets is not None:
+            query += " WHERE features.dataset IN (" + ", ".join(["?"] * len(datasets)) + ")"
+            parameters = list(datasets)
+        return query, parameters
+
+    def read_merged_features(self, datasets=None, valid_only=False):
+        """
+        Join the features, dimensionality and entropy parameters of participants who have all of them
+        :param datasets: list of dataset ids, all datasets if None
+        :param valid_only: only keep the participants in the table valid_participants
+        :return: dataframe [dataset, user_id, features...] sorted by dataset and user_id
+        """
+        query, parameters = self.get_merged_features_query(datasets, valid_only)
+        return pd.read_sql_query(query + " ORDER BY features.dataset, features.user_id", self.connection,
+                                 params=parameters)
+
+    def read_normalized_features(self, datasets=None, valid_only=True, columns=None):
+        """
+        Min-max normalize the merged features across all selected participants, the same as
+        analysis.preprocess_features.normalize_features
+        :param columns: columns to normalize, NORMALIZED_COLUMNS if None, other columns are kept as they are
+        """
+        if columns is None:
+            columns = NORMALIZED_COLUMNS
+        query, parameters = self.get_merged_features_query(datasets, valid_only)
+        merged_columns = [description[0] for description in
+                          self.connection.execute("SELECT * FROM (" + query + ") LIMIT 0", parameters).description]
+        select_columns = []
+        for column in merged_columns:
+            if column in columns:
+                check_identifier(column)
+                select_columns.append("(" + column + " - MIN(" + column + ") OVER ()) * 1.0 / (MAX(" + column +
+                                      ") OVER () - MIN(" + column + ") OVER ()) AS " + column)
+            else:
+                select_columns.append(column)
+        return pd.read_sql_query("SELECT " + ", ".join(select_columns) + " FROM (" + query + ") ORDER BY dataset, "
+                                 "user_id", self.connection, params=parameters)
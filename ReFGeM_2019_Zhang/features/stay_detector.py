@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from .grid_index import pack_cell_ids
+
+"""
+Run-length encoded stay detector over GPS records aggregated by duty cycles.
+Consecutive records of a participant in the same cell form a run. A run of two or more records is a stay, and its
+dwelling time is the DutyCycle of its last record minus the DutyCycle of its first record, which is the sum of the
+differences between consecutive records of the run. Summing runs per cell gives the dwelling time and the number of
+records (occurences) of each visited place, used by both rankings of calc_top_n_convex.
+"""
+
+VISITED_PLACES_COLUMNS = ['grid_x', 'grid_y', 'dwelling_duty_cycle', 'occurences', 'visits', 'stays']
+
+
+def detect_runs(grid_x, grid_y, group_keys=None):
+    """
+    Split the records into runs of consecutive records in the same cell
+    :param grid_x: array of integer grid x indices
+    :param grid_y: array of integer grid y indices
+    :param group_keys: array of integer keys of the participant of each record, records of a participant must be
+        contiguous, a single participant if None
+    :return: (index of the first record of each run, index of the last record of each run)
+    """
+    cell_ids = pack_cell_ids(grid_x, grid_y)
+    is_start = np.ones(cell_ids.size, dtype=bool)
+    is_start[1:] = cell_ids[1:] != cell_ids[:-1]
+    if group_keys is not None:
+        group_keys = np.asarray(group_keys)
+        is_start[1:] |= group_keys[1:] != group_keys[:-1]
+    run_start = np.flatnonzero(is_start)
+    run_end = np.append(run_start[1:], cell_ids.size) - 1
+    return run_start, run_end
+
+
+def sum_by_place(values, place_start):
+    """Sum the values of the runs of each place, runs of a place are contiguous and start at place_start"""
+    if place_start.size == 0:
+        return np.zeros(0, dtype=values.dtype)
+    return np.add.reduceat(values, place_start)
+
+
+def summarize_visited_places(df, group_column=None):
+    """
+    Calculate the dwelling time and visit counts of each visited cell in one pass over the records
+    :param df: dataframe of gps records aggregated by duty cycles with columns "DutyCycle", "grid_x" and "grid_y",
+        sorted by DutyCycle within each participant
+    :param group_column: column of participants, e.g. "user_id", to summarize many participants in one call, the
+        records are treated as a single participant if None
+    :return: dataframe [group_column, grid_x, grid_y, dwelling_duty_cycle, occurences, visits, stays] sorted by
+        participant and cell, where occurences is the number of records, visits the number of runs and stays the number
+        of runs of two or more records
+    """
+    if group_column is None:
+        group_values = None
+        group_keys = None
+    else:
+        group_values, group_keys = np.unique(df[group_column].values, return_inverse=True)
+        group_keys = group_keys.reshape(-1)
+    grid_x = df['grid_x'].values.astype(np.int64)
+    grid_y = df['grid_y'].values.astype(np.int64)
+    duty_cycles = df['DutyCycle'].values.astype(np.float64)
+    run_start, run_end = detect_runs(grid_x, grid_y, group_keys)
+
+    # aggregate the runs by participant and cell
+    run_x = grid_x[run_start]
+    run_y = grid_y[run_start]
+    run_group = np.zeros(run_start.size, dtype=np.int64) if group_keys is None else group_keys[run_start]
+    order = np.lexsort((run_y, run_x, run_group))
+    run_start, run_end = run_start[order], run_end[order]
+    run_x, run_y, run_group = run_x[order], run_y[order], run_group[order]
+    is_place_start = np.ones(run_start.size, dtype=bool)
+    is_place_start[1:] = (run_x[1:] != run_x[:-1]) | (run_y[1:] != run_y[:-1]) | (run_group[1:] != run_group[:-1])
+    place_start = np.flatnonzero(is_place_start)
+
+    run_length = run_end - run_start + 1
+    places = pd.DataFrame({'grid_x': run_x[place_start],
+                           'grid_y': run_y[place_start],
+                           'dwelling_duty_cycle': sum_by_place(duty_cycles[run_end] - duty_cycles[run_start],
+                                                               place_start),
+                           'occurences': sum_by_place(run_length, place_start),
+                           'visits': np.diff(np.append(place_start, run_start.size)),
+                           'stays': sum_by_place((run_length > 1).astype(np.int64), place_start)},
+                          columns=VISITED_PLACES_COLUMNS)
+    if group_column is not None:
+        places.insert(0, group_column, group_values[run_group[place_start]])
+    return places
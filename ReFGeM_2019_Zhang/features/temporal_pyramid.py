@@ -0,0 +1,61 @@
+import numpy as np
+
+"""
+Temporal pyramid of the records of a participant aggregated by duty cycles.
+Downsampling to a longer duty cycle (base duty cycle * ratio) keeps the first record of each bucket DutyCycle // ratio.
+The pyramid computes the row index of the first record of each bucket for every ratio once, so each level is a gather
+of rows instead of a copy and a groupby of the dataframe.
+"""
+
+
+class TemporalPyramid:
+    def __init__(self, duty_cycles, duty_cycle_ratios):
+        """
+        :param duty_cycles: column "DutyCycle" of the records of a participant
+        :param duty_cycle_ratios: list of ratios between the base duty cycle and the sampled duty cycles
+        """
+        self.duty_cycles = np.asarray(duty_cycles, dtype=np.int64)
+        self.levels = {}
+        for duty_cycle_ratio in duty_cycle_ratios:
+            self.add_level(duty_cycle_ratio)
+
+    def add_level(self, duty_cycle_ratio):
+        """Compute the index of the first row of each bucket, buckets are sorted like groupby('DutyCycle')"""
+        if duty_cycle_ratio == 1:
+            # same as sample_by_duty_cycle, records under the base duty cycle are kept as they are
+            row_index = np.arange(self.duty_cycles.size)
+            buckets = self.duty_cycles
+        else:
+            all_buckets = self.duty_cycles // duty_cycle_ratio
+            order = np.argsort(all_buckets, kind='mergesort')
+            sorted_buckets = all_buckets[order]
+            is_first = np.ones(sorted_buckets.size, dtype=bool)
+            is_first[1:] = sorted_buckets[1:] != sorted_buckets[:-1]
+            row_index = order[is_first]
+            buckets = sorted_buckets[is_first]
+        self.levels[duty_cycle_ratio] = (row_index, buckets)
+        return self.levels[duty_cycle_ratio]
+
+    def get_row_index(self, duty_cycle_ratio):
+        if duty_cycle_ratio not in self.levels:
+            self.add_level(duty_cycle_ratio)
+        return self.levels[duty_cycle_ratio][0]
+
+    def get_level_size(self, duty_cycle_ratio):
+        """Return the count of records under the sampled duty cycle"""
+        return self.get_row_index(duty_cycle_ratio).size
+
+    def sample(self, df, duty_cycle_ratio):
+        """
+        Downsample the records with the given ratio, same result as sample_by_duty_cycle
+        :param df: dataframe the pyramid was built from, must include a column "DutyCycle"
+        :return: dataframe under the new duty cycle, with "DutyCycle" the index of the new duty cycle
+        """
+        if duty_cycle_ratio == 1:
+            return df
+        row_index = self.get_row_index(duty_cycle_ratio)
+        buckets = self.levels[duty_cycle_ratio][1]
+        sampled_df = df.iloc[row_index].reset_index(drop=True)
+        sampled_df['DutyCycle'] = buckets.astype(df['DutyCycle'].dtype)
+        columns = ['DutyCycle'] + [column for column in sampled_df.columns if column != 'DutyCycle']
+        return sampled_df[columns]
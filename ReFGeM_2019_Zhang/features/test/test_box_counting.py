@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import features.calc_fractal_dimensionality as cfd
+import features.DatasetConfiguration as dc
+from features.box_counting import calc_box_counting_curve, calc_morton_codes, count_occupied_boxes
+from features.participant_store import ParticipantStore
+import features.results_store as rs
+from features.results_store import ResultsStore
+
+
+def test_occupied_boxes_match_the_cells_of_each_level():
+    rng = np.random.RandomState(0)
+    grid_x = rng.randint(0, 1100, 3000)
+    grid_y = rng.randint(0, 300, 3000) ** 2 // 90
+    levels = list(range(12))
+    expected = [len(set(zip(grid_x >> level, grid_y >> level))) for level in levels]
+    assert count_occupied_boxes(grid_x, grid_y, levels).tolist() == expected
+    assert count_occupied_boxes([], [], levels).tolist() == [0] * 12
+    with pytest.raises(ValueError):
+        calc_morton_codes([-1], [0])
+
+
+def test_curve_of_regular_shapes():
+    grid_x, grid_y = np.meshgrid(np.arange(64), np.arange(64))
+    square = calc_box_counting_curve(grid_x.ravel(), grid_y.ravel(), 15.625, 1000.0)
+    assert square['S'].tolist() == [2.0] * 6
+    assert square['boxes'].tolist() == [4096, 1024, 256, 64, 16, 4]
+    np.testing.assert_allclose(square['epsilon'], 15.625 * 2.0 ** np.arange(6) / 1000.0)
+    line = calc_box_counting_curve(np.arange(256), np.zeros(256), 15.625, 1000.0)
+    assert line['S'].tolist() == [1.0] * 8
+
+
+def test_dimensionality_without_mbparam_files(tmp_path, monkeypatch):
+    configuration = dc.DatasetSHED9Configuration()
+    configuration.participant_store_directory = str(tmp_path / "participants")
+    rng = np.random.RandomState(1)
+    # a participant moving along a road and one visiting places all over the city
+    road = np.arange(0, 1000, 2)
+    records = [pd.DataFrame({'user_id': 1, 'grid_x': road, 'grid_y': road // 3}),
+               pd.DataFrame({'user_id': 2, 'grid_x': rng.randint(0, 1000, 5000), 'grid_y': rng.randint(0, 1000, 5000)})]
+    ParticipantStore(configuration.participant_store_directory).write_participants(pd.concat(records))
+    monkeypatch.setattr(cfd, 'get_dataset_parameters', lambda dataset_id: configuration)
+    os.makedirs(tmp_path / "results" / "SHED9")
+    os.makedirs(tmp_path / "work")
+    monkeypatch.chdir(tmp_path / "work")
+    monkeypatch.setattr(rs, 'RESULTS_STORE_FILE', str(tmp_path / "results" / "results.sqlite"))
+
+    cfd.calculate_dimensionality_by_participant('SHED9', engine="box_counting")
+    dims = pd.read_csv("../results/SHED9/dims_by_participant.csv").set_index('user_id')
+    assert 0.8 < dims.loc[1, 'dim'] < 1.3
+    assert 1.7 < dims.loc[2, 'dim'] < 2.2
+    across_dataset = pd.read_csv("../results/SHED9/dim_across_dataset.csv")
+    assert across_dataset['user_id'].tolist() == ['all_participants']
+    stored = ResultsStore().read('dimensionality', 'SHED9')
+    np.testing.assert_allclose(stored['dim'], dims['dim'])
+    with pytest.raises(ValueError):
+        cfd.calculate_dimensionality_by_participant('SHED9', engine="fd3")
@@ -0,0 +1,99 @@
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+import features.buffer_raster as buffer_raster
+from features.buffer_raster import BUFFER_AREA_CURVE_RADII, TILE_SIZE, PathDistanceField, calc_buffer_area_curve, \
+    calc_buffer_area_raster
+from features.calc_buffer_area import calc_buffer_area_cascaded_union, calc_buffer_area_curve_of_participant, \
+    calc_buffer_area_vector, get_utm_path
+
+
+def make_path(seed, n=300):
+    rng = np.random.RandomState(seed)
+    return 500000 + np.cumsum(rng.normal(0, 150, (n, 2)), axis=0)
+
+
+def test_raster_area_within_error_bound_of_vector_area():
+    for seed in range(3):
+        path = make_path(seed, 2000)
+        for buffer_size, resolution in [(200, 10), (50, 5), (800, 25)]:
+            vector = calc_buffer_area_vector(path, buffer_size)
+            field = PathDistanceField(path, buffer_size, resolution)
+            raster = field.calc_buffer_area(buffer_size)
+            bound = field.calc_error_bound(buffer_size)
+            assert abs(raster - vector) <= bound
+            assert bound < 0.1 * vector
+            # the bound is loose, the actual error is much smaller
+            assert abs(raster - vector) < 0.001 * vector
+
+
+def test_field_is_cropped_to_the_path():
+    path = make_path(1, 2000)
+    field = PathDistanceField(path, 200, 10)
+    assert field.distance.dtype == np.float32
+    extent = (path.max(axis=0) - path.min(axis=0) + 2 * np.sqrt(2) * (200 + field.half_diagonal)) / 10
+    assert (np.array(field.distance.shape[::-1]) <= np.ceil(extent) + 4 + TILE_SIZE).all()
+
+
+def test_clipping_does_not_change_the_field(monkeypatch):
+    path = make_path(2, 500)
+    field = PathDistanceField(path, 500, 10)
+    # without the distance transform, every tile of the rectangle of a segment is updated
+    monkeypatch.setattr(buffer_raster.PathDistanceField, 'calc_tile_bounds',
+                        lambda self, utm_path, shape: np.full((shape[1] // TILE_SIZE, shape[0] // TILE_SIZE),
+                                                              self.field_radius))
+    unclipped_field = PathDistanceField(path, 500, 10)
+    inside = unclipped_field.distance <= field.field_radius
+    np.testing.assert_array_equal(field.distance[inside], unclipped_field.distance[inside])
+    assert (field.distance[~inside] > field.field_radius).all()
+
+
+def test_path_without_segments():
+    assert calc_buffer_area_raster(np.array([[1.0, 2.0]]), 200) == 0.0
+    assert calc_buffer_area_vector(np.array([[1.0, 2.0]]), 200) == 0.0
+
+
+def test_engines_of_buffer_area():
+    path = make_path(3, 100)
+    df = pd.DataFrame({'DutyCycle': np.arange(100), 'easting': path[:, 0], 'northing': path[:, 1]})
+    vector = calc_buffer_area_cascaded_union(df, 'SHED9', 200, engine="vector")
+    raster = calc_buffer_area_cascaded_union(df, 'SHED9', 200, engine="raster")
+    assert np.isclose(vector, calc_buffer_area_vector(df[['easting', 'northing']].round(2).values, 200))
+    assert abs(raster - vector) <= PathDistanceField(df[['easting', 'northing']].round(2).values, 200).\
+        calc_error_bound(200)
+
+
+def test_buffer_area_curve_matches_single_radius():
+    path = make_path(4, 200)
+    radii = [200, 50, 800, 100, 500]
+    curve = calc_buffer_area_curve(path, radii, 10)
+    for radius, area in zip(radii, curve):
+        field = PathDistanceField(path, radius, 10)
+        assert area == field.calc_buffer_area(radius)
+        assert abs(area - calc_buffer_area_vector(path, radius)) <= field.calc_error_bound(radius)
+    assert calc_buffer_area_curve(path[:1], radii) == [0.0] * 5
+
+
+def test_buffer_area_curve_is_faster_than_vector_areas():
+    path = make_path(6, 3000)
+    t0 = perf_counter()
+    curve = calc_buffer_area_curve(path)
+    curve_seconds = perf_counter() - t0
+    t0 = perf_counter()
+    vector_areas = [calc_buffer_area_vector(path, radius) for radius in BUFFER_AREA_CURVE_RADII]
+    vector_seconds = perf_counter() - t0
+    np.testing.assert_allclose(curve, vector_areas, rtol=1e-3)
+    assert curve_seconds < vector_seconds
+
+
+def test_participant_curve_matches_buffer_area_feature():
+    path = make_path(5, 600)
+    df = pd.DataFrame({'DutyCycle': np.arange(600), 'easting': path[:, 0], 'northing': path[:, 1]})
+    for dataset_id in ['SHED9', 'Taxi']:
+        curve = calc_buffer_area_curve_of_participant(df, dataset_id, [50, 200, 800])
+        buffer_area = calc_buffer_area_cascaded_union(df, dataset_id, 200, engine="vector")
+        bound = PathDistanceField(get_utm_path(df, dataset_id), 800).calc_error_bound(200)
+        assert abs(curve[1] - buffer_area) <= bound
+        assert abs(curve[1] - buffer_area) < 0.001 * buffer_area
@@ -0,0 +1,47 @@
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString
+
+from features.buffer_union import calc_buffer_area_tiled, calc_segment_tiles
+from features.calc_buffer_area import calc_buffer_area_cascaded_union, calc_buffer_area_vector
+from features.DatasetConfiguration import SK_CITY_BOUNDARY_UTM
+
+
+def make_path(seed, n=400):
+    rng = np.random.RandomState(seed)
+    return np.array([387000.0, 5777000.0]) + np.cumsum(rng.normal(0, 300, (n, 2)), axis=0)
+
+
+def test_tiles_cover_segment_buffers():
+    path = make_path(0, 50)
+    segment_index, tile_x, tile_y = calc_segment_tiles(path, 200, SK_CITY_BOUNDARY_UTM, 1000)
+    for i in range(len(path) - 1):
+        buffer_bounds = np.array(LineString(path[i:i + 2]).buffer(
+            200, cap_style=3).bounds)
+        tiles = set(zip(tile_x[segment_index == i].tolist(), tile_y[segment_index == i].tolist()))
+        low = np.floor((buffer_bounds[:2] - SK_CITY_BOUNDARY_UTM[:2]) / 1000).astype(int)
+        high = np.floor((buffer_bounds[2:] - SK_CITY_BOUNDARY_UTM[:2]) / 1000).astype(int)
+        for x in range(low[0], high[0] + 1):
+            for y in range(low[1], high[1] + 1):
+                assert (x, y) in tiles
+
+
+def test_tiled_area_matches_serial_union():
+    with Pool(2) as pool:
+        for seed in range(3):
+            path = make_path(seed)
+            expected = calc_buffer_area_vector(path, 200)
+            for tile_size in [500.0, 2000.0, 100000.0]:
+                assert np.isclose(calc_buffer_area_tiled(path, 200, SK_CITY_BOUNDARY_UTM, tile_size, processes=1),
+                                  expected, rtol=1e-9)
+            assert np.isclose(calc_buffer_area_tiled(path, 200, SK_CITY_BOUNDARY_UTM, pool=pool), expected, rtol=1e-9)
+
+
+def test_tiled_engine():
+    path = make_path(5, 100)
+    df = pd.DataFrame({'DutyCycle': np.arange(100), 'easting': path[:, 0], 'northing': path[:, 1]})
+    expected = calc_buffer_area_cascaded_union(df, 'SHED9', 200, engine="vector")
+    assert np.isclose(calc_buffer_area_cascaded_union(df, 'SHED9', 200, engine="tiled"), expected, rtol=1e-9)
+    assert calc_buffer_area_tiled(path[:1], 200, SK_CITY_BOUNDARY_UTM) == 0.0
@@ -1,5 +1,4 @@
 from features.calc_buffer_area import calc_buffer_area
-from features.calc_buffer_area import sample_by_cell_size
 import os
 import pandas as pd
 from shapely.geometry import LineString
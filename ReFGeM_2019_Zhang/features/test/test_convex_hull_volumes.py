@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import ConvexHull
+
+from features.calc_convex_hull import calc_convex_hull_volume, calc_nested_convex_hull_volumes, \
+    reduce_to_column_extremes
+from features.calc_top_n_convex import TOP_N_LIST, calc_multiple_top_n_convex
+
+
+def make_records(seed, n=2000):
+    rng = np.random.RandomState(seed)
+    places = rng.randint(-3000, 3000, (60, 2))
+    visits = places[rng.randint(0, 60, n // 10)].repeat(rng.randint(1, 20, n // 10), axis=0)
+    return pd.DataFrame({'DutyCycle': np.arange(visits.shape[0]),
+                         'grid_x': visits[:, 0].astype(float),
+                         'grid_y': visits[:, 1].astype(float)})
+
+
+def legacy_sort_visited_places_by_dwelling(df):
+    """sort_visited_places_by_dwelling of the original calc_top_n_convex"""
+    df_shift = df.shift(periods=1, axis=0)
+    df_diff = df - df_shift
+    df_diff.columns = ['dwelling_duty_cycle', 'grid_x_diff', 'grid_y_diff']
+    df_dwelling = pd.concat([df_shift, df_diff], axis=1)
+    df_dwelling = df_dwelling.drop([0])
+    df_dwelling = df_dwelling[(df_dwelling['grid_x_diff'] == 0) & (df_dwelling['grid_y_diff'] == 0)]
+    df_dwelling_summary = df_dwelling.groupby(['grid_x', 'grid_y']).agg({'dwelling_duty_cycle': 'sum'}).reset_index()
+    return df_dwelling_summary.sort_values(by=['dwelling_duty_cycle'], ascending=False)
+
+
+def legacy_sort_visited_places_by_occurences(df):
+    """sort_visited_places_by_occurences of the original calc_top_n_convex"""
+    df_grouped = df.groupby(['grid_x', 'grid_y']).size().reset_index()
+    df_grouped.columns = ['grid_x', 'grid_y', 'occurences']
+    return df_grouped.sort_values(['occurences'], ascending=False)
+
+
+def legacy_multiple_top_n_convex(df):
+    """calc_multiple_top_n_convex of the original calc_top_n_convex, one hull per N"""
+    df = df.copy(deep=True)
+    df[['grid_x', 'grid_y']] = (df[['grid_x', 'grid_y']] // 16).astype(np.int64)
+    df = df.loc[:, ['DutyCycle', 'grid_x', 'grid_y']]
+    convex_list = []
+    for df_sorted in [legacy_sort_visited_places_by_dwelling(df), legacy_sort_visited_places_by_occurences(df)]:
+        for n in TOP_N_LIST:
+            convex_list.append(ConvexHull(df_sorted.head(n).loc[:, ['grid_x', 'grid_y']]).volume)
+    return convex_list
+
+
+def test_column_extremes_keep_hull():
+    rng = np.random.RandomState(0)
+    cells = rng.randint(0, 40, (5000, 2))
+    reduced = reduce_to_column_extremes(cells[:, 0], cells[:, 1])
+    assert reduced.shape[0] <= 80
+    assert ConvexHull(reduced).volume == ConvexHull(cells).volume
+
+
+def test_convex_hull_volume_matches_all_points():
+    for seed in range(5):
+        df = make_records(seed)
+        expected = ConvexHull((df[['grid_x', 'grid_y']] // 16).values).volume
+        assert np.isclose(calc_convex_hull_volume(df), expected, rtol=1e-12)
+
+
+def test_nested_volumes_match_separate_hulls():
+    rng = np.random.RandomState(1)
+    points = rng.uniform(-100, 100, (30, 2))
+    expected = [ConvexHull(points[:n]).volume for n in [20, 5, 15, 10, 50]]
+    np.testing.assert_allclose(calc_nested_convex_hull_volumes(points, [20, 5, 15, 10, 50]), expected, rtol=1e-12)
+
+
+def test_multiple_top_n_convex_matches_separate_hulls():
+    for seed in range(5):
+        df = make_records(seed)
+        np.testing.assert_allclose(calc_multiple_top_n_convex(df), legacy_multiple_top_n_convex(df), rtol=1e-12)
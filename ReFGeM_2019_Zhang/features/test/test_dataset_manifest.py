@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import features.dataset_manifest as dm
+from features.dataset_manifest import DatasetManifest, count_lines, read_last_line, read_time_range
+from features.other_process import summarize_gps_datasets as sgd
+from features.participant_store import ParticipantStore
+
+
+def write_participant(directory, user_id, record_count, duty_cycle=5):
+    pd.DataFrame({'user_id': user_id,
+                  'record_time': pd.date_range('2019-01-01', periods=record_count, freq='1min').astype(str),
+                  'lat': 52.1}).to_csv(os.path.join(directory, str(user_id) + ".csv"), index=False)
+    pd.DataFrame({'DutyCycle': np.arange(10, 10 + record_count // duty_cycle) * 3}).\
+        to_csv(os.path.join(directory, str(user_id) + ".csv-300.csv"), index=False)
+
+
+def test_count_lines(tmp_path):
+    file_path = str(tmp_path / "lines.csv")
+    for content in [b"", b"a\n", b"a", b"a,b\nc,d\n\ne", b"x\r\n" * 1000 + b"y"]:
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        with open(file_path) as f:
+            expected = sum(1 for _ in f)
+        assert count_lines(file_path, buffer_size=7) == expected
+
+
+def test_time_range_reads_first_and_last_records(tmp_path):
+    file_path = str(tmp_path / "1.csv")
+    with open(file_path, 'w') as f:
+        f.write('user_id,"lat,lon",record_time\n1,"52.1,-106.6",2019-01-01 00:00:00\n1,"52.1,-106.6",2019-01-01 '
+                '00:05:00\n1,"52.1,-106.6",2019-01-01 01:00:00\n\n')
+    assert read_last_line(file_path, buffer_size=5) == '1,"52.1,-106.6",2019-01-01 01:00:00'
+    start_time, end_time = read_time_range(file_path)
+    assert start_time == pd.Timestamp('2019-01-01').timestamp() and end_time - start_time == 3600
+    with open(file_path, 'w') as f:
+        f.write("user_id,record_time\n")
+    assert np.isnan(read_time_range(file_path)).all()
+
+
+def test_manifest_scans_changed_files_only(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    for user_id, record_count in [(1, 100), (2, 30), (3, 500)]:
+        write_participant(directory, user_id, record_count)
+    manifest = DatasetManifest(directory).refresh(processes=2)
+    assert manifest['file_name'].tolist() == ['1.csv', '1.csv-300.csv', '2.csv', '2.csv-300.csv', '3.csv',
+                                              '3.csv-300.csv']
+    assert manifest['record_count'].tolist() == [100, 20, 30, 6, 500, 100]
+    aggregated = DatasetManifest(directory).get_files("-300.csv").set_index('user_id')
+    assert aggregated.loc['2', ['start_time', 'end_time']].tolist() == [30, 45]
+    original = manifest.set_index('file_name').loc['1.csv']
+    assert original['end_time'] - original['start_time'] == 99 * 60
+
+    scanned = []
+    scan_file = dm.scan_file
+    monkeypatch.setattr(dm, 'scan_file', lambda task: scanned.append(task[1]) or scan_file(task))
+    write_participant(directory, 2, 60)
+    os.remove(os.path.join(directory, "3.csv"))
+    manifest = DatasetManifest(directory).refresh(processes=1)
+    assert sorted(scanned) == ['2.csv', '2.csv-300.csv']
+    assert manifest['file_name'].tolist() == ['1.csv', '1.csv-300.csv', '2.csv', '2.csv-300.csv', '3.csv-300.csv']
+    assert manifest['record_count'].tolist() == [100, 20, 60, 12, 100]
+
+
+def test_summary_and_validity_filter(tmp_path, monkeypatch):
+    gps_directory = tmp_path / "SHED9" / "gps"
+    os.makedirs(gps_directory)
+    for user_id, record_count in [(1, 100), (2, 20), (3, 500), (4, 130)]:
+        write_participant(str(gps_directory), user_id, record_count)
+    monkeypatch.setattr(sgd, 'gps_data_dir', str(tmp_path) + "/")
+    summary = sgd.summarize_gps_records_in_one_dataset('SHED9', "-300.csv", processes=1).sort_values('user_id')
+    assert summary['user_id'].tolist() == ['1', '2', '3', '4']
+    assert summary['original_gps_count'].tolist() == [100, 20, 500, 130]
+    assert summary['aggregated_gps_count'].tolist() == [20, 4, 100, 26]
+    assert summary['original_gps_count'].tolist() == [
+        sgd.count_lines_in_csv_file(str(gps_directory / (user_id + ".csv"))) for user_id in summary['user_id']]
+
+    taxi = pd.DataFrame({'dataset': 'Taxi', 'user_id': ['7', '8'], 'original_gps_count': [10, 10],
+                         'aggregated_gps_count': [10, 2]})
+    df = pd.concat([taxi, summary], ignore_index=True)
+    valid = sgd.filter_out_participants_with_less_aggrgated_gps_records(df)
+    assert list(zip(valid['dataset'], valid['user_id'])) == [('SHED9', '3'), ('SHED9', '4'), ('Taxi', '7')]
+
+
+def test_valid_participant_records_are_read_from_the_store(tmp_path, monkeypatch):
+    store = ParticipantStore(str(tmp_path / "SHED9" / "participants"))
+    store.write_participants(pd.DataFrame({'user_id': [1, 1, 2, 3],
+                                           'record_time': pd.date_range('2019-01-01', periods=4, freq='1min'),
+                                           'grid_x': [1, 2, 3, 4]}))
+    pd.DataFrame({'dataset': ['SHED9', 'SHED9', 'SHED9', 'Taxi'], 'user_id': [3, 1, 5, 2]}).\
+        to_csv(str(tmp_path / "normalized_features_all_datasets.csv"), index=False)
+    monkeypatch.setattr(sgd, 'gps_data_dir', str(tmp_path) + "/")
+    monkeypatch.setattr(sgd, 'output_dir', str(tmp_path) + "/")
+    sgd.gps_data_valid_participant_only(['SHED9'])
+    df = pd.read_csv(str(tmp_path / "SHED9" / "gps_after_processing_valid_participants_only.csv"))
+    assert df.columns.tolist() == ['user_id', 'record_time', 'grid_x', 'dataset']
+    assert df['user_id'].tolist() == [3, 1, 1]
+    assert df['grid_x'].tolist() == [4, 1, 2]
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from features.duty_cycle_aggregator import aggregate_by_duty_cycle, get_aggregated_file_suffix
+
+
+def test_first_fix_of_each_duty_cycle_is_kept():
+    gps_df = pd.DataFrame({'user_id': [1, 1, 1, 2, 2, 1],
+                           'record_time': ['2017-01-01 00:00:00', '2017-01-01 00:04:59', '2017-01-01 00:05:00',
+                                           '2017-01-01 00:12:00', '2017-01-01 00:11:00', '2017-01-01 00:16:00'],
+                           'easting': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                           'northing': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                           'grid_x': [10.0, 11.0, 12.0, 13.0, 14.0, 15.0],
+                           'grid_y': [20.0, 21.0, 22.0, 23.0, 24.0, 25.0]})
+    aggregated_df = aggregate_by_duty_cycle(gps_df, 5)
+    assert aggregated_df['user_id'].tolist() == [1, 1, 1, 2]
+    assert aggregated_df['DutyCycle'].tolist() == [0, 1, 3, 2]
+    assert aggregated_df['grid_x'].tolist() == [10, 12, 15, 14]
+    assert aggregated_df['grid_x'].dtype.kind == 'i'
+    assert aggregated_df.columns.tolist() == ['user_id', 'DutyCycle', 'record_time', 'easting', 'northing', 'grid_x',
+                                              'grid_y']
+
+
+def test_duty_cycles_start_from_given_study_start_time():
+    gps_df = pd.DataFrame({'user_id': [1], 'record_time': ['2017-01-01 01:00:00'], 'grid_x': [0.0], 'grid_y': [0.0]})
+    aggregated_df = aggregate_by_duty_cycle(gps_df, 5, pd.Timestamp('2017-01-01'))
+    assert aggregated_df['DutyCycle'].tolist() == [12]
+
+
+def test_aggregated_file_suffix():
+    assert get_aggregated_file_suffix(5) == ".csv-300.csv"
+    assert get_aggregated_file_suffix(1) == ".csv-60.csv"
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import curve_fit
+
+from features.entropy_parameter_fit import calc_model_entropy_rate, fit_entropy_parameters, read_entropy_rate_files, \
+    refine_parameters
+from features.other_process.fit_entropy_parameters import calc_r_squared, func
+
+TRUE_PARAMETERS = {1: [2e-3, 40.0, 0.5, 0.02, 3.0],
+                   2: [5e-4, 10.0, 0.1, 0.05, 8.0],
+                   3: [1e-3, 80.0, 0.8, 0.01, 1.0]}
+
+
+def make_entropy_rates(noise=0.0, seed=0):
+    rng = np.random.RandomState(seed)
+    entropy_rate_list = []
+    for user_id, parameters in TRUE_PARAMETERS.items():
+        for duty_cycle_ratio in [1, 2, 6, 12, 24, 48, 96][:4 + user_id]:
+            T = 5 * duty_cycle_ratio
+            L = 20000 // duty_cycle_ratio
+            for cell_size_ratio in [1, 2, 4, 8, 16, 32, 64, 128, 256]:
+                D = 15.625 * cell_size_ratio
+                H = calc_model_entropy_rate([T, D, L], *parameters) * (1 + noise * rng.normal())
+                entropy_rate_list.append([user_id, T, D, L, H])
+    df = pd.DataFrame(entropy_rate_list, columns=['user_id', 'T', 'D', 'L', 'H'])
+    # rows that are not fitted
+    df.loc[df.index[[5, 40]], 'H'] = 0
+    return df
+
+
+def test_model_matches_the_legacy_function():
+    x = np.array([[5, 10, 30], [62.5, 125, 4000], [4000, 2000, 600]], dtype=np.float64)
+    np.testing.assert_allclose(calc_model_entropy_rate(x, *TRUE_PARAMETERS[1]), func(x, *TRUE_PARAMETERS[1]))
+
+
+def test_linearized_fit_recovers_exact_parameters():
+    parameters = fit_entropy_parameters(make_entropy_rates()).set_index('user_id')
+    for user_id, expected in TRUE_PARAMETERS.items():
+        np.testing.assert_allclose(parameters.loc[user_id, ['C1', 'C2', 'C3', 'C4', 'C5']], expected, rtol=1e-6)
+    np.testing.assert_allclose(parameters['R_squared'], 1)
+
+
+def test_r_squared_and_refinement_on_noisy_rates():
+    entropy_rates = make_entropy_rates(noise=0.05)
+    linearized = fit_entropy_parameters(entropy_rates).set_index('user_id')
+    refined = fit_entropy_parameters(entropy_rates, refine=True).set_index('user_id')
+    for user_id, df in entropy_rates.groupby('user_id'):
+        df_valid = df.loc[(df.H != 0) & (df.D != 15.625) & (df.D != 31.25)]
+        x = np.array(df_valid[['T', 'D', 'L']]).T
+        y = np.array(df_valid['H'])
+        for parameters in [linearized, refined]:
+            assert parameters.loc[user_id, 'R_squared'] == pytest.approx(
+                calc_r_squared(x, y, parameters.loc[user_id, ['C1', 'C2', 'C3', 'C4', 'C5']].to_numpy()))
+        # the refinement reaches the least squares fit of H of the legacy script
+        popt, _ = curve_fit(func, x, y, maxfev=20000)
+        assert refined.loc[user_id, 'R_squared'] == pytest.approx(calc_r_squared(x, y, popt), abs=1e-6)
+        assert refined.loc[user_id, 'R_squared'] >= linearized.loc[user_id, 'R_squared'] - 1e-9
+
+
+def test_underdetermined_participant_is_not_fitted():
+    entropy_rates = make_entropy_rates(noise=0.05)
+    short = entropy_rates.loc[(entropy_rates['user_id'] == 1) & (entropy_rates['D'] >= 62.5)].head(3).assign(user_id=4)
+    entropy_rates = pd.concat([entropy_rates[entropy_rates['user_id'] <= 2], short], ignore_index=True)
+    for refine in [False, True]:
+        parameters = fit_entropy_parameters(entropy_rates, refine=refine).set_index('user_id')
+        assert parameters.loc[4].isna().all()
+        assert parameters.loc[[1, 2]].notna().all().all()
+    # curve_fit raises a TypeError with fewer rows than constants
+    initial_parameters = np.array(TRUE_PARAMETERS[1])
+    assert refine_parameters(short[['T', 'D', 'L', 'H']].to_numpy(), initial_parameters) is initial_parameters
+
+
+def test_read_entropy_rate_files(tmp_path):
+    entropy_rates = make_entropy_rates()
+    for user_id, df in entropy_rates.groupby('user_id'):
+        df.drop(columns='user_id').to_csv(tmp_path / (str(user_id) + ".csv"), index=False)
+    pd.DataFrame({'user_id': [1]}).to_csv(tmp_path / "entropy_rate_params.csv", index=False)
+    pd.testing.assert_frame_equal(read_entropy_rate_files(str(tmp_path)), entropy_rates)
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import features.calc_spatial_temporal_entropy_rate as entropy_rate
+import features.results_store as rs
+from features.calc_spatial_temporal_entropy_rate import calc_spatial_temporal_entropy_parameters
+from features.entropy_rate_runner import get_entropy_rate_output_file, get_partial_output_file, remove_partial_files, \
+    run_entropy_rate
+from features.participant_store import ParticipantStore
+from features.results_store import ResultsStore
+
+
+def make_store(store_directory, user_ids):
+    rng = np.random.RandomState(6)
+    records = []
+    for user_id in user_ids:
+        n = 120
+        records.append(pd.DataFrame({'user_id': user_id, 'DutyCycle': np.arange(n),
+                                     'grid_x': rng.randint(0, 40, n), 'grid_y': rng.randint(0, 40, n)}))
+    store = ParticipantStore(store_directory)
+    store.write_participants(pd.concat(records))
+    return store
+
+
+def test_parallel_run_skips_finished_participants(tmp_path):
+    store = make_store(str(tmp_path / "store"), [1, 2, 3, 4])
+    output_directory = str(tmp_path / "entropy_rate")
+
+    summary = run_entropy_rate(store.store_directory, output_directory, 5, [1, 2], [1, 4], processes=2,
+                               user_ids=[1, 2])
+    assert sorted(summary['user_id'].tolist()) == [1, 2]
+    assert set(summary['status']) == {"done"}
+
+    summary = run_entropy_rate(store.store_directory, output_directory, 5, [1, 2], [1, 4], processes=2)
+    assert sorted(summary['user_id'].tolist()) == [3, 4]
+    assert sorted(os.listdir(output_directory)) == ["1.csv", "2.csv", "3.csv", "4.csv"]
+
+    expected_file = str(tmp_path / "expected.csv")
+    calc_spatial_temporal_entropy_parameters(store.read_participant(3, ['DutyCycle', 'grid_x', 'grid_y']), 5,
+                                             [1, 2], [1, 4], expected_file)
+    pd.testing.assert_frame_equal(pd.read_csv(expected_file), pd.read_csv(output_directory + "/3.csv"))
+
+
+def test_failed_participant_is_not_marked_finished(tmp_path):
+    store = make_store(str(tmp_path / "store"), [1])
+    output_directory = str(tmp_path / "entropy_rate")
+    os.makedirs(output_directory)
+    # partial file of a participant that timed out in a previous run, pids are below 2^22 on Linux
+    open(output_directory + "/1.csv.99999999.part", 'w').close()
+    run_summary_file = str(tmp_path / "run_summary.csv")
+    summary = run_entropy_rate(store.store_directory, output_directory, 5, [1], [1], processes=1,
+                               backend="unknown", timeout=60, run_summary_file=run_summary_file)
+    assert summary['status'].tolist() == ["failed"]
+    assert "Unknown entropy rate backend" in summary['error'][0]
+    assert os.listdir(output_directory) == []
+    pd.testing.assert_frame_equal(pd.read_csv(run_summary_file)[['user_id', 'status']], summary[['user_id', 'status']])
+
+
+def test_partial_files_of_running_processes_are_kept(tmp_path):
+    output_directory = str(tmp_path)
+    running_file = os.path.basename(get_partial_output_file(get_entropy_rate_output_file(output_directory, 2),
+                                                            os.getpid()))
+    for file_name in [running_file, "1.csv.99999999.part", "3.csv.part"]:
+        open(os.path.join(output_directory, file_name), 'w').close()
+    remove_partial_files(output_directory)
+    assert os.listdir(output_directory) == [running_file]
+    assert running_file == "2.csv." + str(os.getpid()) + ".part"
+
+
+def test_entropy_rate_is_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(rs, 'RESULTS_STORE_FILE', str(tmp_path / "results.sqlite"))
+    store = make_store(str(tmp_path / "store"), [1, 2])
+    ResultsStore().upsert('feature_profiles', 'SHED9', pd.DataFrame({'user_id': [1], 'convex_hull_rows': [7]}))
+    run_entropy_rate(store.store_directory, str(tmp_path / "entropy_rate"), 5, [1, 2], [1, 4], processes=1,
+                     dataset_id='SHED9')
+    profiles = ResultsStore().read('feature_profiles', 'SHED9')
+    assert profiles['user_id'].tolist() == [1, 2]
+    assert profiles['entropy_rate_rows'].tolist() == [120, 120]
+    assert (profiles['entropy_rate_wall_seconds'] > 0).all()
+    assert (profiles['entropy_rate_peak_memory_bytes'] > 0).all()
+    # the profiles of the other features of a participant are kept
+    assert profiles.loc[0, 'convex_hull_rows'] == 7
+
+
+def test_executable_backend_uses_scratch_file(tmp_path, monkeypatch):
+    called = []
+    monkeypatch.setattr(entropy_rate.subprocess, 'check_output', lambda args: called.append(args) or b"1.5")
+    scratch_file = str(tmp_path / "scratch.csv")
+    df = pd.DataFrame({'grid_x': [1, 2], 'grid_y': [3, 4]})
+    assert entropy_rate.calc_entropy_rate(df, "executable", scratch_file) == 1.5
+    assert called[0][1] == scratch_file
+    pd.testing.assert_frame_equal(pd.read_csv(scratch_file), df)
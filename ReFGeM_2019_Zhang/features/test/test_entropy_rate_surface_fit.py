@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from features.analysis import entropy_rate_surface_fit as surface_fit
+
+
+def calc_legacy_entropy_rate(row, const_terms):
+    T, D, L = row['T'], row['D'], row['L']
+    C1, C2, C3, C4, C5 = const_terms
+    return np.log(L) / (C1 * np.power(D, 2) / (4 * L * np.power(T, 2)) + C2 / (4 * L * np.power(T, 2)) +
+                        C3 * D / (2 * L * np.power(T, 2)) + C4 * D / (T * L) + C5 / (T * L))
+
+
+def make_entropy_rates():
+    rng = np.random.RandomState(0)
+    entropy_rate_list = []
+    for user_id in [3, 1, 2]:
+        for T in [5, 10, 30, 60]:
+            for D in [62.5, 125, 250, 500]:
+                entropy_rate_list.append([user_id, T, D, 20000 // T - user_id, rng.uniform(1, 10)])
+    return pd.DataFrame(entropy_rate_list, columns=['user_id', 'T', 'D', 'L', 'H'])
+
+
+def test_fitted_entropy_rate_and_average_surface():
+    entropy_rates = make_entropy_rates()
+    # constants are read as floats from fitted_parameters.csv, participant 4 has no entropy rates
+    fitted_params = pd.DataFrame({'user_id': [1.0, 2.0, 4.0], 'C1': [2e-3, 5e-4, 1.0], 'C2': [40.0, 10.0, 1.0],
+                                  'C3': [0.5, 0.1, 1.0], 'C4': [0.02, 0.05, 1.0], 'C5': [3.0, 8.0, 1.0],
+                                  'R_squared': [0.9, 0.8, 0.7]})
+    df = surface_fit.process_entropy_rate(entropy_rates, fitted_params)
+    assert df.columns.tolist() == ['user_id', 'T', 'D', 'L', 'H', 'H_fitted']
+    assert sorted(df['user_id'].unique()) == [1, 2]
+    for user_id, user_df in df.groupby('user_id'):
+        const_terms = fitted_params.loc[fitted_params['user_id'] == user_id, surface_fit.const_terms_columns].iloc[0]
+        expected = user_df.apply(calc_legacy_entropy_rate, axis=1, const_terms=const_terms.tolist())
+        np.testing.assert_allclose(user_df['H_fitted'], expected, rtol=1e-12)
+
+    average = surface_fit.calc_average_H_and_fitted_H(df)
+    assert len(average) == 16
+    row = average[(average['T'] == 30) & (average['D'] == 125)].iloc[0]
+    selected = df[(df['T'] == 30) & (df['D'] == 125)]
+    assert row['H'] == selected['H'].mean() and row['H_fitted'] == selected['H_fitted'].mean()
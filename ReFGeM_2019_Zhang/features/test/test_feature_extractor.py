@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import features.DatasetConfiguration as dc
+from features.duty_cycle_aggregator import get_aggregated_store_directory
+from features.feature_extractor import FeatureExtractor
+from features.participant_store import ParticipantStore
+import features.results_store as rs
+from features.results_store import ResultsStore
+
+
+def make_participant(user_id, seed, place_count=8):
+    rng = np.random.RandomState(seed)
+    places = rng.randint(0, 4000, (place_count, 2))
+    visits = places[rng.randint(0, place_count, 60)].repeat(rng.randint(1, 6, 60), axis=0)
+    return pd.DataFrame({'user_id': user_id,
+                         'DutyCycle': np.arange(visits.shape[0]),
+                         'easting': 380000 + visits[:, 0] * 15.625,
+                         'northing': 5770000 + visits[:, 1] * 15.625,
+                         'grid_x': visits[:, 0],
+                         'grid_y': visits[:, 1]})
+
+
+def make_dataset(tmp_path, monkeypatch):
+    configuration = dc.DatasetSHED9Configuration()
+    configuration.data_directory = str(tmp_path / "gps") + "/"
+    configuration.participant_store_directory = str(tmp_path / "participants")
+    os.makedirs(configuration.data_directory)
+    os.makedirs(tmp_path / "results" / "SHED9")
+    os.makedirs(tmp_path / "work")
+    records = [make_participant(user_id, user_id) for user_id in [1, 2, 3]]
+    # a single place has no convex hull
+    records.append(make_participant(4, 4, place_count=1))
+    ParticipantStore(configuration.participant_store_directory).write_participants(pd.concat(records))
+    ParticipantStore(get_aggregated_store_directory(configuration.participant_store_directory, 5)).\
+        write_participants(pd.concat(records))
+    monkeypatch.setattr(dc, 'get_dataset_parameters', lambda dataset_id: configuration)
+    monkeypatch.chdir(tmp_path / "work")
+    monkeypatch.setattr(rs, 'RESULTS_STORE_FILE', str(tmp_path / "results" / "results.sqlite"))
+    return str(tmp_path / "results" / "SHED9") + "/"
+
+
+def read_features():
+    results_store = ResultsStore()
+    features = results_store.read('features', 'SHED9')
+    results_store.close()
+    return features
+
+
+def test_parallel_mode_matches_serial_mode(tmp_path, monkeypatch):
+    results_directory = make_dataset(tmp_path, monkeypatch)
+    extractor = FeatureExtractor('SHED9', extract=False)
+    for user_id in [1, 2, 3]:
+        extractor.extract_features_of_participant(user_id)
+    expected = read_features()
+    assert expected['user_id'].tolist() == [1, 2, 3]
+    extractor.results_store.connection.execute("DELETE FROM features")
+    extractor.results_store.connection.commit()
+
+    FeatureExtractor('SHED9', processes=2, timeout=60)
+    pd.testing.assert_frame_equal(expected, read_features())
+    summary = pd.read_csv(results_directory + "feature_extraction_run_summary.csv").set_index('user_id')
+    assert summary['status'].to_dict() == {1: "done", 2: "done", 3: "done", 4: "failed"}
+    assert "QhullError" in summary.loc[4, 'error']
+    profile_summary = pd.read_csv(results_directory + "feature_profile_summary.csv").set_index('feature')
+    assert profile_summary['participants'].to_dict() == {'convex_hull': 3, 'top_n_convex': 3, 'buffer_area': 3}
+    assert (profile_summary['peak_memory_bytes_p50'] > 0).all()
+
+    # finished participants are skipped by the next run
+    results = FeatureExtractor('SHED9', processes=2, timeout=60, extract=False).\
+        extract_features_for_all_participants_in_parallel()
+    assert [result[0] for result in results] == [4]
+
+    extractor.export_results_to_files()
+    pd.testing.assert_frame_equal(expected.drop(columns='dataset'),
+                                  pd.read_csv(results_directory + "convex_topNconvex_buffer.csv"))
+
+
+def test_serial_mode_skips_finished_participants(tmp_path, monkeypatch):
+    results_directory = make_dataset(tmp_path, monkeypatch)
+    FeatureExtractor('SHED9')
+    assert read_features()['user_id'].tolist() == [1, 2, 3]
+    summary = pd.read_csv(results_directory + "feature_extraction_run_summary.csv")
+    assert summary['status'].tolist() == ["done", "done", "done", "failed"]
+    assert "QhullError" in summary['error'][3]
+
+    results = FeatureExtractor('SHED9', extract=False).extract_features_for_all_participants_in_serial()
+    assert [result[:2] for result in results] == [[4, "failed"]]
+
+
+def test_simplification_of_buffer_area_is_recorded(tmp_path, monkeypatch):
+    make_dataset(tmp_path, monkeypatch)
+    extractor = FeatureExtractor('SHED9', extract=False)
+    extractor.extract_features_of_participant(1)
+    assert not extractor.results_store.has_table('buffer_area_simplification')
+    extractor.buffer_simplification_tolerance = 10
+    extractor.extract_features_of_participant(2)
+    simplification = extractor.results_store.read('buffer_area_simplification', 'SHED9')
+    assert simplification['user_id'].tolist() == [2]
+    assert simplification.loc[0, 'removed_vertices'] >= 0 and simplification.loc[0, 'area_deviation'] >= 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features.feature_profiler import FeatureProfiler, calc_scaling_exponent, summarize_profiles, to_long_profiles
+
+
+def make_points(rows):
+    return pd.DataFrame({'grid_x': np.arange(rows) % 10, 'grid_y': np.zeros(rows, dtype=np.int64)})
+
+
+def test_profile_records_each_feature():
+    profiler = FeatureProfiler(trace_memory=True)
+    df = make_points(100)
+    assert profiler.profile('1', 'sum', lambda df: int(df['grid_x'].sum()), df, ['grid_x', 'grid_y']) == 450
+    profiler.profile('1', 'allocate', lambda df: np.ones(1000000).sum(), df)
+    with pytest.raises(ValueError):
+        profiler.profile('1', 'fail', lambda df: int('x'), df)
+    profiles = profiler.get_profiles()
+    assert profiles['feature'].tolist() == ['sum', 'allocate', 'fail']
+    assert profiles['rows'].tolist() == [100, 100, 100]
+    assert profiles.loc[0, 'points'] == 10
+    assert np.isnan(profiles.loc[1, 'points'])
+    # the array of the second feature is 8MB
+    assert profiles.loc[1, 'peak_memory_bytes'] >= 8000000 > profiles.loc[0, 'peak_memory_bytes']
+    assert (profiles['wall_seconds'] >= 0).all() and (profiles['cpu_seconds'] >= 0).all()
+
+    participant_profile = profiler.get_participant_profile('1')
+    assert participant_profile.loc[0, 'allocate_rows'] == 100
+    pd.testing.assert_frame_equal(to_long_profiles(participant_profile, ['sum', 'allocate', 'fail']), profiles)
+
+
+def test_peak_rss_is_recorded_per_feature():
+    profiler = FeatureProfiler()
+    if profiler.trace_memory:
+        pytest.skip("the peak RSS can't be reset on this platform")
+    df = make_points(100)
+    # the 200MB array of the first feature is freed before the second feature
+    profiler.profile('1', 'allocate', lambda df: np.ones(25000000).sum(), df)
+    profiler.profile('1', 'sum', lambda df: int(df['grid_x'].sum()), df)
+    profiles = profiler.get_profiles()
+    assert profiles.loc[0, 'peak_memory_bytes'] - profiles.loc[1, 'peak_memory_bytes'] >= 100000000
+
+
+def test_summary_flags_super_linear_features():
+    rows = np.array([100, 200, 400, 800, 1600])
+    profiles = pd.concat([pd.DataFrame({'user_id': np.arange(5), 'feature': 'linear', 'wall_seconds': rows * 1e-3,
+                                        'cpu_seconds': rows * 1e-3, 'peak_memory_bytes': rows * 100, 'rows': rows,
+                                        'points': rows // 2}),
+                          pd.DataFrame({'user_id': np.arange(5), 'feature': 'quadratic',
+                                        'wall_seconds': rows ** 2 * 1e-6, 'cpu_seconds': rows ** 2 * 1e-6,
+                                        'peak_memory_bytes': np.nan, 'rows': rows, 'points': rows})])
+    summary = summarize_profiles(profiles).set_index('feature')
+    assert summary.loc['linear', 'participants'] == 5
+    assert summary.loc['linear', 'rows_p50'] == 400
+    assert summary.loc['linear', 'wall_seconds_p90'] == pytest.approx(np.percentile(rows * 1e-3, 90))
+    assert np.isnan(summary.loc['quadratic', 'peak_memory_bytes_p50'])
+    assert summary.loc['linear', 'scaling_exponent'] == pytest.approx(1)
+    assert summary.loc['quadratic', 'scaling_exponent'] == pytest.approx(2)
+    assert np.isnan(calc_scaling_exponent([100, 100], [1, 2]))
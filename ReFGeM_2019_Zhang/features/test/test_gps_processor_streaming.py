@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import features.gps_procecssor as gps_procecssor
+from features.DatasetConfiguration import DatasetSHED9Configuration
+from features.participant_store import ParticipantStore
+
+
+def make_configuration(dataset_dir):
+    configuration = DatasetSHED9Configuration()
+    configuration.gps_data_path = os.path.join(dataset_dir, "gps.csv")
+    configuration.data_directory = os.path.join(dataset_dir, "gps") + "/"
+    configuration.participant_store_directory = os.path.join(dataset_dir, "participants")
+    configuration.has_battery_data = False
+    os.makedirs(configuration.data_directory)
+    return configuration
+
+
+def write_gps_file(file_path, n=500):
+    rng = np.random.RandomState(0)
+    record_time = pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.permutation(n) * 60, unit='s')
+    df = pd.DataFrame({'user_id': rng.choice(['1,001', '2', '37'], n),
+                       'record_time': record_time.strftime("%Y-%m-%d %H:%M:%S"),
+                       'accu': rng.choice(['5', '1,375', '80.5'], n),
+                       # mostly inside the Saskatoon boundary, a few outside
+                       'lat': rng.uniform(52.05, 52.22, n),
+                       'lon': rng.uniform(-106.77, -106.52, n)})
+    df.to_csv(file_path, index=False)
+
+
+def run_processor(tmp_path, monkeypatch, name, chunk_size):
+    dataset_dir = str(tmp_path / name)
+    os.makedirs(dataset_dir)
+    configuration = make_configuration(dataset_dir)
+    write_gps_file(configuration.gps_data_path)
+    monkeypatch.setattr(gps_procecssor, 'get_dataset_parameters', lambda dataset_id: configuration)
+    gps_procecssor.GPSProcessor('SHED9', chunk_size=chunk_size, user_csv_files=True)
+    return dataset_dir
+
+
+def test_streaming_matches_batch(tmp_path, monkeypatch):
+    batch_dir = run_processor(tmp_path, monkeypatch, "batch", None)
+    stream_dir = run_processor(tmp_path, monkeypatch, "stream", 64)
+
+    assert sorted(os.listdir(batch_dir + "/gps")) == sorted(os.listdir(stream_dir + "/gps"))
+    for file_name in os.listdir(batch_dir + "/gps"):
+        expected = pd.read_csv(batch_dir + "/gps/" + file_name)
+        actual = pd.read_csv(stream_dir + "/gps/" + file_name)
+        pd.testing.assert_frame_equal(expected, actual)
+
+    batch_store = ParticipantStore(batch_dir + "/participants")
+    stream_store = ParticipantStore(stream_dir + "/participants")
+    pd.testing.assert_frame_equal(batch_store.metadata, stream_store.metadata)
+    for user_id in batch_store.list_participants():
+        pd.testing.assert_frame_equal(batch_store.read_participant(user_id), stream_store.read_participant(user_id))
+
+    expected = pd.read_csv(batch_dir + "/gps_after_processing.csv")
+    actual = pd.read_csv(stream_dir + "/gps_after_processing.csv")
+    expected = expected.sort_values(['user_id', 'record_time']).reset_index(drop=True)
+    actual = actual.sort_values(['user_id', 'record_time']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(expected, actual)
+
+    expected = pd.read_csv(batch_dir + "/study_duration.csv").sort_values('user_id').reset_index(drop=True)
+    actual = pd.read_csv(stream_dir + "/study_duration.csv").sort_values('user_id').reset_index(drop=True)
+    pd.testing.assert_frame_equal(expected, actual)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features.calc_spatial_temporal_entropy_rate import calc_entropy_rate, calc_entropy_rate_of_grid_level
+from features.grid_index import GridIndex, pack_cell_ids, unpack_cell_ids
+
+
+def legacy_sample_by_cell_size(df, cell_size_ratio):
+    df.loc[:, ['grid_x']] = df.loc[:, ['grid_x']] // cell_size_ratio
+    df.loc[:, ['grid_y']] = df.loc[:, ['grid_y']] // cell_size_ratio
+    df['grid_x'] = df['grid_x'].apply(lambda x: int(x))
+    df['grid_y'] = df['grid_y'].apply(lambda x: int(x))
+    return df
+
+
+def make_records(n=300):
+    rng = np.random.RandomState(2)
+    return pd.DataFrame({'DutyCycle': np.arange(n),
+                         'grid_x': rng.randint(-5000, 400000, n).astype(float),
+                         'grid_y': rng.randint(-5000, 400000, n).astype(float)})
+
+
+def test_levels_match_floor_division():
+    df = make_records()
+    grid_index = GridIndex(df['grid_x'], df['grid_y'], [1, 2, 4, 8, 16, 32, 64, 128, 256])
+    for cell_size_ratio in [1, 2, 3, 4, 16, 100, 256]:
+        expected = legacy_sample_by_cell_size(df.copy(deep=True), cell_size_ratio)
+        pd.testing.assert_frame_equal(expected, grid_index.sample(df, cell_size_ratio))
+
+
+def test_cell_ids_identify_cells():
+    grid_x = np.array([0, -1, 5, -1, 2 ** 31 - 1, -2 ** 31])
+    grid_y = np.array([-1, 0, 5, 0, -2 ** 31, 2 ** 31 - 1])
+    cell_ids = pack_cell_ids(grid_x, grid_y)
+    assert len(set(cell_ids.tolist())) == 5
+    unpacked_x, unpacked_y = unpack_cell_ids(cell_ids)
+    np.testing.assert_array_equal(unpacked_x, grid_x)
+    np.testing.assert_array_equal(unpacked_y, grid_y)
+    # cells out of the int32 range would collide
+    for grid_x, grid_y in [([2 ** 31], [0]), ([0], [-2 ** 31 - 1])]:
+        with pytest.raises(ValueError):
+            pack_cell_ids(grid_x, grid_y)
+
+
+def test_take_keeps_computed_levels():
+    df = make_records()
+    grid_index = GridIndex(df['grid_x'], df['grid_y'], [16])
+    row_index = np.array([5, 1, 7, 7])
+    subset = grid_index.take(row_index)
+    expected = GridIndex(df['grid_x'].values[row_index], df['grid_y'].values[row_index])
+    for cell_size_ratio in [1, 4, 16]:
+        np.testing.assert_array_equal(expected.get_cell_ids(cell_size_ratio), subset.get_cell_ids(cell_size_ratio))
+
+
+def test_entropy_rate_of_grid_level():
+    df = make_records()
+    df[['grid_x', 'grid_y']] = df[['grid_x', 'grid_y']] // 1000
+    grid_index = GridIndex(df['grid_x'], df['grid_y'])
+    for cell_size_ratio in [1, 8, 64]:
+        expected = calc_entropy_rate(legacy_sample_by_cell_size(df.copy(deep=True), cell_size_ratio), "python")
+        assert calc_entropy_rate_of_grid_level(grid_index, cell_size_ratio, "python") == expected
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from pyproj import Proj
+
+from features.plot.heatmap_raster import bin_fixes, build_heatmap_raster, get_latlon_bounds, save_heatmap_raster, \
+    to_rgba_image
+
+SK_CITY_BOUNDARY_UTM = [379000, 5768999.9, 396000, 5785999.9]
+
+
+def test_bins_match_the_grouped_cells():
+    rng = np.random.RandomState(0)
+    eastings = rng.uniform(378000, 397000, 20000)
+    northings = rng.normal(5777000, 3000, 20000)
+    counts, dropped_fixes = bin_fixes(eastings, northings, 250, SK_CITY_BOUNDARY_UTM)
+    assert counts.shape == (68, 68)
+    df = pd.DataFrame({'grid_x': np.floor((eastings - SK_CITY_BOUNDARY_UTM[0]) / 250),
+                       'grid_y': np.floor((northings - SK_CITY_BOUNDARY_UTM[1]) / 250)})
+    df = df[(df.grid_x >= 0) & (df.grid_x < 68) & (df.grid_y >= 0) & (df.grid_y < 68)]
+    assert dropped_fixes == 20000 - len(df)
+    for (grid_x, grid_y), count in df.groupby(['grid_x', 'grid_y']).size().items():
+        # row 0 is the north of the boundary
+        assert counts[67 - int(grid_y), int(grid_x)] == count
+    assert counts.sum() == len(df)
+
+
+def test_smoothing_and_saved_raster(tmp_path):
+    eastings = np.array([380000.0, 380000.0, 390000.0])
+    northings = np.array([5770000.0, 5770000.0, 5780000.0])
+    raster = build_heatmap_raster(eastings, northings, 250, SK_CITY_BOUNDARY_UTM, sigma=2)
+    assert abs(raster.density.sum() - 1) < 1e-12
+    assert raster.density.min() >= 0
+    # the smoothed peaks stay at the fixes, the cell with two fixes twice as high as the other one
+    assert np.unravel_index(np.argmax(raster.density), raster.density.shape) == (63, 4)
+    assert abs(raster.density[63, 4] / raster.density[23, 44] - 2) < 1e-9
+    assert raster.density[0, 67] < 1e-12
+
+    image = to_rgba_image(raster.density)
+    assert image.dtype == np.uint8 and image.shape == (68, 68, 4)
+    assert image[63, 4].tolist() == [255, 0, 0, 255]
+    # cells beyond the truncated kernel of both fixes are transparent, the kernel radius is 6 cells
+    rows, columns = np.indices(raster.density.shape)
+    away = (np.maximum(abs(rows - 63), abs(columns - 4)) > 6) & (np.maximum(abs(rows - 23), abs(columns - 44)) > 6)
+    assert (raster.density[away] == 0).all()
+    assert (image[away][:, 3] == 0).all()
+    assert (image[~away][:, 3] > 0).all()
+    latlon_bounds = get_latlon_bounds(raster.utm_bounds, Proj(proj='latlong', datum='WGS84'), 'epsg:32613')
+    assert 52.0 < latlon_bounds[0][0] < latlon_bounds[1][0] < 52.25
+    assert -106.8 < latlon_bounds[0][1] < latlon_bounds[1][1] < -106.5
+    image_file = save_heatmap_raster(raster, str(tmp_path / "SHED9_heatmap"), latlon_bounds)
+    assert image_file.endswith(".png")
+    saved = np.load(str(tmp_path / "SHED9_heatmap.npz"))
+    np.testing.assert_array_equal(saved['density'], raster.density)
+    np.testing.assert_allclose(saved['utm_bounds'], [379000, 5768999.9, 396000, 5785999.9])
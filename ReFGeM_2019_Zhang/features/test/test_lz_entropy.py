@@ -0,0 +1,81 @@
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features.calc_spatial_temporal_entropy_rate import calc_spatial_temporal_entropy_parameters
+from features.lz_entropy import calc_lambda_sum, calc_lambda_sum_suffix_automaton, calc_lz_entropy_rate, \
+    encode_grid_symbols, encode_rows, read_rows_from_file
+
+LZ_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lz_entropy_rate_master")
+# Output of Debug/lzEntropy on the files in testInput
+EXPECTED_ENTROPY_RATES = {"ABABAAAC.csv": "1.6",
+                          "eight_same.csv": "2.4",
+                          "sixteen_same.csv": "1.77778",
+                          "smalltest.csv": "2.66667"}
+
+
+def format_like_executable(H):
+    return "%.6g" % H
+
+
+@pytest.mark.parametrize("file_name", sorted(EXPECTED_ENTROPY_RATES))
+@pytest.mark.parametrize("lambda_sum_function", [calc_lambda_sum, calc_lambda_sum_suffix_automaton])
+def test_matches_executable_on_test_inputs(file_name, lambda_sum_function):
+    rows = read_rows_from_file(os.path.join(LZ_DIRECTORY, "testInput", file_name))
+    H = calc_lz_entropy_rate(encode_rows(rows), lambda_sum_function)
+    assert format_like_executable(H) == EXPECTED_ENTROPY_RATES[file_name]
+
+
+def test_suffix_automaton_matches_direct_search():
+    rng = np.random.RandomState(5)
+    for _ in range(1000):
+        symbols = rng.randint(0, rng.randint(1, 5), rng.randint(0, 80))
+        assert calc_lambda_sum_suffix_automaton(symbols) == calc_lambda_sum(symbols)
+    # long stays in the same cell, like taxis waiting at a stand
+    symbols = np.repeat(rng.randint(0, 30, 300), rng.randint(1, 20, 300))
+    assert calc_lambda_sum_suffix_automaton(symbols) == calc_lambda_sum(symbols)
+
+
+def test_encode_grid_symbols():
+    symbols = encode_grid_symbols([1, 8, 1, 8, 1], [2, 4, 2, 5, 2])
+    assert symbols[0] == symbols[2] == symbols[4]
+    assert len(set(symbols.tolist())) == 3
+
+
+@pytest.fixture(scope="module")
+def lz_executable(tmp_path_factory):
+    if shutil.which("g++") is None:
+        pytest.skip("g++ is not available")
+    executable = str(tmp_path_factory.mktemp("lz") / "lzEntropy")
+    subprocess.check_call(["g++", "-O2", "-o", executable, os.path.join(LZ_DIRECTORY, "main.cpp"), "-I",
+                           LZ_DIRECTORY])
+    return executable
+
+
+def test_matches_executable_on_random_grids(lz_executable, tmp_path):
+    rng = np.random.RandomState(3)
+    for n, cells in [(1, 2), (2, 1), (50, 2), (200, 5), (300, 40)]:
+        df = pd.DataFrame({'grid_x': rng.randint(0, cells, n), 'grid_y': rng.randint(0, cells, n)})
+        input_file = str(tmp_path / "input.csv")
+        df.to_csv(input_file, index=False)
+        expected = subprocess.check_output([lz_executable, input_file]).decode("utf-8")
+        symbols = encode_grid_symbols(df['grid_x'], df['grid_y'])
+        assert format_like_executable(calc_lz_entropy_rate(symbols, calc_lambda_sum)) == expected
+        assert format_like_executable(calc_lz_entropy_rate(symbols, calc_lambda_sum_suffix_automaton)) == expected
+
+
+def test_entropy_parameters_without_temporary_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.RandomState(4)
+    df = pd.DataFrame({'DutyCycle': np.arange(100), 'grid_x': rng.randint(0, 64, 100).astype(float),
+                       'grid_y': rng.randint(0, 64, 100).astype(float)})
+    output_file = str(tmp_path / "entropy.csv")
+    calc_spatial_temporal_entropy_parameters(df, 5, [1, 2], [1, 16], output_file)
+    result = pd.read_csv(output_file)
+    assert result.shape == (4, 4)
+    assert result['L'].tolist() == [100, 100, 50, 50]
+    assert os.listdir(str(tmp_path)) == ["entropy.csv"]
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from sklearn import svm
+from sklearn.datasets import make_classification
+from sklearn.feature_selection import SelectKBest, f_classif
+from sklearn.model_selection import cross_val_score
+from sklearn.pipeline import Pipeline
+
+from features.analysis.model_evaluation import evaluate_model_grid, get_gmm_classifiers, summarize_model_grid
+
+
+def make_features():
+    X, y = make_classification(n_samples=300, n_features=9, n_informative=4, n_redundant=2, n_classes=6,
+                               n_clusters_per_class=1, random_state=0)
+    # a constant feature has a NaN f_classif score
+    X[:, 7] = 1.0
+    return X, y
+
+
+def test_grid_matches_cross_val_score():
+    X, y = make_features()
+    clf = svm.SVC(kernel='linear', gamma='auto')
+    results = evaluate_model_grid(X, y, dict(svc=clf, **get_gmm_classifiers()), processes=2)
+    assert len(results) == 5 * 9 * 5
+    assert (results['confusion_matrix'].apply(np.sum) == 60).all()
+    summary = summarize_model_grid(results)
+    assert summary['classifier'].unique().tolist() == ['svc', 'gmm_spherical', 'gmm_diag', 'gmm_tied', 'gmm_full']
+    svc_summary = summary[summary['classifier'] == 'svc'].set_index('k')
+    for k in range(1, 10):
+        pipeline = Pipeline([('anova', SelectKBest(f_classif, k=k)), ('svc', clf)])
+        scores = cross_val_score(pipeline, X, y, scoring='accuracy', cv=5)
+        assert svc_summary.loc[k, 'mean'] == scores.mean()
+        assert svc_summary.loc[k, 'std'] == scores.std()
+        assert svc_summary.loc[k, 'confusion_matrix'].shape == (6, 6)
+        assert np.trace(svc_summary.loc[k, 'confusion_matrix']) == round(scores.sum() * 60)
+
+    serial_results = evaluate_model_grid(X, y, {'svc': clf}, [2, 8], processes=1)
+    svc_results = results[(results['classifier'] == 'svc') & results['k'].isin([2, 8])].reset_index(drop=True)
+    pd.testing.assert_series_equal(serial_results['accuracy'], svc_results['accuracy'])
+    # the NaN score of the constant feature is selected last
+    assert not any(selected[7] for selected in serial_results['selected'])
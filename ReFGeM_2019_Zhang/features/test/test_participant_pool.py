@@ -0,0 +1,26 @@
+import os
+from time import sleep
+
+from features.participant_pool import run_participant_tasks
+
+
+def run_example_task(task):
+    if task == "fail":
+        raise ValueError("bad participant")
+    if task == "crash":
+        os._exit(3)
+    if task == "hang":
+        sleep(60)
+    sleep(0.1)
+
+
+def test_errors_are_isolated_per_participant():
+    tasks = [(1, "ok"), (2, "fail"), (3, "hang"), (4, "crash"), (5, "ok"), (6, "ok")]
+    reported = []
+    results = run_participant_tasks(run_example_task, tasks, processes=2, timeout=2, on_result=reported.append)
+    assert reported == results
+    status = {result[0]: result[1] for result in results}
+    assert status == {1: "done", 2: "failed", 3: "timeout", 4: "crashed", 5: "done", 6: "done"}
+    errors = {result[0]: result[3] for result in results}
+    assert "bad participant" in errors[2]
+    assert errors[1] == ""
@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+
+from features.participant_store import ParticipantStore
+
+
+def make_records():
+    return pd.DataFrame({'user_id': [2, 1, 2, 1, 2],
+                         'record_time': ['2017-01-01 10:00:00', '2017-01-02 09:00:00', '2017-01-01 08:00:00',
+                                         '2017-01-01 07:00:00', '2017-01-03 12:00:00'],
+                         'grid_x': [1.0, 2.0, 3.0, 4.0, 5.0],
+                         'grid_y': [6.0, 7.0, 8.0, 9.0, 10.0]})
+
+
+def test_metadata_is_computed_while_writing(tmp_path):
+    store = ParticipantStore(str(tmp_path))
+    store.write_participants(make_records())
+    reopened = ParticipantStore(str(tmp_path))
+    assert reopened.list_participants() == [1, 2]
+    assert reopened.metadata['record_count'].tolist() == [2, 3]
+    assert reopened.metadata['start_time'].tolist() == [pd.Timestamp('2017-01-01 07:00:00'),
+                                                        pd.Timestamp('2017-01-01 08:00:00')]
+    assert reopened.metadata['end_time'].tolist() == [pd.Timestamp('2017-01-02 09:00:00'),
+                                                      pd.Timestamp('2017-01-03 12:00:00')]
+    duration_df = reopened.get_study_duration('SHED9', 'gps')
+    assert duration_df.columns.tolist() == ['study', 'user_id', 'data', 'start_time', 'end_time']
+
+
+def test_read_only_needed_columns_sorted_by_time(tmp_path):
+    store = ParticipantStore(str(tmp_path))
+    store.write_participants(make_records())
+    df = store.read_participant(2, ['grid_x', 'grid_y'])
+    assert df.columns.tolist() == ['grid_x', 'grid_y']
+    assert df['grid_x'].tolist() == [3, 1, 5]
+    assert str(df['grid_x'].dtype) == 'int32'
+
+
+def test_append_then_compact(tmp_path):
+    records = make_records()
+    store = ParticipantStore(str(tmp_path))
+    store.append_participants(records.iloc[:2])
+    store.append_participants(records.iloc[2:])
+    assert len(store.get_part_files(2)) == 2
+    # the metadata is saved once at the end of the stream
+    assert not os.path.isfile(store.metadata_file_path)
+    store.compact()
+    assert ParticipantStore(str(tmp_path)).metadata['record_count'].tolist() == [2, 3]
+    assert len(store.get_part_files(2)) == 1
+    assert store.read_participant(1)['grid_x'].tolist() == [4, 2]
+    assert store.metadata['record_count'].tolist() == [2, 3]
+    store.clear()
+    assert store.list_participants() == []
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString
+
+from features.buffer_raster import PathDistanceField
+from features.calc_buffer_area import calc_buffer_area_cascaded_union, calc_buffer_area_vector, \
+    remove_consecutive_duplicate_locations_from_gps_dataframe_utm, simplify_utm_path
+from features.path_simplifier import simplify_path
+
+
+def make_path(seed, n=500):
+    # slow random turns with GPS noise, so that many fixes are nearly collinear
+    rng = np.random.RandomState(seed)
+    heading = np.cumsum(rng.normal(0, 0.05, n))
+    steps = np.column_stack((np.cos(heading), np.sin(heading))) * 40
+    return 500000 + np.cumsum(steps, axis=0) + rng.normal(0, 2, (n, 2))
+
+
+def test_removed_vertices_are_within_tolerance():
+    path = make_path(0)
+    simplified = simplify_path(path, 10)
+    assert simplified.removed_vertices == len(path) - len(simplified.path) > len(path) / 2
+    assert simplified.max_distance <= 10
+    line = LineString(simplified.path)
+    assert LineString(path).hausdorff_distance(line) <= simplified.max_distance + 1e-6
+    np.testing.assert_array_equal(simplified.path[[0, -1]], path[[0, -1]])
+
+
+def test_area_deviation_of_square_capped_buffers():
+    for seed in range(3):
+        path = make_path(seed)
+        simplified_path, removed_vertices, area_deviation = simplify_utm_path(path, 10, 200)
+        assert removed_vertices == len(path) - len(simplified_path)
+        vector_deviation = abs(calc_buffer_area_vector(simplified_path, 200) - calc_buffer_area_vector(path, 200))
+        error_bound = PathDistanceField(path, 200).calc_error_bound(200) + \
+            PathDistanceField(simplified_path, 200, grid_path=path).calc_error_bound(200)
+        assert abs(area_deviation - vector_deviation) <= error_bound
+        # the raster errors of both paths mostly cancel
+        assert abs(area_deviation - vector_deviation) < 0.01 * vector_deviation
+
+
+def test_simplified_buffer_area():
+    path = make_path(4)
+    df = pd.DataFrame({'DutyCycle': np.arange(len(path)), 'easting': path[:, 0], 'northing': path[:, 1]})
+    expected = calc_buffer_area_vector(simplify_path(df[['easting', 'northing']].round(2).values, 10).path, 200)
+    assert calc_buffer_area_cascaded_union(df, 'SHED9', 200, simplification_tolerance=10) == expected
+    buffer_area, removed_vertices, area_deviation = calc_buffer_area_cascaded_union(
+        df, 'SHED9', 200, simplification_tolerance=10, return_simplification=True)
+    assert buffer_area == expected and removed_vertices > 0 and area_deviation > 0
+    assert calc_buffer_area_cascaded_union(df, 'SHED9', 200, return_simplification=True)[1:] == (0, 0.0)
+
+
+def test_short_paths_are_kept():
+    path = make_path(1, 2)
+    assert simplify_path(path, 10).removed_vertices == 0
+    assert simplify_path(make_path(1), None).removed_vertices == 0
+
+
+def test_remove_consecutive_duplicates_matches_string_keys():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'easting': rng.randint(0, 3, 200) + 0.5, 'northing': rng.randint(0, 3, 200) + 0.25})
+    key = df['easting'].astype(str) + df['northing'].astype(str)
+    expected = df.loc[key.shift() != key]
+    pd.testing.assert_frame_equal(expected, remove_consecutive_duplicate_locations_from_gps_dataframe_utm(df))
+    assert list(df.columns) == ['easting', 'northing']
@@ -0,0 +1,45 @@
+import numpy as np
+from pyproj import transform
+
+from features.DatasetConfiguration import PROJ_LATLONG, ROME_PROJ_UTM, SK_CITY_BOUNDARY, SK_PROJ_UTM, \
+    transform_to_utm
+import features.projection as projection
+from features.projection import get_executor, get_transformer, project
+
+
+def test_transformer_is_cached():
+    assert get_transformer(PROJ_LATLONG, SK_PROJ_UTM) is get_transformer(PROJ_LATLONG, SK_PROJ_UTM)
+    assert get_transformer(PROJ_LATLONG, SK_PROJ_UTM) is not get_transformer(PROJ_LATLONG, ROME_PROJ_UTM)
+
+
+def test_thread_pool_transformers_are_reused(monkeypatch):
+    assert get_executor(4) is get_executor(4)
+    xs, ys = np.full(40000, -106.6), np.full(40000, 52.1)
+    project(PROJ_LATLONG, SK_PROJ_UTM, xs, ys, chunk_size=1000, max_workers=4)
+    built = []
+    from_crs = projection.Transformer.from_crs
+    monkeypatch.setattr(projection.Transformer, 'from_crs', lambda *args, **kwargs: built.append(args) or
+                        from_crs(*args, **kwargs))
+    for _ in range(3):
+        project(PROJ_LATLONG, SK_PROJ_UTM, xs, ys, chunk_size=1000, max_workers=4)
+    assert len(get_executor(4)._threads) == 4
+    assert built == []
+
+
+def test_chunked_projection_matches_pyproj_transform():
+    rng = np.random.RandomState(2)
+    latitudes = rng.uniform(SK_CITY_BOUNDARY[0], SK_CITY_BOUNDARY[2], 10001)
+    longitudes = rng.uniform(SK_CITY_BOUNDARY[1], SK_CITY_BOUNDARY[3], 10001)
+    expected_eastings, expected_northings = transform(PROJ_LATLONG, SK_PROJ_UTM, longitudes, latitudes)
+    eastings, northings = project(PROJ_LATLONG, SK_PROJ_UTM, longitudes, latitudes, chunk_size=1000, max_workers=4)
+    np.testing.assert_allclose(eastings, expected_eastings, atol=1e-6)
+    np.testing.assert_allclose(northings, expected_northings, atol=1e-6)
+
+    lons, lats = project(SK_PROJ_UTM, PROJ_LATLONG, eastings, northings, chunk_size=1000, max_workers=4)
+    np.testing.assert_allclose(lons, longitudes, atol=1e-9)
+    np.testing.assert_allclose(lats, latitudes, atol=1e-9)
+
+
+def test_transform_to_utm():
+    easting, northing = transform(PROJ_LATLONG, SK_PROJ_UTM, [-106.6], [52.1])
+    np.testing.assert_allclose(transform_to_utm(52.1, -106.6, SK_PROJ_UTM), [easting[0], northing[0]], atol=1e-6)
@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from features.battery_processor import BatteryProcessor
+from features.record_standardizer import calc_duty_cycle_index, standardize_accuracy, standardize_gps_dataframe, \
+    standardize_user_id
+
+
+def legacy_standardize_gps_dataframe(gps_df):
+    if 'accu' in gps_df.columns:
+        gps_df['accu'] = gps_df['accu'].apply(lambda x: float(str(x).replace(',', '')))
+    gps_df['user_id'] = gps_df['user_id'].apply(lambda x: int(str(x).replace(',', '')))
+    gps_df['record_time'] = pd.to_datetime(gps_df['record_time'])
+    return gps_df
+
+
+def legacy_duty_cycle(record_time, duty_cycles):
+    study_start_time = min(record_time)
+    return record_time.apply(lambda x: math.floor((x - study_start_time).total_seconds() / (duty_cycles * 60)))
+
+
+def make_raw_records(n=1000):
+    rng = np.random.RandomState(1)
+    start = pd.Timestamp("2017-06-01 08:00:00")
+    record_time = start + pd.to_timedelta(rng.randint(0, 30 * 24 * 3600 * 1000, n), unit='ms')
+    return pd.DataFrame({'user_id': rng.choice(['1,001', '2', '12,345', '7'], n),
+                         'record_time': record_time.astype(str),
+                         'accu': rng.choice(np.array(['5', '1,375', '80.5', np.nan, '12'], dtype=object), n)})
+
+
+def test_gps_standardization_matches_legacy():
+    raw = make_raw_records()
+    expected = legacy_standardize_gps_dataframe(raw.copy())
+    actual = standardize_gps_dataframe(raw.copy())
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+    assert actual['user_id'].dtype == np.int64
+    assert actual['accu'].dtype == np.float64
+
+
+def test_numeric_columns_are_kept():
+    assert standardize_user_id(pd.Series([3, 4])).tolist() == [3, 4]
+    assert standardize_accuracy(pd.Series([3.5, np.nan])).isna().tolist() == [False, True]
+
+
+def test_duty_cycle_index_matches_legacy():
+    record_time = pd.to_datetime(make_raw_records()['record_time'])
+    for duty_cycles in [1, 5, 8]:
+        expected = legacy_duty_cycle(record_time, duty_cycles)
+        actual = calc_duty_cycle_index(record_time, record_time.min(), duty_cycles)
+        assert actual.tolist() == expected.tolist()
+
+
+def test_battery_duty_cycles_of_each_participant(tmp_path):
+    raw = make_raw_records()[['user_id', 'record_time']]
+    battery_processor = BatteryProcessor.__new__(BatteryProcessor)
+    battery_processor.battery_dataframe = raw.copy()
+    battery_processor.duty_cycles = 5
+    battery_processor.battery_stats_output_file = str(tmp_path / "battery_stats.csv")
+    battery_processor.battery_duty_cycles_of_each_participant()
+
+    legacy = legacy_standardize_gps_dataframe(raw.copy())
+    legacy['duty_cycle'] = legacy_duty_cycle(legacy['record_time'], 5)
+    expected = legacy.groupby('user_id')['duty_cycle'].nunique().reset_index(name='count')
+    pd.testing.assert_frame_equal(expected, battery_processor.dataframe_battery_stats, check_dtype=False)
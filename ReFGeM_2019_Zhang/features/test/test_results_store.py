@@ -0,0 +1,107 @@
+from multiprocessing import Process
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features.analysis.preprocess_features import normalize_features
+from features.results_store import ResultsStore
+
+
+def make_features(user_ids, seed):
+    rng = np.random.RandomState(seed)
+    features = pd.DataFrame({'user_id': user_ids})
+    for column in ['convex_hull', 'buffer_area', 'N5', 'N10', 'N15', 'N20', 'ON5', 'ON10', 'ON15', 'ON20']:
+        features[column] = rng.uniform(0, 1e6, len(user_ids))
+    dimensionality = pd.DataFrame({'user_id': user_ids})
+    for column in ['fit_params_0', 'fit_params_1', 'fit_params_2', 'mse', 'dim']:
+        dimensionality[column] = rng.normal(size=len(user_ids))
+    entropy_parameters = pd.DataFrame({'user_id': user_ids})
+    for column in ['C1', 'C2', 'C3', 'C4', 'C5', 'R_squared']:
+        entropy_parameters[column] = rng.normal(size=len(user_ids))
+    return features, dimensionality, entropy_parameters
+
+
+def fill_store(results_store):
+    merged = []
+    for seed, dataset in enumerate(['SHED9', 'Taxi']):
+        features, dimensionality, entropy_parameters = make_features(list(range(1, 9)), seed)
+        # participants missing a feature are dropped by the merge
+        results_store.upsert('features', dataset, features)
+        results_store.upsert('dimensionality', dataset, dimensionality[dimensionality['user_id'] != 3])
+        results_store.upsert('entropy_parameters', dataset, entropy_parameters)
+        results_store.upsert('valid_participants', dataset, pd.DataFrame({'user_id': [1, 2, 3, 4, 5]}))
+        df = pd.merge(pd.merge(features, dimensionality, on=['user_id']), entropy_parameters, on=['user_id'])
+        df.insert(0, 'dataset', dataset)
+        merged.append(df[df['user_id'] != 3])
+    return pd.concat(merged, ignore_index=True)
+
+
+def test_upsert_replaces_participants_and_adds_columns(tmp_path):
+    results_store = ResultsStore(str(tmp_path / "results.sqlite"))
+    results_store.upsert('timings', 'SHED9', pd.DataFrame({'user_id': ['1', '2'], 'convex_hull': [0.5, np.nan]}))
+    results_store.upsert('timings', 'SHED9', pd.DataFrame({'user_id': [2], 'convex_hull': [1.5], 'buffer_area': [3.0]}))
+    results_store.upsert('timings', 'Taxi', pd.DataFrame({'user_id': [2], 'convex_hull': [7.0]}))
+    assert results_store.get_columns('timings') == ['dataset', 'user_id', 'convex_hull', 'buffer_area']
+    expected = pd.DataFrame({'dataset': ['SHED9', 'SHED9'], 'user_id': [1, 2], 'convex_hull': [0.5, 1.5],
+                             'buffer_area': [np.nan, 3.0]})
+    pd.testing.assert_frame_equal(results_store.read('timings', 'SHED9'), expected)
+    assert results_store.has_participant('timings', 'Taxi', '2')
+    assert not results_store.has_participant('timings', 'Taxi', 1)
+    assert not results_store.has_participant('features', 'Taxi', 2)
+    with pytest.raises(ValueError):
+        results_store.upsert('timings', 'SHED9', pd.DataFrame({'user_id': [1], 'R-squared': [0.5]}))
+
+
+def test_merged_features_match_the_merge_of_files(tmp_path):
+    results_store = ResultsStore(str(tmp_path / "results.sqlite"))
+    expected = fill_store(results_store)
+    pd.testing.assert_frame_equal(results_store.read_merged_features(), expected)
+    pd.testing.assert_frame_equal(results_store.read_merged_features(['Taxi']),
+                                  expected[expected['dataset'] == 'Taxi'].reset_index(drop=True))
+    valid = expected[expected['user_id'] <= 5].reset_index(drop=True)
+    pd.testing.assert_frame_equal(results_store.read_merged_features(valid_only=True), valid)
+
+    normalized = results_store.read_normalized_features()
+    pd.testing.assert_frame_equal(normalized.drop(columns='R_squared'),
+                                  normalize_features(valid.copy()).drop(columns='R_squared'))
+    r_squared = valid['R_squared']
+    np.testing.assert_allclose(normalized['R_squared'],
+                               (r_squared - r_squared.min()) / (r_squared.max() - r_squared.min()))
+
+
+def write_participants(database_file, dataset, user_ids):
+    results_store = ResultsStore(database_file)
+    for user_id in user_ids:
+        results_store.upsert('features', dataset, pd.DataFrame({'user_id': [user_id], 'convex_hull': [user_id * 2.0],
+                                                                dataset + '_only': [1]}))
+    results_store.close()
+
+
+def test_concurrent_writers(tmp_path):
+    database_file = str(tmp_path / "results.sqlite")
+    processes = [Process(target=write_participants, args=(database_file, dataset, range(50)))
+                 for dataset in ['SHED9', 'SHED10', 'Taxi']]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0, 0, 0]
+    features = ResultsStore(database_file).read('features')
+    assert len(features) == 150
+    assert (features['convex_hull'] == features['user_id'] * 2.0).all()
+    assert sorted(features.columns[3:]) == ['SHED10_only', 'SHED9_only', 'Taxi_only']
+
+
+def test_upsert_many_is_one_transaction(tmp_path):
+    results_store = ResultsStore(str(tmp_path / "results.sqlite"))
+    results_store.upsert('features', 'SHED9', pd.DataFrame({'user_id': [1], 'convex_hull': [1.0]}))
+    with pytest.raises(ValueError):
+        results_store.upsert_many('SHED9', {'timings': pd.DataFrame({'user_id': [1], 'convex_hull': [2.0]}),
+                                            'features': pd.DataFrame({'user_id': [1], 'bad column': [2.0]})})
+    # the timings of the failed call are rolled back
+    assert not results_store.has_table('timings')
+    results_store.upsert_many('SHED9', {'timings': pd.DataFrame({'user_id': [1], 'convex_hull': [2.0]}),
+                                        'features': pd.DataFrame({'user_id': [1], 'convex_hull': [3.0]})})
+    assert results_store.read('timings')['convex_hull'].tolist() == [2.0]
+    assert results_store.read('features')['convex_hull'].tolist() == [3.0]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from features.calc_top_n_convex import sort_visited_places_by_dwelling, sort_visited_places_by_occurences
+from features.stay_detector import summarize_visited_places
+
+
+def legacy_sort_visited_places_by_dwelling(df):
+    df_shift = df.shift(periods=1, axis=0)
+    df_diff = df - df_shift
+    df_diff.columns = ['dwelling_duty_cycle', 'grid_x_diff', 'grid_y_diff']
+    df_dwelling = pd.concat([df_shift, df_diff], axis=1)
+    df_dwelling = df_dwelling.drop([0])
+    df_dwelling = df_dwelling[(df_dwelling['grid_x_diff'] == 0) & (df_dwelling['grid_y_diff'] == 0)]
+    df_dwelling_summary = df_dwelling.groupby(['grid_x', 'grid_y']).agg({'dwelling_duty_cycle': 'sum'}).reset_index()
+    return df_dwelling_summary.sort_values(by=['dwelling_duty_cycle'], ascending=False)
+
+
+def legacy_sort_visited_places_by_occurences(df):
+    df_grouped = df.groupby(['grid_x', 'grid_y']).size().reset_index()
+    df_grouped.columns = ['grid_x', 'grid_y', 'occurences']
+    return df_grouped.sort_values(['occurences'], ascending=False)
+
+
+def make_records(seed, n=1000):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({'DutyCycle': np.cumsum(rng.randint(1, 4, n)),
+                         'grid_x': rng.randint(-3, 4, n),
+                         'grid_y': rng.randint(-3, 4, n)})
+
+
+def test_rankings_match_legacy():
+    for seed in range(10):
+        df = make_records(seed)
+        pd.testing.assert_frame_equal(legacy_sort_visited_places_by_dwelling(df), sort_visited_places_by_dwelling(df),
+                                      check_dtype=False)
+        pd.testing.assert_frame_equal(legacy_sort_visited_places_by_occurences(df),
+                                      sort_visited_places_by_occurences(df))
+
+
+def test_visit_counts():
+    df = pd.DataFrame({'DutyCycle': [0, 1, 2, 5, 6, 9, 10],
+                       'grid_x': [1, 1, 1, 2, 1, 1, 3],
+                       'grid_y': [0, 0, 0, 0, 0, 0, 0]})
+    places = summarize_visited_places(df)
+    assert places['grid_x'].tolist() == [1, 2, 3]
+    assert places['dwelling_duty_cycle'].tolist() == [5.0, 0.0, 0.0]
+    assert places['occurences'].tolist() == [5, 1, 1]
+    assert places['visits'].tolist() == [2, 1, 1]
+    assert places['stays'].tolist() == [2, 0, 0]
+
+
+def test_grouped_call_matches_each_participant():
+    records = []
+    for user_id in [30, 4, 17]:
+        records.append(make_records(user_id, 300).assign(user_id=user_id))
+    df = pd.concat(records, ignore_index=True)
+    grouped = summarize_visited_places(df, 'user_id')
+    assert grouped['user_id'].unique().tolist() == [4, 17, 30]
+    for user_id, data in df.groupby('user_id'):
+        expected = summarize_visited_places(data.reset_index(drop=True))
+        actual = grouped[grouped['user_id'] == user_id].drop(columns='user_id').reset_index(drop=True)
+        pd.testing.assert_frame_equal(expected, actual)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from features.calc_spatial_temporal_entropy_rate import sample_by_duty_cycle
+from features.temporal_pyramid import TemporalPyramid
+
+
+def legacy_sample_by_duty_cycle(df, duty_cycle_ratio):
+    if duty_cycle_ratio == 1:
+        return df
+    df.loc[:, ['DutyCycle']] = df.loc[:, ['DutyCycle']] // duty_cycle_ratio
+    return pd.DataFrame(df.groupby('DutyCycle').first().reset_index())
+
+
+def make_records(n=400):
+    rng = np.random.RandomState(1)
+    return pd.DataFrame({'user_id': 7,
+                         'DutyCycle': rng.choice(np.arange(2000), n, replace=False),
+                         'grid_x': rng.randint(0, 50, n),
+                         'grid_y': rng.randint(0, 50, n),
+                         'easting': rng.uniform(0, 1000, n)})
+
+
+def test_pyramid_matches_groupby_sampling():
+    df = make_records()
+    ratios = [1, 2, 3, 4, 5, 6, 12, 24]
+    pyramid = TemporalPyramid(df['DutyCycle'], ratios)
+    for ratio in ratios:
+        expected = legacy_sample_by_duty_cycle(df.copy(deep=True), ratio)
+        pd.testing.assert_frame_equal(expected, pyramid.sample(df, ratio))
+        assert pyramid.get_level_size(ratio) == expected.shape[0]
+
+
+def test_sample_does_not_modify_records():
+    df = make_records()
+    original = df.copy(deep=True)
+    TemporalPyramid(df['DutyCycle'], [5]).sample(df, 5)
+    pd.testing.assert_frame_equal(original, df)
+
+
+def test_sample_by_duty_cycle_wrapper():
+    df = make_records()
+    expected = legacy_sample_by_duty_cycle(df.copy(deep=True), 5)
+    pd.testing.assert_frame_equal(expected, sample_by_duty_cycle(df, 5))